@@ -0,0 +1,141 @@
+"""Response cache in front of the API."""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import attr
+
+from . import urls
+
+
+@attr.s(frozen=True)
+class CachePolicy:
+    """Caching policy of an endpoint.
+
+    Args:
+        ttl (float): Time (in seconds) a response is kept in the cache.
+        invalidate_on_write (bool): Whether a write on a parent or child
+            resource invalidates the cached response.
+    """
+
+    ttl = attr.ib(type=float)
+    invalidate_on_write = attr.ib(type=bool, default=True)
+
+
+DEFAULT_POLICIES = {
+    'facilities_list': CachePolicy(6 * 3600, invalidate_on_write=False),
+    'gateway_type': CachePolicy(6 * 3600),
+    'system': CachePolicy(30),
+    'rooms': CachePolicy(30),
+    'room': CachePolicy(30),
+    'zone': CachePolicy(30),
+    'hot_water': CachePolicy(30),
+    'circulation': CachePolicy(30),
+    'live_report': CachePolicy(10),
+    'hvac': CachePolicy(10),
+    'emf_report': CachePolicy(6 * 3600, invalidate_on_write=False),
+    'emf_report_device': CachePolicy(15 * 60, invalidate_on_write=False),
+}
+"""Default caching policies, by name of the :mod:`~pymultimatic.api.urls`
+function. Facilities and gateway type are almost never changing, whereas
+live report and hvac state are changing often. Energy reports are updated a
+few times per hour at most."""
+
+_Entry = Tuple[float, bool, Any]
+"""Cached response: expiration time, invalidate on write and response."""
+
+_INVALIDATIONS = {
+    'hvac_update': (urls.hvac,),
+}
+"""Writes invalidating resources which are not parent nor child of the
+written resource."""
+
+
+@attr.s
+class ResponseCache:
+    """LRU cache of responses coming from the API, used by the
+    :class:`~pymultimatic.systemmanager.SystemManager`.
+
+    Responses are cached by URL (so by :mod:`~pymultimatic.api.urls` function
+    and parameters), only if there is a :class:`CachePolicy` for the
+    :mod:`~pymultimatic.api.urls` function. Writing to a resource (``put``,
+    ``post`` or ``delete``) invalidates the cached parent and child resources,
+    e.g. setting a quick veto on a zone invalidates :func:`urls.system` and
+    :func:`urls.zone`.
+
+    The cache can be customized by subclassing, :func:`get`, :func:`set`,
+    :func:`invalidate` and :func:`clear` are the only methods used by the
+    manager.
+
+    Args:
+        policies (Dict[str, CachePolicy]): Caching policies by name of the
+            :mod:`~pymultimatic.api.urls` function.
+        max_size (int): Max number of cached responses, the least recently
+            used ones are evicted first.
+        clock (Callable[[], float]): Source of time, in seconds.
+    """
+
+    policies = attr.ib(type=Dict[str, CachePolicy],
+                       factory=lambda: dict(DEFAULT_POLICIES))
+    max_size = attr.ib(type=int, default=256)
+    clock = attr.ib(type=Callable[[], float], default=time.monotonic)
+    _entries = attr.ib(type='OrderedDict[str, _Entry]',
+                       factory=OrderedDict, init=False, repr=False)
+
+    # pylint: disable=unused-argument
+    def get(self, url_call: Callable[..., str], url: str) -> Optional[Any]:
+        """Get the cached response for the given url, if any and not expired.
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+
+        expires_at, _, response = entry
+        if expires_at <= self.clock():
+            del self._entries[url]
+            return None
+
+        self._entries.move_to_end(url)
+        return response
+
+    def set(self, url_call: Callable[..., str], url: str,
+            response: Any) -> None:
+        """Cache the response of the given url, according to the
+        :class:`CachePolicy` of the :mod:`~pymultimatic.api.urls` function.
+        """
+        policy = self.policies.get(url_call.__name__)
+        if policy is None or response is None:
+            return
+
+        self._entries[url] = (self.clock() + policy.ttl,
+                              policy.invalidate_on_write, response)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, url_call: Callable[..., str], url: str,
+                   **params: Any) -> None:
+        """Invalidate cached responses affected by a write on the given url.
+        """
+        url = url.split('?')[0]
+        stale = [key for key, (_, on_write, _) in self._entries.items()
+                 if on_write and _is_related(key.split('?')[0], url)]
+
+        for extra_call in _INVALIDATIONS.get(url_call.__name__, ()):
+            stale.append(extra_call(**params))
+
+        for key in stale:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _is_related(cached: str, written: str) -> bool:
+    return cached == written \
+        or written.startswith(cached + '/') \
+        or cached.startswith(written + '/')
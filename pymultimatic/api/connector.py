@@ -1,18 +1,25 @@
 """Low level connector module."""
+import asyncio
 import logging
+import time
 from typing import Any, Dict, Optional
 
 import attr
 import aiohttp
+from aiohttp.abc import AbstractCookieJar
 from yarl import URL
 
 from . import ApiError, urls, defaults
+from .metrics import MetricsRegistry, NETWORK_ERROR, UNKNOWN_ENDPOINT
+from .ratelimit import RateLimiter, parse_retry_after
+from .sessionstore import SessionStore
 
 _LOGGER = logging.getLogger('Connector')
 
 HEADER = {'content-type': 'application/json', 'Accept': 'application/json'}
 
 
+# pylint: disable=too-many-instance-attributes
 @attr.s
 class Connector:
     """This is the low level smart.vaillant.com API connector.
@@ -30,25 +37,54 @@ class Connector:
     also means the connector is able to reconnect automatically when cookie is
     outdated.
 
+    Concurrent ``GET`` requests to the same URL are coalesced: only one HTTP
+    request is sent and all callers receive the same decoded JSON, so the
+    response should not be mutated by the caller.
+
     Please use :mod:`~pymultimatic.api.urls` in order to generate URL to be
-    passed to the connector.64:36
+    passed to the connector.
 
     Args:
         user (str): User to login with.
         password (str): Password associated with the user.
         session: (aiohttp.ClientSession): Session.
         smartphone_id (str): This is required by the API to login.
+        session_store (SessionStore): If set, cookies are saved after login
+            and re-used on next login, instead of authenticating again.
+        cookie_jar (AbstractCookieJar): If set, cookies of the connector are
+            stored in this jar instead of the cookie jar of the session. This
+            allows many accounts to share the same session (and its connection
+            pool), the session should then be created with a
+            :class:`aiohttp.DummyCookieJar`.
+        rate_limiter (RateLimiter): If set, requests are paced by the limiter,
+            which is notified of every response, so it can slow down when the
+            API throttles (HTTP 429, or 409 for an hvac update).
+        base_url (str): If set, requests are sent to this URL instead of
+            :func:`~pymultimatic.api.urls.base`, e.g. to a
+            :class:`~pymultimatic.api.replay.ReplayServer`.
+        metrics (MetricsRegistry): If set, latency, size and status of each
+            response (or network error), and new logins triggered by an HTTP
+            401 are recorded, by endpoint.
     """
 
     _user = attr.ib(type=str)
     _password = attr.ib(type=str, repr=False)
     _session = attr.ib(type=aiohttp.ClientSession)
     _smartphone_id = attr.ib(type=str, default=defaults.SMARTPHONE_ID)
+    _session_store = attr.ib(type=Optional[SessionStore], default=None)
+    _cookie_jar = attr.ib(type=Optional[AbstractCookieJar], default=None)
+    _rate_limiter = attr.ib(type=Optional[RateLimiter], default=None)
+    _base_url = attr.ib(type=Optional[str], default=None)
+    _metrics = attr.ib(type=Optional[MetricsRegistry], default=None)
+    _in_flight = attr.ib(type=Dict[str, 'asyncio.Future[Any]'], factory=dict,
+                         init=False, repr=False)
 
     async def login(self, force: bool = False) -> bool:
         """Log in to the API.
 
-        By default, the ``connector`` will try to re-use cookies
+        By default, the ``connector`` will try to re-use cookies, either the
+        ones already received or the ones saved in the
+        :class:`~pymultimatic.api.sessionstore.SessionStore`.
 
         Args:
             force (bool): If set to ``True``, the connector will clear
@@ -64,8 +100,16 @@ class Connector:
         if self._get_cookies():
             return True
 
+        if not force and self._session_store is not None \
+                and self._session_store.load_cookies(
+                    self._jar(), self._url(urls.base())):
+            _LOGGER.debug('Re-using saved session')
+            return True
+
         token = await self._token()
         await self._authenticate(token)
+        if self._session_store is not None:
+            self._session_store.save_cookies(self._jar())
         return True
 
     async def is_logged(self) -> bool:
@@ -95,6 +139,8 @@ class Connector:
             return True
         finally:
             self._clear_cookies()
+            if self._session_store is not None:
+                self._session_store.clear()
 
     async def _token(self) -> str:
         params = {
@@ -103,9 +149,12 @@ class Connector:
             "password": self._password
         }
 
-        token_res = await self._session.post(url=urls.new_token(),
+        await self._acquire(None)
+        token_res = await self._session.post(url=self._url(urls.new_token()),
                                              json=params,
-                                             headers=HEADER)
+                                             headers=HEADER,
+                                             cookies=self._request_cookies())
+        self._on_response(None, token_res)
         if token_res.status == 200:
             json = await token_res.json()
             return str(json['body']['authToken'])
@@ -118,18 +167,60 @@ class Connector:
             "authToken": token
         }
 
-        auth_res = await self._session.post(url=urls.authenticate(),
+        await self._acquire(None)
+        auth_res = await self._session.post(url=self._url(urls.authenticate()),
                                             json=params,
-                                            headers=HEADER)
+                                            headers=HEADER,
+                                            cookies=self._request_cookies())
+        self._on_response(None, auth_res)
 
         if auth_res.status > 399:
             raise ApiError("Unable to authenticate", response=auth_res)
 
+    def _jar(self) -> AbstractCookieJar:
+        if self._cookie_jar is not None:
+            return self._cookie_jar
+        return self._session.cookie_jar
+
     def _get_cookies(self) -> Dict[Any, Any]:
-        return self._session.cookie_jar.filter_cookies(URL(urls.base()))
+        return self._jar().filter_cookies(URL(self._url(urls.base())))
 
     def _clear_cookies(self) -> None:
-        self._session.cookie_jar.clear()
+        self._jar().clear()
+
+    def _request_cookies(self) -> Optional[Dict[Any, Any]]:
+        """Cookies to send explicitly, when the connector has its own jar."""
+        if self._cookie_jar is None:
+            return None
+        return self._get_cookies()
+
+    def _update_cookies(self, response: aiohttp.ClientResponse) -> None:
+        if self._cookie_jar is not None:
+            self._cookie_jar.update_cookies(response.cookies, response.url)
+
+    async def _acquire(self, endpoint: Optional[str]) -> None:
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire(endpoint)
+
+    def _on_response(self, endpoint: Optional[str],
+                     response: aiohttp.ClientResponse) -> None:
+        self._update_cookies(response)
+        if self._rate_limiter is not None:
+            self._rate_limiter.on_response(
+                endpoint, response.status,
+                parse_retry_after(response.headers))
+
+    def _url(self, url: str) -> str:
+        if self._base_url is not None and url.startswith(urls.base()):
+            return self._base_url + url[len(urls.base()):]
+        return url
+
+    # pylint: disable=too-many-arguments
+    def _on_exchange(self, method: str, url: str, payload: Any,
+                     response: aiohttp.ClientResponse, body: bytes,
+                     elapsed: float) -> None:
+        """Called once the body of a response is received, except for
+        responses triggering a new login (HTTP 401)."""
 
     async def get(self, url: str,
                   payload: Optional[Dict[str, Any]] = None) -> Any:
@@ -152,23 +243,89 @@ class Connector:
         return await self.request('post', url, payload)
 
     async def request(self, method: str, url: str,
-                      payload: Optional[Dict[str, Any]] = None) -> Any:
-        """Do a request against vaillant API."""
-        async with self._session.request(
-                method,
-                url,
-                json=payload,
-                headers=HEADER
-        ) as resp:
-            if resp.status == 401:
-                await self.login(True)
-                return await self.request(method, url, payload)
-
-            if resp.status > 399:
-                # fetch response body, so it's available later on,
-                # since this is an error, this is not always json
-                await resp.read()
-                raise ApiError('Cannot ' + method + ' ' + url, response=resp,
-                               payload=payload)
+                      payload: Optional[Dict[str, Any]] = None,
+                      endpoint: Optional[str] = None) -> Any:
+        """Do a request against vaillant API.
+
+        A ``GET`` request for an URL which is already being requested by
+        another coroutine will wait for the pending response instead of
+        sending a new request.
 
-            return await resp.json(content_type=None)
+        Args:
+            method (str): HTTP method.
+            url (str): URL to request.
+            payload (dict): JSON payload to send.
+            endpoint (str): Name of the :mod:`~pymultimatic.api.urls` function
+                used to build the URL, used to apply the
+                :class:`~pymultimatic.api.ratelimit.RatePolicy` of the
+                endpoint.
+        """
+        if method == 'get' and payload is None:
+            return await self._coalesced_get(url, endpoint)
+        return await self._request(method, url, payload, endpoint)
+
+    async def _coalesced_get(self, url: str, endpoint: Optional[str]) -> Any:
+        future = self._in_flight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._request('get', url, endpoint=endpoint))
+            self._in_flight[url] = future
+
+            def _done(done: 'asyncio.Future[Any]') -> None:
+                if self._in_flight.get(url) is done:
+                    del self._in_flight[url]
+                # mark exception as retrieved, in case all waiters are gone
+                if not done.cancelled():
+                    done.exception()
+
+            future.add_done_callback(_done)
+        # shield, so a cancelled caller doesn't cancel the request of others
+        return await asyncio.shield(future)
+
+    async def _request(self, method: str, url: str,
+                       payload: Optional[Dict[str, Any]] = None,
+                       endpoint: Optional[str] = None) -> Any:
+        await self._acquire(endpoint)
+        started = time.monotonic()
+        # whether the status is recorded, the response may still fail later
+        recorded = False
+        try:
+            async with self._session.request(
+                    method,
+                    self._url(url),
+                    json=payload,
+                    headers=HEADER,
+                    cookies=self._request_cookies()
+            ) as resp:
+                self._on_response(endpoint, resp)
+                if resp.status == 401:
+                    if self._metrics is not None:
+                        name = endpoint or UNKNOWN_ENDPOINT
+                        self._metrics.record_request(
+                            name, resp.status, time.monotonic() - started, 0)
+                        self._metrics.record_relogin(name)
+                    recorded = True
+                    await self.login(True)
+                    return await self._request(method, url, payload, endpoint)
+
+                # fetch response body, so it's available later on,
+                # in case of error, this is not always json
+                body = await resp.read()
+                elapsed = time.monotonic() - started
+                if self._metrics is not None:
+                    self._metrics.record_request(
+                        endpoint or UNKNOWN_ENDPOINT, resp.status, elapsed,
+                        len(body))
+                recorded = True
+                self._on_exchange(method, url, payload, resp, body, elapsed)
+                if resp.status > 399:
+                    raise ApiError('Cannot ' + method + ' ' + url,
+                                   response=resp, payload=payload)
+
+                return await resp.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if self._metrics is not None and not recorded:
+                self._metrics.record_request(endpoint or UNKNOWN_ENDPOINT,
+                                             NETWORK_ERROR,
+                                             time.monotonic() - started, 0)
+            raise
@@ -0,0 +1,238 @@
+"""Lightweight metrics of the API calls: counters, status codes and
+histograms of durations, by endpoint."""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Counter, Dict, Iterator, List, Tuple
+
+import attr
+
+DEFAULT_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                  0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""Upper bounds (in seconds) of the buckets of the duration histograms."""
+
+UNKNOWN_ENDPOINT = 'other'
+"""Endpoint of the requests sent without the name of their
+:mod:`~pymultimatic.api.urls` function, e.g. during login."""
+
+NETWORK_ERROR = 0
+"""Status recorded for the requests without response, because of a
+connection error or a timeout."""
+
+Listener = Callable[[str, str, float], None]
+"""Called with the endpoint, the name of the metric (``request``,
+``latency``, ``bytes``, ``retry``, ``relogin``, ``validation``, ``mapping``)
+and the value (the status code for ``request``), each time a value is
+recorded."""
+
+
+@attr.s
+class Histogram:
+    """Histogram of durations, with fixed buckets.
+
+    Args:
+        bounds (Tuple[float, ...]): Upper bounds (included) of the buckets,
+            sorted, a last bucket holds the greater values.
+    """
+
+    bounds = attr.ib(type=Tuple[float, ...], default=DEFAULT_BOUNDS)
+    counts = attr.ib(type=List[int], init=False)
+    count = attr.ib(type=int, default=0, init=False)
+    total = attr.ib(type=float, default=0.0, init=False)
+
+    def __attrs_post_init__(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        """Record a value."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self) -> float:
+        """float: Mean of the values, 0 if there is none."""
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, quantile: float) -> float:
+        """Estimate a quantile of the values.
+
+        Args:
+            quantile (float): Quantile, between 0 and 1.
+
+        Returns:
+            float: Upper bound of the bucket of the quantile, ``inf`` if it's
+            the last bucket, 0 if there is no value.
+        """
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the histogram as a JSON serializable dict."""
+        return {'count': self.count, 'total': self.total,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95),
+                'p99': self.quantile(0.99),
+                'buckets': dict(zip([str(bound) for bound in self.bounds]
+                                    + ['inf'], self.counts))}
+
+
+# pylint: disable=too-many-instance-attributes
+@attr.s
+class EndpointMetrics:
+    """Metrics of an endpoint.
+
+    Args:
+        requests (int): Number of HTTP requests sent (coalesced ``GET``
+            requests are counted once).
+        bytes_received (int): Size of the response bodies.
+        retries (int): Number of calls retried, see
+            :func:`~pymultimatic.systemmanager.retry_async`.
+        relogins (int): Number of HTTP 401 which triggered a new login.
+        statuses (Counter[int]): Number of responses by status code,
+            requests without response are counted as :data:`NETWORK_ERROR`.
+        latency (Histogram): Time between the request and the response body.
+        validation (Histogram): Time spent validating the responses.
+        mapping (Histogram): Time spent mapping the responses to the model.
+    """
+
+    requests = attr.ib(type=int, default=0)
+    bytes_received = attr.ib(type=int, default=0)
+    retries = attr.ib(type=int, default=0)
+    relogins = attr.ib(type=int, default=0)
+    statuses = attr.ib(type=Counter[int], factory=Counter)
+    latency = attr.ib(type=Histogram, factory=Histogram)
+    validation = attr.ib(type=Histogram, factory=Histogram)
+    mapping = attr.ib(type=Histogram, factory=Histogram)
+
+    @property
+    def errors(self) -> int:
+        """int: Number of requests with an error status (4xx or 5xx) or
+        without response."""
+        return sum(count for status, count in self.statuses.items()
+                   if status > 399 or status == NETWORK_ERROR)
+
+    @property
+    def error_rate(self) -> float:
+        """float: Ratio of requests with an error status or without
+        response."""
+        return self.errors / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the metrics as a JSON serializable dict."""
+        return {'requests': self.requests,
+                'bytes_received': self.bytes_received,
+                'retries': self.retries,
+                'relogins': self.relogins,
+                'error_rate': self.error_rate,
+                'statuses': {str(status): count for status, count
+                             in sorted(self.statuses.items())},
+                'latency': self.latency.to_dict(),
+                'validation': self.validation.to_dict(),
+                'mapping': self.mapping.to_dict()}
+
+
+@attr.s
+class MetricsRegistry:
+    """Collects the metrics of the API calls, by name of the
+    :mod:`~pymultimatic.api.urls` function (``system``, ``live_report``,
+    ``hvac``, ...).
+
+    A registry is given to the
+    :class:`~pymultimatic.systemmanager.SystemManager` (or to the
+    :class:`~pymultimatic.api.connector.Connector`), without registry,
+    nothing is measured. A registry can be shared by many managers.
+
+    Args:
+        listeners (List[Listener]): Called each time a value is recorded,
+            e.g. to forward the values to a monitoring system.
+    """
+
+    listeners = attr.ib(type=List[Listener], factory=list)
+    _endpoints = attr.ib(type=Dict[str, EndpointMetrics], factory=dict,
+                         init=False)
+
+    def get(self, endpoint: str) -> EndpointMetrics:
+        """Get the metrics of an endpoint, they are created if needed."""
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints[endpoint] = EndpointMetrics()
+        return metrics
+
+    def endpoints(self) -> List[str]:
+        """Get the endpoints having metrics."""
+        return sorted(self._endpoints)
+
+    def record_request(self, endpoint: str, status: int, elapsed: float,
+                       size: int) -> None:
+        """Record a response.
+
+        Args:
+            endpoint (str): Name of the endpoint.
+            status (int): Status code, :data:`NETWORK_ERROR` if there is no
+                response.
+            elapsed (float): Seconds between the request and the body (or
+                the error).
+            size (int): Size of the body, in bytes.
+        """
+        metrics = self.get(endpoint)
+        metrics.requests += 1
+        metrics.statuses[status] += 1
+        metrics.latency.observe(elapsed)
+        metrics.bytes_received += size
+        self._notify(endpoint, 'request', status)
+        self._notify(endpoint, 'latency', elapsed)
+        self._notify(endpoint, 'bytes', size)
+
+    def record_retry(self, endpoint: str) -> None:
+        """Record a call being retried."""
+        self.get(endpoint).retries += 1
+        self._notify(endpoint, 'retry', 1)
+
+    def record_relogin(self, endpoint: str) -> None:
+        """Record an HTTP 401 triggering a new login."""
+        self.get(endpoint).relogins += 1
+        self._notify(endpoint, 'relogin', 1)
+
+    def record_duration(self, metric: str, endpoint: str,
+                        elapsed: float) -> None:
+        """Record the time spent on a response.
+
+        Args:
+            metric (str): ``validation`` or ``mapping``.
+            endpoint (str): Name of the endpoint.
+            elapsed (float): Duration, in seconds.
+        """
+        histogram: Histogram = getattr(self.get(endpoint), metric)
+        histogram.observe(elapsed)
+        self._notify(endpoint, metric, elapsed)
+
+    @contextmanager
+    def timed(self, metric: str, endpoint: str) -> Iterator[None]:
+        """Context manager recording the duration of its block, see
+        :func:`record_duration`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_duration(metric, endpoint,
+                                 time.perf_counter() - started)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the metrics of each endpoint as a JSON serializable dict."""
+        return {endpoint: self._endpoints[endpoint].to_dict()
+                for endpoint in self.endpoints()}
+
+    def reset(self) -> None:
+        """Forget every metric."""
+        self._endpoints.clear()
+
+    def _notify(self, endpoint: str, metric: str, value: float) -> None:
+        for listener in self.listeners:
+            listener(endpoint, metric, value)
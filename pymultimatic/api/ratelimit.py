@@ -0,0 +1,243 @@
+"""Client side rate limiting of the API calls."""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import attr
+
+_LOGGER = logging.getLogger('RateLimiter')
+
+THROTTLING_STATUSES = (429,)
+"""Status codes returned by the API when it's called too often, whatever the
+endpoint."""
+
+
+@attr.s(frozen=True)
+class RatePolicy:
+    """Rate limiting policy of an endpoint (or of all the endpoints).
+
+    Args:
+        rate (float): Max number of requests per second.
+        burst (float): Max number of requests which can be sent at once after
+            an idle period.
+        min_rate (float): Rate under which the limiter never goes, even if the
+            API keeps throttling. Default to 1/16 of ``rate``.
+        increase (float): How much the rate is increased (in requests per
+            second) after each successful request, until ``rate`` is reached
+            again. Default to 1/20 of ``rate``.
+        decrease (float): Factor applied to the rate when the API throttles.
+        throttling_statuses (Tuple[int, ...]): Status codes meaning the API
+            throttles. Some endpoints also return them for ordinary errors
+            (e.g. an HTTP 409 for a conflict), so they only decrease the rate
+            of the buckets having them in their policy.
+    """
+
+    rate = attr.ib(type=float)
+    burst = attr.ib(type=float, default=1)
+    min_rate = attr.ib(type=Optional[float], default=None)
+    increase = attr.ib(type=Optional[float], default=None)
+    decrease = attr.ib(type=float, default=0.5)
+    throttling_statuses = attr.ib(type=Tuple[int, ...],
+                                  default=THROTTLING_STATUSES)
+
+
+DEFAULT_POLICY = RatePolicy(rate=5, burst=10)
+"""Default global policy, for all the endpoints."""
+
+DEFAULT_POLICIES = {
+    'hvac_update': RatePolicy(rate=1 / 60, throttling_statuses=(409, 429)),
+}
+"""Default policies by name of the :mod:`~pymultimatic.api.urls` function.
+The API returns an HTTP 409 when an hvac update is requested too often."""
+
+
+@attr.s
+class TokenBucket:
+    """Token bucket with an adaptive refill rate.
+
+    The refill rate is decreased multiplicatively when the API throttles and
+    increased additively on success (AIMD), so the bucket converges to the
+    rate the API can sustain.
+
+    Waiting requests get their token in order of arrival.
+
+    Args:
+        policy (RatePolicy): Policy of the bucket.
+        clock (Callable[[], float]): Source of time, in seconds.
+        sleep (Callable[[float], Awaitable[Any]]): Function used to wait.
+    """
+
+    policy = attr.ib(type=RatePolicy)
+    clock = attr.ib(type=Callable[[], float], default=time.monotonic)
+    sleep = attr.ib(type=Callable[[float], Awaitable[Any]],
+                    default=asyncio.sleep)
+    rate = attr.ib(type=float, init=False)
+    _tokens = attr.ib(type=float, init=False)
+    _updated_at = attr.ib(type=float, init=False)
+    # tokens added since the creation of the bucket, a waiter gets its token
+    # when it reaches the count reserved before it
+    _refilled = attr.ib(type=float, init=False, default=0.0)
+
+    def __attrs_post_init__(self) -> None:
+        self.rate = self.policy.rate
+        self._tokens = self.policy.burst
+        self._updated_at = self.clock()
+
+    @property
+    def min_rate(self) -> float:
+        """float: Rate under which the bucket never goes."""
+        if self.policy.min_rate is not None:
+            return self.policy.min_rate
+        return self.policy.rate / 16
+
+    @property
+    def tokens(self) -> float:
+        """float: Number of available tokens, negative when requests are
+        waiting."""
+        self._refill()
+        return self._tokens
+
+    async def acquire(self) -> None:
+        """Take a token, waiting until one is available.
+
+        The rate may change while waiting (e.g. when the API throttles), so
+        the tokens are checked again after each sleep.
+        """
+        self._refill()
+        # tokens are reserved, a negative count is the queue of waiters
+        self._tokens -= 1
+        target = self._refilled - self._tokens
+        try:
+            while self._refilled < target:
+                await self.sleep((target - self._refilled) / self.rate)
+                self._refill()
+        except asyncio.CancelledError:
+            self._tokens += 1
+            raise
+
+    def on_success(self) -> None:
+        """Increase the rate after a successful request."""
+        increase = self.policy.increase
+        if increase is None:
+            increase = self.policy.rate / 20
+        self.rate = min(self.policy.rate, self.rate + increase)
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> None:
+        """Decrease the rate after the API throttled a request.
+
+        Args:
+            retry_after (float): Time (in seconds) to wait before the next
+                request, as requested by the API.
+        """
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.policy.decrease)
+        tokens = min(self._tokens, 0)
+        if retry_after:
+            tokens = min(tokens, -retry_after * self.rate)
+        # waiters are delayed by the removed tokens
+        self._refilled -= self._tokens - tokens
+        self._tokens = tokens
+
+    def _refill(self) -> None:
+        now = self.clock()
+        tokens = min(self.policy.burst,
+                     self._tokens + (now - self._updated_at) * self.rate)
+        self._refilled += tokens - self._tokens
+        self._tokens = tokens
+        self._updated_at = now
+
+
+@attr.s
+class RateLimiter:
+    """Paces requests done by the
+    :class:`~pymultimatic.api.connector.Connector`, using a global
+    :class:`TokenBucket` and one bucket per endpoint having a
+    :class:`RatePolicy`.
+
+    Rates are adapted when the API throttles, according to the
+    ``throttling_statuses`` of each policy: an HTTP 429 by default, but also
+    an HTTP 409 for ``hvac_update``. An HTTP 409 returned by other endpoints
+    (e.g. when removing a quick mode which is not set) is a conflict, it
+    doesn't slow down the limiter.
+
+    A limiter can be shared by many connectors to limit the global rate of
+    the application.
+
+    Args:
+        policy (RatePolicy): Global policy, ``None`` to only limit
+            endpoints.
+        policies (Dict[str, RatePolicy]): Policies by name of the
+            :mod:`~pymultimatic.api.urls` function.
+        clock (Callable[[], float]): Source of time, in seconds.
+        sleep (Callable[[float], Awaitable[Any]]): Function used to wait.
+    """
+
+    policy = attr.ib(type=Optional[RatePolicy], default=DEFAULT_POLICY)
+    policies = attr.ib(type=Dict[str, RatePolicy],
+                       factory=lambda: dict(DEFAULT_POLICIES))
+    clock = attr.ib(type=Callable[[], float], default=time.monotonic)
+    sleep = attr.ib(type=Callable[[float], Awaitable[Any]],
+                    default=asyncio.sleep)
+    _global = attr.ib(type=Optional[TokenBucket], init=False, repr=False)
+    _buckets = attr.ib(type=Dict[str, TokenBucket], factory=dict,
+                       init=False, repr=False)
+
+    def __attrs_post_init__(self) -> None:
+        self._global = self._bucket_for(self.policy)
+
+    def bucket(self, endpoint: Optional[str] = None) \
+            -> Optional[TokenBucket]:
+        """Get the bucket of the endpoint, or the global bucket if no endpoint
+        is given."""
+        if endpoint is None:
+            return self._global
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            bucket = self._bucket_for(self.policies.get(endpoint))
+            if bucket is not None:
+                self._buckets[endpoint] = bucket
+        return bucket
+
+    async def acquire(self, endpoint: Optional[str] = None) -> None:
+        """Wait until a request to the endpoint can be sent."""
+        bucket = self.bucket(endpoint)
+        if bucket is not None:
+            await bucket.acquire()
+        if self._global is not None:
+            await self._global.acquire()
+
+    def on_response(self, endpoint: Optional[str], status: int,
+                    retry_after: Optional[float] = None) -> None:
+        """Adapt rates according to the status of the response."""
+        buckets = [self.bucket(endpoint)]
+        if endpoint is not None:
+            buckets.append(self._global)
+
+        throttled = False
+        for bucket in buckets:
+            if bucket is None:
+                continue
+            if status in bucket.policy.throttling_statuses:
+                bucket.on_throttled(retry_after)
+                throttled = True
+            elif status < 400:
+                bucket.on_success()
+
+        if throttled:
+            _LOGGER.debug('Throttled on %s, new rate: %s', endpoint,
+                          [b.rate for b in buckets if b is not None])
+
+    def _bucket_for(self, policy: Optional[RatePolicy]) \
+            -> Optional[TokenBucket]:
+        if policy is None:
+            return None
+        return TokenBucket(policy, self.clock, self.sleep)
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """Parse the ``Retry-After`` header (in seconds), if any."""
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,336 @@
+"""Record and replay of API exchanges, to work offline.
+
+A :class:`RecordingConnector` captures every request sent to the API along
+with its response and how long it took. The resulting :class:`Recording` can
+be saved to a file and served by a :class:`ReplayServer`, a local HTTP server
+mimicking the API, with configurable latency, errors and concurrency. This
+allows to run (and load test) a
+:class:`~pymultimatic.systemmanager.SystemManager` without network::
+
+    async with ReplayServer(Recording.load('recording.json')) as server:
+        manager = SystemManager('user', 'pass', session,
+                                base_url=server.base_url)
+        system = await manager.get_system()
+"""
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import random
+from typing import (Any, Counter, Dict, Iterator, List, Optional, Set,
+                    Tuple)
+
+import attr
+import aiohttp
+from aiohttp import web
+from yarl import URL
+
+from . import urls
+from .connector import Connector
+
+_LOGGER = logging.getLogger('ReplayServer')
+
+_SESSION_COOKIE = 'JSESSIONID'
+_PREFIX = URL(urls.base()).path
+
+
+def _relative(url: str) -> Optional[str]:
+    if url.startswith(urls.base()):
+        return url[len(urls.base()):]
+    return None
+
+
+_TOKEN = _relative(urls.new_token())
+_AUTHENTICATE = _relative(urls.authenticate())
+_LOGOUT = _relative(urls.logout())
+
+
+@attr.s
+class RecordedExchange:
+    """A request and its response.
+
+    Args:
+        method (str): HTTP method, lower case.
+        path (str): Path (and query) of the URL, relative to
+            :func:`~pymultimatic.api.urls.base`.
+        status (int): HTTP status of the response.
+        body (str): Body of the response.
+        payload (Any): JSON payload of the request, if any.
+        elapsed (float): How long (in seconds) it took to receive the
+            response.
+    """
+
+    method = attr.ib(type=str)
+    path = attr.ib(type=str)
+    status = attr.ib(type=int)
+    body = attr.ib(type=str)
+    payload = attr.ib(type=Any, default=None)
+    elapsed = attr.ib(type=float, default=0.0)
+
+
+@attr.s
+class Recording:
+    """List of :class:`RecordedExchange`, in the order they happened.
+
+    Args:
+        exchanges (List[RecordedExchange]): Recorded exchanges.
+    """
+
+    exchanges = attr.ib(type=List[RecordedExchange], factory=list)
+
+    def add(self, exchange: RecordedExchange) -> None:
+        """Add an exchange to the recording."""
+        self.exchanges.append(exchange)
+
+    def find(self, method: str, path: str) -> List[RecordedExchange]:
+        """Get the exchanges recorded for a request.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path relative to :func:`~pymultimatic.api.urls.base`.
+
+        Returns:
+            List[RecordedExchange]: Matching exchanges, in the order they were
+            recorded.
+        """
+        method = method.lower()
+        return [exchange for exchange in self.exchanges
+                if exchange.method == method and exchange.path == path]
+
+    def save(self, path: str) -> None:
+        """Save the recording to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump([attr.asdict(exchange) for exchange in self.exchanges],
+                      file, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        """Load a recording saved by :func:`save`.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not a valid recording.
+        """
+        with open(path, 'r', encoding='utf-8') as file:
+            raw = json.load(file)
+        try:
+            return cls([RecordedExchange(**exchange) for exchange in raw])
+        except TypeError as exc:
+            raise ValueError('Invalid recording') from exc
+
+
+@attr.s
+class RecordingConnector(Connector):
+    """:class:`~pymultimatic.api.connector.Connector` adding every exchange
+    with the API to a :class:`Recording`.
+
+    Args:
+        recording (Recording): Where exchanges are added.
+    """
+
+    recording = attr.ib(type=Recording, factory=Recording)
+
+    # pylint: disable=too-many-arguments
+    def _on_exchange(self, method: str, url: str, payload: Any,
+                     response: aiohttp.ClientResponse, body: bytes,
+                     elapsed: float) -> None:
+        path = _relative(url)
+        if path is None:
+            _LOGGER.debug('Not recording %s, not an API url', url)
+            return
+        self.recording.add(RecordedExchange(
+            method, path, response.status,
+            body.decode('utf-8', errors='replace'), payload, elapsed))
+
+
+# pylint: disable=too-many-instance-attributes
+class ReplayServer:
+    """Local HTTP server replaying a :class:`Recording`.
+
+    The server handles the authentication endpoints itself: any user can
+    login and gets a session cookie, other endpoints answer HTTP 401 without
+    a valid session. When the same request was recorded many times, the
+    recorded responses are replayed in turn. A request which was not
+    recorded gets an HTTP 404.
+
+    Args:
+        recording (Recording): Exchanges to replay.
+        latency (float): Delay (in seconds) before responding, if ``None``,
+            the recorded delay is used.
+        jitter (float): Max random delay (in seconds) added to the latency.
+        errors (Dict[int, float]): Probability of responding with an HTTP
+            error instead of the recorded response, per status. An HTTP 401
+            also ends the session, an HTTP 409 or 429 comes with a
+            ``Retry-After`` header.
+        retry_after (float): Value of the ``Retry-After`` header.
+        max_concurrency (int): Max number of requests handled at the same
+            time, other requests wait for their turn.
+        seed (int): Seed of the random generator, for reproducible runs.
+        host (str): Address to listen on.
+        port (int): Port to listen on, by default, a free port is picked.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 recording: Recording,
+                 latency: Optional[float] = 0.0,
+                 jitter: float = 0.0,
+                 errors: Optional[Dict[int, float]] = None,
+                 retry_after: float = 1.0,
+                 max_concurrency: Optional[int] = None,
+                 seed: Optional[int] = None,
+                 host: str = '127.0.0.1',
+                 port: int = 0):
+        self._recording = recording
+        self._latency = latency
+        self._jitter = jitter
+        self._errors = errors or {}
+        self._retry_after = retry_after
+        self._max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._random = random.Random(seed)
+        self._host = host
+        self._port = port
+        self._runner: Optional[web.AppRunner] = None
+        self._base_url: Optional[str] = None
+        self._sessions: Set[str] = set()
+        self._session_ids = itertools.count()
+        self._replays: Dict[Tuple[str, str],
+                            Iterator[RecordedExchange]] = {}
+        self._in_flight = 0
+        self.max_in_flight = 0
+        self.statuses: Counter[int] = collections.Counter()
+
+    @property
+    def base_url(self) -> str:
+        """str: URL to pass to the
+        :class:`~pymultimatic.api.connector.Connector`."""
+        if self._base_url is None:
+            raise RuntimeError('Server is not started')
+        return self._base_url
+
+    async def start(self) -> str:
+        """Start the server.
+
+        Returns:
+            str: The base URL of the server, see :attr:`base_url`.
+        """
+        if self._max_concurrency:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        app = web.Application()
+        app.router.add_route('*', '/{path:.*}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        # cookies of an IP address are rejected by aiohttp cookie jar
+        host = 'localhost' if self._host == '127.0.0.1' else self._host
+        self._base_url = str(URL(urls.base()).with_scheme('http')
+                             .with_host(host).with_port(port))
+        _LOGGER.debug('Replaying %s exchanges on %s',
+                      len(self._recording.exchanges), self._base_url)
+        return self._base_url
+
+    async def close(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            self._base_url = None
+
+    async def __aenter__(self) -> 'ReplayServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if self._semaphore is None:
+            response = await self._count_in_flight(request)
+        else:
+            async with self._semaphore:
+                response = await self._count_in_flight(request)
+        self.statuses[response.status] += 1
+        return response
+
+    async def _count_in_flight(self, request: web.Request) -> web.Response:
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            return await self._respond(request)
+        finally:
+            self._in_flight -= 1
+
+    async def _respond(self, request: web.Request) -> web.Response:
+        path = request.raw_path
+        if path.startswith(_PREFIX):
+            path = path[len(_PREFIX):]
+        if path in (_TOKEN, _AUTHENTICATE):
+            await self._sleep(None)
+            return self._login(path)
+
+        session_id = request.cookies.get(_SESSION_COOKIE, '')
+        if session_id not in self._sessions:
+            return web.Response(status=401)
+        if path == _LOGOUT:
+            self._sessions.discard(session_id)
+            return web.json_response({})
+
+        error = self._pick_error()
+        if error is not None:
+            await self._sleep(None)
+            return self._error(error, session_id)
+
+        exchange = self._next_exchange(request.method.lower(), path)
+        if exchange is None:
+            return web.Response(status=404)
+        await self._sleep(exchange)
+        return web.Response(status=exchange.status, text=exchange.body,
+                            content_type='application/json')
+
+    def _login(self, path: str) -> web.Response:
+        if path == _TOKEN:
+            return web.json_response({'body': {'authToken': 'replay'}})
+        response = web.json_response({})
+        session_id = str(next(self._session_ids))
+        self._sessions.add(session_id)
+        response.set_cookie(_SESSION_COOKIE, session_id, path='/')
+        return response
+
+    def _pick_error(self) -> Optional[int]:
+        for status, probability in self._errors.items():
+            if self._random.random() < probability:
+                return status
+        return None
+
+    def _error(self, status: int, session_id: str) -> web.Response:
+        headers = {}
+        if status == 401:
+            self._sessions.discard(session_id)
+        elif status in (409, 429):
+            headers['Retry-After'] = str(self._retry_after)
+        return web.Response(status=status, headers=headers)
+
+    def _next_exchange(self, method: str,
+                       path: str) -> Optional[RecordedExchange]:
+        replay = self._replays.get((method, path))
+        if replay is None:
+            exchanges = self._recording.find(method, path)
+            if not exchanges:
+                return None
+            replay = itertools.cycle(exchanges)
+            self._replays[(method, path)] = replay
+        return next(replay)
+
+    async def _sleep(self, exchange: Optional[RecordedExchange]) -> None:
+        if self._latency is None:
+            delay = exchange.elapsed if exchange is not None else 0.0
+        else:
+            delay = self._latency
+        if self._jitter:
+            delay += self._random.uniform(0, self._jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -1,9 +1,15 @@
 """Expected API response schemas"""
 # pylint: disable=fixme
+import re
+
 from schema import Schema, Optional, Or, And
 
 non_empty_str = And(str, len)  # pylint: disable=invalid-name
 numeric = Or(int, float)  # pylint: disable=invalid-name
+# daily reports are keyed by YYYY-MM-DDTHH:mm[:ss], weekly and monthly
+# reports by YYYY-MM-DD, yearly reports by YYYY-MM
+_ENERGY_DATE = re.compile(
+    '[0-9]{4}-[0-9]{2}(-[0-9]{2}([T ][0-9]{2}:[0-9]{2}(:[0-9]{2})?)?)?$')
 
 FACILITIES = Schema({
     'body': {
@@ -198,3 +204,24 @@ LIVE_REPORT = Schema({
         }],
     },
 }, ignore_extra_keys=True)
+
+
+EMF_DEVICES = Schema({
+    'body': [{
+        'id': non_empty_str,
+        'reports': [{
+            'energyType': non_empty_str,  # TODO: ENUM
+            'function': non_empty_str,  # TODO: ENUM
+        }],
+    }],
+}, ignore_extra_keys=True)
+
+
+EMF_REPORT = Schema({
+    'body': {
+        'dataset': [{
+            'key': And(str, _ENERGY_DATE.match),
+            'value': numeric,
+        }],
+    },
+}, ignore_extra_keys=True)
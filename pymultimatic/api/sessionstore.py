@@ -0,0 +1,122 @@
+"""On disk persistence of the API session."""
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+import attr
+from aiohttp import CookieJar
+from aiohttp.abc import AbstractCookieJar
+from yarl import URL
+
+from . import urls
+
+_LOGGER = logging.getLogger('SessionStore')
+
+
+@attr.s
+class SessionStore:
+    """Persists the session (cookies, serial number and when the session was
+    saved) in a directory, so a new process can re-use it instead of doing the
+    authentication again.
+
+    Note:
+        A store should only be used by one account.
+
+    Args:
+        path (str): Directory where the session is saved, it is created if
+            needed.
+        max_age (float): Max age (in seconds) of saved cookies, older cookies
+            are not loaded.
+        clock (Callable[[], float]): Source of time, in seconds since epoch.
+    """
+
+    COOKIES_FILE = 'cookies'
+    METADATA_FILE = 'session.json'
+
+    path = attr.ib(type=str)
+    max_age = attr.ib(type=float, default=12 * 3600)
+    clock = attr.ib(type=Callable[[], float], default=time.time)
+
+    def load_cookies(self, cookie_jar: AbstractCookieJar,
+                     url: Optional[str] = None) -> bool:
+        """Load saved cookies into the cookie jar.
+
+        Args:
+            cookie_jar (AbstractCookieJar): Where cookies are loaded.
+            url (str): Base URL of the API the cookies are sent to, by
+                default :func:`~pymultimatic.api.urls.base`.
+
+        Returns:
+            bool: True if cookies were loaded, False if there are no cookies
+            or they are expired.
+        """
+        saved_at = self._read_metadata().get('saved_at')
+        if saved_at is None or self.clock() - saved_at > self.max_age:
+            return False
+
+        saved = CookieJar()
+        try:
+            saved.load(self._file(self.COOKIES_FILE))
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.debug('Cannot load cookies', exc_info=True)
+            return False
+
+        cookies = {morsel.key: morsel for morsel in saved}
+        if not cookies:
+            return False
+
+        cookie_jar.update_cookies(cookies, URL(url or urls.base()))
+        return True
+
+    def save_cookies(self, cookie_jar: AbstractCookieJar) -> None:
+        """Save cookies of the cookie jar, along with the current time."""
+        if not isinstance(cookie_jar, CookieJar):
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        cookies_file = self._file(self.COOKIES_FILE)
+        cookie_jar.save(cookies_file + '.tmp')
+        os.replace(cookies_file + '.tmp', cookies_file)
+
+        metadata = self._read_metadata()
+        metadata['saved_at'] = self.clock()
+        self._write_metadata(metadata)
+
+    def load_serial(self) -> Optional[str]:
+        """Get the saved serial number, if any."""
+        serial = self._read_metadata().get('serial')
+        return str(serial) if serial else None
+
+    def save_serial(self, serial: str) -> None:
+        """Save the serial number."""
+        os.makedirs(self.path, exist_ok=True)
+        metadata = self._read_metadata()
+        metadata['serial'] = serial
+        self._write_metadata(metadata)
+
+    def clear(self) -> None:
+        """Remove the saved session."""
+        for name in (self.COOKIES_FILE, self.METADATA_FILE):
+            try:
+                os.remove(self._file(name))
+            except FileNotFoundError:
+                pass
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_metadata(self) -> Dict[str, Any]:
+        try:
+            with open(self._file(self.METADATA_FILE), 'r', encoding='utf-8') as file:
+                metadata = json.load(file)
+                return metadata if isinstance(metadata, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_metadata(self, metadata: Dict[str, Any]) -> None:
+        metadata_file = self._file(self.METADATA_FILE)
+        with open(metadata_file + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(metadata, file)
+        os.replace(metadata_file + '.tmp', metadata_file)
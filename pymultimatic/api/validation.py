@@ -0,0 +1,277 @@
+"""Fast validation of API responses.
+
+:mod:`~pymultimatic.api.schemas` are compiled into specialized functions,
+checking responses in place: unlike :func:`schema.Schema.validate`, the
+response is not copied and extra keys are kept. When a response is invalid,
+:func:`schema.Schema.validate` is called in order to raise the usual
+:exc:`schema.SchemaError`.
+
+Only the constructs used by :mod:`~pymultimatic.api.schemas` are compiled
+(types, literals, predicates, dicts with literal keys, lists, ``And``,
+``Or`` and ``Optional``), other schemas are validated with
+:func:`schema.Schema.validate`.
+
+A :class:`ValidationPolicy` decides which responses are validated.
+"""
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, List, Optional as Opt, \
+    Set, Tuple
+
+import attr
+from schema import And, Optional, Or, Schema
+
+Validator = Callable[[Any], bool]
+
+_COMPILED: Dict[int, Tuple[Schema, Opt[Validator]]] = {}
+
+
+class _Unsupported(Exception):
+    """Raised when a schema cannot be compiled."""
+
+
+def validate(schema: Schema, data: Any) -> Any:
+    """Validate data against the schema.
+
+    Returns:
+        The data itself, if valid.
+
+    Raises:
+        SchemaError: if data is not valid.
+    """
+    validator = compile_schema(schema)
+    if validator is not None and validator(data):
+        return data
+    return schema.validate(data)
+
+
+class ValidationMode(Enum):
+    """How responses are validated."""
+
+    STRICT = 'strict'
+    """Every response is validated."""
+
+    SAMPLED = 'sampled'
+    """The first responses of an endpoint are validated, then only a sample
+    of them, or when the shape of the response changes."""
+
+    OFF = 'off'
+    """Responses are trusted."""
+
+
+@attr.s
+class _EndpointState:
+    shape = attr.ib(type=Hashable)
+    count = attr.ib(type=int, default=0)
+
+
+@attr.s
+class ValidationPolicy:
+    """Decides whether a response should be validated.
+
+    In :attr:`ValidationMode.SAMPLED` mode, the ``warmup`` first responses of
+    each endpoint are validated, then one in ``sample_rate``. When the shape
+    of a response (see :func:`shape`) is different from the previous one,
+    the endpoint starts a new warmup, and so does it when a validation fails.
+
+    Args:
+        mode (ValidationMode): Validation mode.
+        warmup (int): Number of responses always validated, per endpoint.
+        sample_rate (int): After the warmup, one response in ``sample_rate``
+            is validated.
+    """
+
+    mode = attr.ib(type=ValidationMode, default=ValidationMode.STRICT)
+    warmup = attr.ib(type=int, default=10)
+    sample_rate = attr.ib(type=int, default=50)
+    _states = attr.ib(type=Dict[str, _EndpointState], factory=dict,
+                      init=False, repr=False)
+
+    def should_validate(self, endpoint: str, data: Any) -> bool:
+        """Checks if the response of the endpoint should be validated."""
+        if self.mode is ValidationMode.STRICT:
+            return True
+        if self.mode is ValidationMode.OFF:
+            return False
+
+        data_shape = shape(data)
+        state = self._states.get(endpoint)
+        if state is None or state.shape != data_shape:
+            state = _EndpointState(data_shape)
+            self._states[endpoint] = state
+
+        state.count += 1
+        if state.count <= self.warmup:
+            return True
+        return (state.count - self.warmup) % self.sample_rate == 0
+
+    def on_invalid(self, endpoint: str) -> None:
+        """Start a new warmup for the endpoint, after a validation failed."""
+        self._states.pop(endpoint, None)
+
+
+def shape(data: Any) -> Hashable:
+    """Get the shape of the data: keys of dicts and types of values. Only the
+    first item of lists is taken into account, to keep it cheap.
+    """
+    if isinstance(data, dict):
+        return tuple((key, shape(value)) for key, value in data.items())
+    if isinstance(data, list):
+        return ('list', shape(data[0]) if data else None)
+    return type(data).__name__
+
+
+def compile_schema(schema: Schema) -> Opt[Validator]:
+    """Compile the schema into a function returning whether data is valid.
+
+    Compiled functions are cached by schema.
+
+    Returns:
+        Validator: the compiled function, ``None`` if the schema uses
+        constructs which cannot be compiled.
+    """
+    compiled = _COMPILED.get(id(schema))
+    if compiled is None or compiled[0] is not schema:
+        try:
+            validator: Opt[Validator] = _compile(schema, False)
+        except _Unsupported:
+            validator = None
+        # keep a reference to the schema, so its id is not reused
+        compiled = (schema, validator)
+        _COMPILED[id(schema)] = compiled
+    return compiled[1]
+
+
+def _compile(schema: Any, ignore_extra_keys: bool) -> Validator:
+    # pylint: disable=too-many-return-statements
+    if isinstance(schema, Optional):
+        # outside of a dict key, Optional is validated as its schema
+        if hasattr(schema, 'default'):
+            raise _Unsupported(schema)
+        return _compile(schema.schema, schema.ignore_extra_keys)
+    if isinstance(schema, Schema):
+        if type(schema) is not Schema:  # pylint: disable=unidiomatic-typecheck
+            raise _Unsupported(schema)
+        return _compile(schema.schema, schema.ignore_extra_keys)
+    if isinstance(schema, And):
+        return _compile_and_or(schema)
+    if isinstance(schema, dict):
+        return _compile_dict(schema, ignore_extra_keys)
+    if type(schema) in (list, tuple, set, frozenset):
+        return _compile_iterable(schema, ignore_extra_keys)
+    if isinstance(schema, type):
+        return _compile_type(schema)
+    if hasattr(schema, 'validate'):
+        raise _Unsupported(schema)
+    if callable(schema):
+        return _compile_callable(schema)
+    return lambda data: bool(data == schema)
+
+
+def _compile_type(schema: type) -> Validator:
+    if schema is int:
+        return lambda data: isinstance(data, int) \
+            and not isinstance(data, bool)
+    return lambda data: isinstance(data, schema)
+
+
+def _compile_callable(schema: Callable[[Any], Any]) -> Validator:
+    def _validator(data: Any) -> bool:
+        try:
+            return bool(schema(data))
+        except Exception:  # pylint: disable=broad-except
+            return False
+    return _validator
+
+
+def _compile_and_or(schema: And) -> Validator:  # type: ignore
+    # pylint: disable=protected-access
+    if getattr(schema, 'only_one', False) or schema._error:
+        raise _Unsupported(schema)
+
+    validators = [_compile(arg, schema._ignore_extra_keys)
+                  for arg in schema.args]
+    if len(validators) == 1:
+        return validators[0]
+
+    if isinstance(schema, Or):
+        return lambda data: any(validator(data) for validator in validators)
+    return lambda data: all(validator(data) for validator in validators)
+
+
+def _compile_iterable(schema: Any, ignore_extra_keys: bool) -> Validator:
+    kind = type(schema)
+    validators = [_compile(item, ignore_extra_keys) for item in schema]
+
+    if len(validators) == 1:
+        validator = validators[0]
+
+        def _single(data: Any) -> bool:
+            return isinstance(data, kind) \
+                and all(validator(item) for item in data)
+        return _single
+
+    def _many(data: Any) -> bool:
+        return isinstance(data, kind) \
+            and all(any(validator(item) for validator in validators)
+                    for item in data)
+    return _many
+
+
+def _literal_keys(key: Any) -> Tuple[List[Hashable], bool]:
+    """Get data keys matched by a schema key and whether it's required."""
+    required = True
+    if isinstance(key, Optional):
+        if hasattr(key, 'default'):
+            raise _Unsupported(key)
+        # pylint: disable=protected-access
+        key, required = key._schema, False
+
+    if isinstance(key, Or):
+        # pylint: disable=protected-access
+        if key.only_one or key._error:
+            raise _Unsupported(key)
+        keys: List[Hashable] = []
+        for arg in key._args:
+            keys.extend(_literal_keys(arg)[0])
+        return keys, required
+
+    if isinstance(key, (str, int, float)) and not isinstance(key, bool):
+        return [key], required
+
+    raise _Unsupported(key)
+
+
+def _key_priority(key: Any) -> float:
+    # pylint: disable=protected-access
+    return Schema._dict_key_priority(key)
+
+
+def _compile_dict(schema: Dict[Any, Any], ignore_extra_keys: bool) \
+        -> Validator:
+    entries: Dict[Hashable, Tuple[int, Validator]] = {}
+    required: Set[int] = set()
+
+    # schema matches a data key with the first schema key, by priority
+    for index, key in enumerate(sorted(schema, key=_key_priority)):
+        literals, is_required = _literal_keys(key)
+        validator = _compile(schema[key], ignore_extra_keys)
+        for literal in literals:
+            entries.setdefault(literal, (index, validator))
+        if is_required:
+            required.add(index)
+
+    def _validator(data: Any) -> bool:
+        if not isinstance(data, dict):
+            return False
+        covered: Set[int] = set()
+        for key, value in data.items():
+            entry = entries.get(key)
+            if entry is None:
+                if ignore_extra_keys:
+                    continue
+                return False
+            if not entry[1](value):
+                return False
+            covered.add(entry[0])
+        return required <= covered
+    return _validator
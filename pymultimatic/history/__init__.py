@@ -0,0 +1,3 @@
+"""History of the values reported by the API."""
+from .rollup import RollupEngine
+from .store import SeriesStore
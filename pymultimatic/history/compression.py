@@ -0,0 +1,276 @@
+"""Compression of time series, in the style of Gorilla (Facebook's time
+series database).
+
+Timestamps are stored with a millisecond precision, as the difference
+between two consecutive deltas (delta of delta): sensors are polled at a
+fixed interval, so it's often zero and takes a single bit. Values are stored
+as the XOR of their binary representation with the previous value: slowly
+changing values (temperatures, pressures) share their sign, exponent and
+first bits of mantissa with the previous value, so only the few meaningful
+bits in the middle are stored. Values are not altered.
+"""
+import mmap
+import struct
+from array import array
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+_MAGIC = b'PMGZ'
+_VERSION = 1
+# magic, version, number of points, first and last timestamps (ms)
+_HEADER = struct.Struct('<4sIIqq')
+_DOUBLE = struct.Struct('<d')
+_UINT64 = struct.Struct('<Q')
+
+# delta of delta: (prefix, number of bits of the prefix, bits of the value)
+_DOD_BUCKETS = ((0b10, 2, 7), (0b110, 3, 12), (0b1110, 4, 20))
+_DOD_LARGE = (0b1111, 4, 64)
+_FIRST_DELTA_BITS = 64
+
+Data = Union[bytes, bytearray, mmap.mmap]
+"""Compressed series, e.g. read from a file or memory mapped."""
+
+
+class BitWriter:
+    """Writes integers of any number of bits, most significant bit first."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._current = 0
+        self._bits = 0
+        self.length = 0
+        """int: Number of bits written."""
+
+    def write(self, value: int, bits: int) -> None:
+        """Write the ``bits`` lowest bits of the value."""
+        self.length += bits
+        self._current = (self._current << bits) | (value & ((1 << bits) - 1))
+        self._bits += bits
+        while self._bits >= 8:
+            self._bits -= 8
+            self._buffer.append((self._current >> self._bits) & 0xFF)
+        self._current &= (1 << self._bits) - 1
+
+    def getvalue(self) -> bytes:
+        """Written bits, padded with zeros to a full byte."""
+        if self._bits:
+            return bytes(self._buffer) \
+                + bytes([(self._current << (8 - self._bits)) & 0xFF])
+        return bytes(self._buffer)
+
+
+class BitReader:
+    """Reads integers written by a :class:`BitWriter`."""
+
+    def __init__(self, data: Data, offset: int = 0) -> None:
+        self._data = data
+        self._position = offset * 8
+
+    def read(self, bits: int) -> int:
+        """Read an unsigned integer of ``bits`` bits.
+
+        Raises:
+            EOFError: If there are not enough bits.
+        """
+        end = self._position + bits
+        if end > len(self._data) * 8:
+            raise EOFError('Not enough data')
+        first = self._position // 8
+        last = (end + 7) // 8
+        chunk = int.from_bytes(self._data[first:last], 'big')
+        value = (chunk >> (last * 8 - end)) & ((1 << bits) - 1)
+        self._position = end
+        return value
+
+    def read_bit(self) -> int:
+        """Read a single bit."""
+        return self.read(1)
+
+
+def _signed(value: int, bits: int) -> int:
+    if value >= 1 << (bits - 1):
+        return value - (1 << bits)
+    return value
+
+
+def _to_ms(timestamp: float) -> int:
+    return int(round(timestamp * 1000))
+
+
+class Encoder:
+    """Streaming encoder of a series, points are appended one by one and the
+    compressed series is available at any time.
+    """
+
+    def __init__(self) -> None:
+        self._writer = BitWriter()
+        self.count = 0
+        """int: Number of points."""
+        self.first_timestamp = 0
+        self.last_timestamp = 0
+        self._delta = 0
+        self._value = 0
+        # leading and trailing zeros of the last stored meaningful bits
+        self._window: Optional[Tuple[int, int]] = None
+
+    def append(self, timestamp: float, value: float) -> None:
+        """Append a point, the timestamp is rounded to the millisecond.
+
+        Raises:
+            ValueError: If the timestamp is before the last one.
+        """
+        time_ms = _to_ms(timestamp)
+        bits = _UINT64.unpack(_DOUBLE.pack(value))[0]
+        if self.count == 0:
+            self.first_timestamp = time_ms
+            self._writer.write(bits, 64)
+        else:
+            if time_ms < self.last_timestamp:
+                raise ValueError('Timestamp {} is before {}'.format(
+                    timestamp, self.last_timestamp / 1000))
+            delta = time_ms - self.last_timestamp
+            if self.count == 1:
+                self._writer.write(delta, _FIRST_DELTA_BITS)
+            else:
+                self._write_dod(delta - self._delta)
+            self._delta = delta
+            self._write_value(bits)
+        self.last_timestamp = time_ms
+        self._value = bits
+        self.count += 1
+
+    def extend(self, points: Iterable[Tuple[float, float]]) -> None:
+        """Append many points."""
+        for timestamp, value in points:
+            self.append(timestamp, value)
+
+    def getvalue(self) -> bytes:
+        """Get the compressed series, see :func:`decode`."""
+        return _HEADER.pack(_MAGIC, _VERSION, self.count,
+                            self.first_timestamp, self.last_timestamp) \
+            + self._writer.getvalue()
+
+    def _write_dod(self, dod: int) -> None:
+        if dod == 0:
+            self._writer.write(0, 1)
+            return
+        for prefix, prefix_bits, bits in _DOD_BUCKETS:
+            if -(1 << (bits - 1)) <= dod < 1 << (bits - 1):
+                self._writer.write(prefix, prefix_bits)
+                self._writer.write(dod, bits)
+                return
+        prefix, prefix_bits, bits = _DOD_LARGE
+        self._writer.write(prefix, prefix_bits)
+        self._writer.write(dod, bits)
+
+    def _write_value(self, bits: int) -> None:
+        xor = bits ^ self._value
+        if xor == 0:
+            self._writer.write(0, 1)
+            return
+        self._writer.write(1, 1)
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if self._window is not None and leading >= self._window[0] \
+                and trailing >= self._window[1]:
+            # meaningful bits fit in the window of the previous value
+            self._writer.write(0, 1)
+            self._writer.write(xor >> self._window[1],
+                               64 - self._window[0] - self._window[1])
+            return
+        meaningful = 64 - leading - trailing
+        self._writer.write(1, 1)
+        self._writer.write(leading, 5)
+        self._writer.write(meaningful - 1, 6)
+        self._writer.write(xor >> trailing, meaningful)
+        self._window = (leading, trailing)
+
+
+def header(data: Data) -> Tuple[int, float, float]:
+    """Read the header of a compressed series.
+
+    Returns:
+        Tuple[int, float, float]: Number of points, first and last
+        timestamps.
+
+    Raises:
+        ValueError: If the data is not a compressed series.
+    """
+    try:
+        magic, version, count, first, last = _HEADER.unpack_from(data)
+    except struct.error as exc:
+        raise ValueError('Invalid compressed series') from exc
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError('Unsupported compressed series')
+    return count, first / 1000, last / 1000
+
+
+def decode(data: Data) -> Iterator[Tuple[float, float]]:
+    """Decode a compressed series, points are decoded while iterating.
+
+    Args:
+        data (Data): Compressed series, see :func:`Encoder.getvalue`.
+
+    Returns:
+        Iterator[Tuple[float, float]]: Timestamps (in seconds) and values.
+
+    Raises:
+        ValueError: If the data is not a valid compressed series.
+    """
+    count, first, _ = header(data)
+    reader = BitReader(data, _HEADER.size)
+    try:
+        yield from _decode(reader, count, _to_ms(first))
+    except EOFError as exc:
+        raise ValueError('Truncated compressed series') from exc
+
+
+def decode_arrays(data: Data) -> Tuple['array[float]', 'array[float]']:
+    """Decode a compressed series into arrays of timestamps and values."""
+    timestamps: 'array[float]' = array('d')
+    values: 'array[float]' = array('d')
+    for timestamp, value in decode(data):
+        timestamps.append(timestamp)
+        values.append(value)
+    return timestamps, values
+
+
+def encode(points: Iterable[Tuple[float, float]]) -> bytes:
+    """Compress a series at once, see :class:`Encoder`."""
+    encoder = Encoder()
+    encoder.extend(points)
+    return encoder.getvalue()
+
+
+def _decode(reader: BitReader, count: int,
+            time_ms: int) -> Iterator[Tuple[float, float]]:
+    if count == 0:
+        return
+    bits = reader.read(64)
+    yield time_ms / 1000, _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+    delta = 0
+    leading = 0
+    meaningful = 0
+    for idx in range(1, count):
+        if idx == 1:
+            delta = reader.read(_FIRST_DELTA_BITS)
+        else:
+            delta += _read_dod(reader)
+        time_ms += delta
+
+        if reader.read_bit():
+            if reader.read_bit():
+                leading = reader.read(5)
+                meaningful = reader.read(6) + 1
+            bits ^= reader.read(meaningful) << (64 - leading - meaningful)
+        yield time_ms / 1000, _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+
+def _read_dod(reader: BitReader) -> int:
+    if not reader.read_bit():
+        return 0
+    for _, _, bits in _DOD_BUCKETS:
+        if not reader.read_bit():
+            return _signed(reader.read(bits), bits)
+    bits = _DOD_LARGE[2]
+    return _signed(reader.read(bits), bits)
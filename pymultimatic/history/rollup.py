@@ -0,0 +1,340 @@
+"""Incremental rollups of series: count, sum, min and max of the values per
+bucket, maintained at several resolutions as values are added."""
+import calendar
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import attr
+
+from .store import add_all, check_timestamp, system_values
+from ..model import EnergyHistory, Report, System
+
+Key = Tuple[str, ...]
+"""Key of a series, see :data:`~pymultimatic.history.store.Key`, energy
+series are keyed by device id, energy type and function."""
+
+RESOLUTIONS = ('hour', 'day', 'month')
+"""Resolutions of the rollups, from the finest to the coarsest. Buckets are
+aligned on UTC, like the timestamps of
+:class:`~pymultimatic.model.energy.EnergySeries`."""
+
+_SECONDS = {'hour': 3600, 'day': 86400}
+
+
+def bucket_start(timestamp: float, resolution: str) -> float:
+    """Get the start of the bucket containing a timestamp.
+
+    Args:
+        timestamp (float): Seconds since epoch.
+        resolution (str): See :data:`RESOLUTIONS`.
+
+    Returns:
+        float: Start of the bucket, in seconds since epoch.
+    """
+    if resolution == 'month':
+        value = datetime.fromtimestamp(timestamp, timezone.utc)
+        return datetime(value.year, value.month, 1,
+                        tzinfo=timezone.utc).timestamp()
+    return timestamp - timestamp % _SECONDS[resolution]
+
+
+def bucket_end(start: float, resolution: str) -> float:
+    """Get the end (excluded) of the bucket starting at ``start``."""
+    if resolution == 'month':
+        value = datetime.fromtimestamp(start, timezone.utc)
+        days = calendar.monthrange(value.year, value.month)[1]
+        return start + days * 86400
+    return start + _SECONDS[resolution]
+
+
+def _next_start(timestamp: float, resolution: str) -> float:
+    # first bucket start at or after the timestamp
+    start = bucket_start(timestamp, resolution)
+    return start if start == timestamp else bucket_end(start, resolution)
+
+
+@attr.s(frozen=True, slots=True)
+class Bucket:
+    """Aggregated values of a series between two timestamps.
+
+    Args:
+        start (float): Start of the bucket, in seconds since epoch.
+        end (float): End of the bucket (excluded).
+        count (int): Number of values.
+        total (float): Sum of the values.
+        minimum (float): Min value.
+        maximum (float): Max value.
+    """
+
+    start = attr.ib(type=float)
+    end = attr.ib(type=float)
+    count = attr.ib(type=int)
+    total = attr.ib(type=float)
+    minimum = attr.ib(type=float)
+    maximum = attr.ib(type=float)
+
+    @property
+    def mean(self) -> float:
+        """float: Mean of the values."""
+        return self.total / self.count
+
+    def merge(self, other: 'Bucket') -> 'Bucket':
+        """Merge two buckets into a bucket covering both."""
+        return Bucket(min(self.start, other.start), max(self.end, other.end),
+                      self.count + other.count, self.total + other.total,
+                      min(self.minimum, other.minimum),
+                      max(self.maximum, other.maximum))
+
+
+class _Level:
+    """Buckets of a series at a resolution, stored in columns."""
+
+    def __init__(self, resolution: str) -> None:
+        self.resolution = resolution
+        self.starts: 'array[float]' = array('d')
+        self.counts: 'array[int]' = array('q')
+        self.totals: 'array[float]' = array('d')
+        self.minimums: 'array[float]' = array('d')
+        self.maximums: 'array[float]' = array('d')
+        # last bucket before the last value was added, None if the last
+        # value started it
+        self._previous: Optional[Tuple[int, float, float, float]] = None
+
+    def add(self, timestamp: float, value: float) -> None:
+        """Add a value, timestamps are increasing."""
+        start = bucket_start(timestamp, self.resolution)
+        if not self.starts or self.starts[-1] != start:
+            self._previous = None
+            self.starts.append(start)
+            self.counts.append(1)
+            self.totals.append(value)
+            self.minimums.append(value)
+            self.maximums.append(value)
+            return
+        self._previous = (self.counts[-1], self.totals[-1],
+                          self.minimums[-1], self.maximums[-1])
+        self.counts[-1] += 1
+        self.totals[-1] += value
+        self.minimums[-1] = min(self.minimums[-1], value)
+        self.maximums[-1] = max(self.maximums[-1], value)
+
+    def replace_last(self, timestamp: float, value: float) -> None:
+        """Replace the last value added, at the given timestamp."""
+        if self._previous is None:
+            for column in (self.starts, self.counts, self.totals,
+                           self.minimums, self.maximums):
+                column.pop()
+        else:
+            (self.counts[-1], self.totals[-1], self.minimums[-1],
+             self.maximums[-1]) = self._previous
+        self.add(timestamp, value)
+
+    def buckets(self, start: float, end: float) -> List[Bucket]:
+        """Buckets starting between start (included) and end (excluded)."""
+        low = bisect_left(self.starts, start)
+        high = bisect_left(self.starts, end)
+        return [Bucket(self.starts[idx],
+                       bucket_end(self.starts[idx], self.resolution),
+                       self.counts[idx], self.totals[idx],
+                       self.minimums[idx], self.maximums[idx])
+                for idx in range(low, high)]
+
+    def aggregate(self, start: float, end: float) -> Optional[Bucket]:
+        """Merge the buckets starting between start (included) and end
+        (excluded)."""
+        low = bisect_left(self.starts, start)
+        high = bisect_left(self.starts, end)
+        if low == high:
+            return None
+        return Bucket(self.starts[low],
+                      bucket_end(self.starts[high - 1], self.resolution),
+                      sum(self.counts[low:high]), sum(self.totals[low:high]),
+                      min(self.minimums[low:high]),
+                      max(self.maximums[low:high]))
+
+
+class _Rollup:
+    """Levels of a series, from the finest to the coarsest."""
+
+    def __init__(self, resolutions: Sequence[str]) -> None:
+        self.levels = [_Level(resolution) for resolution in resolutions]
+        self.last_timestamp: Optional[float] = None
+
+
+def _merge(first: Optional[Bucket],
+           second: Optional[Bucket]) -> Optional[Bucket]:
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return first.merge(second)
+
+
+def _resolutions(value: Iterable[str]) -> Tuple[str, ...]:
+    resolutions = set(value)
+    unknown = resolutions.difference(RESOLUTIONS)
+    if unknown or not resolutions:
+        raise ValueError('Invalid resolutions {}'.format(sorted(unknown)))
+    return tuple(res for res in RESOLUTIONS if res in resolutions)
+
+
+@attr.s
+class RollupEngine:
+    """Maintains rollups of series (live reports, temperatures, energy) at
+    several resolutions, so hourly, daily or monthly views are computed from
+    a few buckets instead of every value.
+
+    Each value added to a series updates the count, sum, min and max of its
+    bucket at every resolution, values themselves are not kept. Timestamps
+    of a series must be increasing.
+
+    Args:
+        resolutions (Sequence[str]): Resolutions to maintain, see
+            :data:`RESOLUTIONS`.
+    """
+
+    resolutions = attr.ib(type=Tuple[str, ...], default=RESOLUTIONS,
+                          converter=_resolutions)
+    _series = attr.ib(type=Dict[Key, _Rollup], factory=dict, init=False,
+                      repr=False)
+
+    def add(self, key: Key, timestamp: float, value: float) -> None:
+        """Add a value to a series.
+
+        Args:
+            key (Key): Key of the series.
+            timestamp (float): Seconds since epoch.
+            value (float): Value.
+
+        Raises:
+            ValueError: If the timestamp is before the last timestamp of the
+                series.
+        """
+        self._check(key, timestamp)
+        rollup = self._series.get(key)
+        if rollup is None:
+            rollup = self._series[key] = _Rollup(self.resolutions)
+        rollup.last_timestamp = timestamp
+        for level in rollup.levels:
+            level.add(timestamp, value)
+
+    def feed(self, reports: Iterable[Report], timestamp: float) -> None:
+        """Add the value of each report, keyed by device id and report id,
+        see :func:`~pymultimatic.history.store.SeriesStore.feed`. If the
+        timestamp is before the last one of a series, no value is added."""
+        add_all((((report.device_id, report.id), report.value)
+                 for report in reports if report.value is not None),
+                timestamp, self._check, self.add)
+
+    def feed_system(self, system: System, timestamp: float) -> None:
+        """Add the values of the live reports and the temperatures of the
+        system, see :func:`~pymultimatic.history.store.system_values`. If
+        the timestamp is before the last one of a series, no value is
+        added."""
+        add_all(system_values(system), timestamp, self._check, self.add)
+
+    def feed_energy(self, history: EnergyHistory) -> None:
+        """Add the energy history, each series is keyed by device id, energy
+        type and function.
+
+        Histories usually overlap (e.g. the current month is requested
+        again), so the periods before the last one already added to a series
+        are skipped. The last one is still in progress, its value replaces
+        the one previously added.
+        """
+        for series in history.series:
+            key = (series.device_id, series.energy_type, series.function)
+            rollup = self._series.get(key)
+            last = rollup.last_timestamp if rollup is not None else None
+            for timestamp, value in zip(series.timestamps, series.values):
+                if last is None or timestamp > last:
+                    self.add(key, timestamp, value)
+                elif rollup is not None and timestamp == last:
+                    for level in rollup.levels:
+                        level.replace_last(timestamp, value)
+
+    def query(self, key: Key, start: float, end: float,
+              resolution: Optional[str] = None) -> List[Bucket]:
+        """Get the buckets of a series between two timestamps.
+
+        Args:
+            key (Key): Key of the series.
+            start (float): First timestamp (included).
+            end (float): Last timestamp (excluded).
+            resolution (str): Resolution of the buckets, by default, the
+                coarsest resolution on which start and end are aligned, or
+                the finest one.
+
+        Returns:
+            List[Bucket]: Non empty buckets overlapping the range.
+
+        Raises:
+            ValueError: If the resolution is not maintained.
+        """
+        if resolution is None:
+            resolution = self.resolutions[0]
+            for candidate in self.resolutions:
+                if bucket_start(start, candidate) == start \
+                        and bucket_start(end, candidate) == end:
+                    resolution = candidate
+        elif resolution not in self.resolutions:
+            raise ValueError('Resolution {} is not maintained'
+                             .format(resolution))
+
+        rollup = self._series.get(key)
+        if rollup is None:
+            return []
+        return rollup.levels[self.resolutions.index(resolution)] \
+            .buckets(bucket_start(start, resolution), end)
+
+    def aggregate(self, key: Key, start: float,
+                  end: float) -> Optional[Bucket]:
+        """Aggregate the values of a series between two timestamps.
+
+        The range is covered by the coarsest buckets fitting in it, finer
+        buckets are only used at its edges, e.g. a year is read from 12
+        monthly buckets. Edges are rounded outwards to the finest
+        resolution, so the buckets overlapping the range are used.
+
+        Args:
+            key (Key): Key of the series.
+            start (float): First timestamp (included).
+            end (float): Last timestamp (excluded).
+
+        Returns:
+            Bucket: Aggregated values, ``None`` if there is no value in the
+            range.
+        """
+        rollup = self._series.get(key)
+        if rollup is None:
+            return None
+        finest = self.resolutions[0]
+        return self._aggregate(rollup.levels, bucket_start(start, finest),
+                               _next_start(end, finest))
+
+    def keys(self) -> List[Key]:
+        """Get the keys of the series."""
+        return list(self._series)
+
+    def _check(self, key: Key, timestamp: float) -> None:
+        rollup = self._series.get(key)
+        check_timestamp(key, timestamp,
+                        rollup.last_timestamp if rollup is not None else None)
+
+    def _aggregate(self, levels: List[_Level], start: float,
+                   end: float) -> Optional[Bucket]:
+        if start >= end:
+            return None
+        level = levels[-1]
+        if len(levels) == 1:
+            return level.aggregate(start, end)
+
+        low = _next_start(start, level.resolution)
+        high = bucket_start(end, level.resolution)
+        if low >= high:
+            return self._aggregate(levels[:-1], start, end)
+        return _merge(_merge(self._aggregate(levels[:-1], start, low),
+                             level.aggregate(low, high)),
+                      self._aggregate(levels[:-1], high, end))
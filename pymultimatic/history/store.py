@@ -0,0 +1,424 @@
+"""Append only store of time series, backed by arrays and memory mapped
+files."""
+import logging
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from typing import (BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple, Union)
+from urllib.parse import quote, unquote
+
+import attr
+
+from . import compression
+from ..model import Report, System
+
+_LOGGER = logging.getLogger('SeriesStore')
+
+Key = Tuple[str, str]
+"""Key of a series: device id and report id of a live report, or kind
+(``zones``, ``rooms``, ``system``) and id of a temperature, see
+:func:`system_values`."""
+
+_MAGIC = b'PMTS'
+_VERSION = 1
+# magic, version, number of points, then timestamps and values (doubles)
+_HEADER = struct.Struct('<4sII')
+_DOUBLE = array('d').itemsize
+_EXTENSION = '.seg'
+
+
+def system_values(system: System) -> Iterator[Tuple[Key, float]]:
+    """Iterate over the values of the live reports, keyed by device id and
+    report id, and over the temperatures of the system:
+    ``('zones', zone.id)``, ``('rooms', str(room.id))`` and
+    ``('system', 'outdoor_temperature')``. Missing values are skipped.
+    """
+    for report in system.reports:
+        if report.value is not None:
+            yield (report.device_id, report.id), report.value
+    for zone in system.zones:
+        if zone.temperature is not None:
+            yield ('zones', zone.id), zone.temperature
+    for room in system.rooms:
+        if room.temperature is not None:
+            yield ('rooms', str(room.id)), room.temperature
+    if system.outdoor_temperature is not None:
+        yield ('system', 'outdoor_temperature'), system.outdoor_temperature
+
+
+def _doubles(data: 'array[float]') -> 'memoryview[float]':
+    # typed view, a memoryview can only be cast from bytes
+    return memoryview(data).cast('B').cast('d')
+
+
+def check_timestamp(key: Tuple[str, ...], timestamp: float,
+                    last: Optional[float]) -> None:
+    """Raise a :class:`ValueError` if the timestamp is before the last
+    timestamp of the series."""
+    if last is not None and timestamp < last:
+        raise ValueError('Timestamp {} of {} is before {}'.format(
+            timestamp, key, last))
+
+
+def add_all(values: Iterable[Tuple[Key, float]], timestamp: float,
+            check: Callable[[Key, float], None],
+            add: Callable[[Key, float, float], None]) -> None:
+    """Add values at the same timestamp to their series. All the series are
+    checked first, so the values are added to every series or to none of
+    them."""
+    points = list(values)
+    for key, _ in points:
+        check(key, timestamp)
+    for key, value in points:
+        add(key, timestamp, value)
+
+
+class _Segment:
+    """Immutable chunk of a series, timestamps and values are either arrays
+    or views of a memory mapped file."""
+
+    def __init__(self, timestamps: 'memoryview[float]',
+                 values: 'memoryview[float]',
+                 file_map: Optional[mmap.mmap] = None) -> None:
+        self.timestamps = timestamps
+        self.values = values
+        self._map = file_map
+
+    @classmethod
+    def open(cls, file_map: mmap.mmap) -> '_Segment':
+        """Read a mapped segment file."""
+        magic, version, count = _HEADER.unpack_from(file_map)
+        if magic != _MAGIC or version != _VERSION \
+                or len(file_map) != _HEADER.size + 2 * count * _DOUBLE:
+            raise ValueError('Invalid segment')
+        data = memoryview(file_map)[_HEADER.size:].cast('d')
+        return cls(data[:count], data[count:], file_map)
+
+    @staticmethod
+    def write(file: BinaryIO, timestamps: 'array[float]',
+              values: 'array[float]') -> None:
+        """Write a segment file."""
+        file.write(_HEADER.pack(_MAGIC, _VERSION, len(timestamps)))
+        timestamps.tofile(file)
+        values.tofile(file)
+
+    @property
+    def first(self) -> float:
+        """float: First timestamp."""
+        return self.timestamps[0]
+
+    @property
+    def last(self) -> float:
+        """float: Last timestamp."""
+        return self.timestamps[-1]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def read(self, start: float, end: float) \
+            -> Tuple['array[float]', 'array[float]']:
+        """Points between start (included) and end (excluded)."""
+        low = bisect_left(self.timestamps, start)
+        high = bisect_left(self.timestamps, end)
+        timestamps: 'array[float]' = array('d')
+        values: 'array[float]' = array('d')
+        timestamps.frombytes(self.timestamps[low:high].tobytes())
+        values.frombytes(self.values[low:high].tobytes())
+        return timestamps, values
+
+    def close(self) -> None:
+        """Release the views and unmap the file, if any."""
+        self.timestamps.release()
+        self.values.release()
+        if self._map is not None:
+            self._map.close()
+
+
+class _CompressedSegment:
+    """Immutable chunk of a series, compressed, see
+    :mod:`~pymultimatic.history.compression`. It is decoded when read."""
+
+    def __init__(self, data: compression.Data) -> None:
+        self._data = data
+        self._count, self.first, self.last = compression.header(data)
+
+    @staticmethod
+    def write(file: BinaryIO, timestamps: 'array[float]',
+              values: 'array[float]') -> None:
+        """Write a compressed segment file."""
+        file.write(compression.encode(zip(timestamps, values)))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def read(self, start: float, end: float) \
+            -> Tuple['array[float]', 'array[float]']:
+        """Points between start (included) and end (excluded)."""
+        timestamps, values = compression.decode_arrays(self._data)
+        low = bisect_left(timestamps, start)
+        high = bisect_left(timestamps, end)
+        return timestamps[low:high], values[low:high]
+
+    def close(self) -> None:
+        """Unmap the file, if any."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+
+_AnySegment = Union[_Segment, _CompressedSegment]
+
+
+def _open_segment(path: str) -> _AnySegment:
+    with open(path, 'rb') as file:
+        file_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if file_map[:len(_MAGIC)] == _MAGIC:
+            return _Segment.open(file_map)
+        return _CompressedSegment(file_map)
+    except (ValueError, struct.error):
+        file_map.close()
+        raise
+
+
+class _Series:
+    """Sealed segments and the buffer where points are appended."""
+
+    def __init__(self) -> None:
+        self.segments: List[_AnySegment] = []
+        # index of the next segment file
+        self.next_index = 0
+        self.timestamps: 'array[float]' = array('d')
+        self.values: 'array[float]' = array('d')
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        """float: Last timestamp of the series, if any."""
+        if self.timestamps:
+            return self.timestamps[-1]
+        if self.segments:
+            return self.segments[-1].last
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments) \
+            + len(self.timestamps)
+
+
+@attr.s
+class SeriesStore:
+    """Stores the values of live reports (or any other values) over time, one
+    series per ``(device_id, report_id)``.
+
+    Points are appended to an in memory buffer, stored as two arrays of
+    doubles (timestamps and values) instead of Python objects. Once the
+    buffer reaches ``segment_size`` points, it's sealed into a segment: if
+    the store has a ``path``, the segment is written to a file, which is
+    memory mapped, so only the pages being read are loaded in memory. A store
+    opened on an existing path loads its segments.
+
+    Timestamps of a series must be increasing, range queries are binary
+    searches on the timestamps.
+
+    With ``compress``, segments are compressed (see
+    :mod:`~pymultimatic.history.compression`): slowly changing values
+    sampled at a fixed interval take a few bits per point instead of 16
+    bytes, but timestamps are rounded to the millisecond and segments are
+    decoded when they are queried. A store can read both kinds of segments.
+
+    Args:
+        path (str): Directory of the segment files, if ``None``, segments
+            are kept in memory.
+        segment_size (int): Number of points of a segment.
+        compress (bool): Whether segments are compressed.
+    """
+
+    path = attr.ib(type=Optional[str], default=None)
+    segment_size = attr.ib(type=int, default=4096)
+    compress = attr.ib(type=bool, default=False)
+    _series = attr.ib(type=Dict[Key, _Series], factory=dict, init=False,
+                      repr=False)
+
+    def __attrs_post_init__(self) -> None:
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            self._load()
+
+    def append(self, key: Key, timestamp: float, value: float) -> None:
+        """Append a point to a series.
+
+        Args:
+            key (Key): Device id and report id.
+            timestamp (float): Seconds since epoch.
+            value (float): Value.
+
+        Raises:
+            ValueError: If the timestamp is before the last timestamp of the
+                series.
+        """
+        self._check(key, timestamp)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        series.timestamps.append(timestamp)
+        series.values.append(value)
+        if len(series.timestamps) >= self.segment_size:
+            self._seal(key, series)
+
+    def feed(self, reports: Iterable[Report], timestamp: float) -> None:
+        """Append the value of each report, keyed by device id and report
+        id.
+
+        Args:
+            reports (Iterable[Report]): Reports, e.g.
+                :attr:`~pymultimatic.model.system.System.reports`.
+            timestamp (float): When the reports were received, in seconds
+                since epoch.
+
+        Raises:
+            ValueError: If the timestamp is before the last timestamp of one
+                of the series, then no value is appended.
+        """
+        self._append_all((((report.device_id, report.id), report.value)
+                          for report in reports if report.value is not None),
+                         timestamp)
+
+    def feed_system(self, system: System, timestamp: float) -> None:
+        """Append the values of the live reports and the temperatures of the
+        system, see :func:`system_values`.
+
+        Args:
+            system (System): System, e.g. from
+                :func:`~pymultimatic.systemmanager.SystemManager.get_system`.
+            timestamp (float): When the system was received, in seconds
+                since epoch.
+
+        Raises:
+            ValueError: If the timestamp is before the last timestamp of one
+                of the series, then no value is appended.
+        """
+        self._append_all(system_values(system), timestamp)
+
+    def _check(self, key: Key, timestamp: float) -> None:
+        series = self._series.get(key)
+        check_timestamp(key, timestamp,
+                        series.last_timestamp if series is not None else None)
+
+    def _append_all(self, values: Iterable[Tuple[Key, float]],
+                    timestamp: float) -> None:
+        add_all(values, timestamp, self._check, self.append)
+
+    def query(self, key: Key, start: float = float('-inf'),
+              end: float = float('inf')) \
+            -> Tuple['array[float]', 'array[float]']:
+        """Get the points of a series between two timestamps.
+
+        Args:
+            key (Key): Device id and report id.
+            start (float): First timestamp (included).
+            end (float): Last timestamp (excluded).
+
+        Returns:
+            Tuple[array, array]: Timestamps and values, empty if there is no
+            such series. Arrays support the buffer protocol, so they can be
+            wrapped without copy, e.g. by ``numpy.frombuffer``.
+        """
+        timestamps: 'array[float]' = array('d')
+        values: 'array[float]' = array('d')
+        series = self._series.get(key)
+        if series is None:
+            return timestamps, values
+
+        for segment in series.segments:
+            if segment.last < start or segment.first >= end:
+                continue
+            segment_timestamps, segment_values = segment.read(start, end)
+            timestamps.extend(segment_timestamps)
+            values.extend(segment_values)
+
+        low = bisect_left(series.timestamps, start)
+        high = bisect_left(series.timestamps, end)
+        timestamps.extend(series.timestamps[low:high])
+        values.extend(series.values[low:high])
+        return timestamps, values
+
+    def keys(self) -> Iterator[Key]:
+        """Iterate over the keys of the series."""
+        return iter(list(self._series))
+
+    def count(self, key: Key) -> int:
+        """Number of points of a series."""
+        series = self._series.get(key)
+        return len(series) if series is not None else 0
+
+    def flush(self) -> None:
+        """Seal the buffers into segments, so they are written to disk."""
+        for key, series in self._series.items():
+            if series.timestamps:
+                self._seal(key, series)
+
+    def close(self) -> None:
+        """Flush the store and release the segments."""
+        self.flush()
+        for series in self._series.values():
+            for segment in series.segments:
+                segment.close()
+        self._series.clear()
+
+    def _seal(self, key: Key, series: _Series) -> None:
+        segment: _AnySegment
+        if self.path is not None:
+            directory = self._directory(key)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, '{:08d}{}'.format(
+                series.next_index, _EXTENSION))
+            with open(path + '.tmp', 'wb') as file:
+                segment_class = _CompressedSegment if self.compress \
+                    else _Segment
+                segment_class.write(file, series.timestamps, series.values)
+            os.replace(path + '.tmp', path)
+            segment = _open_segment(path)
+        elif self.compress:
+            segment = _CompressedSegment(compression.encode(
+                zip(series.timestamps, series.values)))
+        else:
+            segment = _Segment(_doubles(series.timestamps),
+                               _doubles(series.values))
+        series.segments.append(segment)
+        series.next_index += 1
+        series.timestamps = array('d')
+        series.values = array('d')
+
+    def _directory(self, key: Key) -> str:
+        assert self.path is not None
+        # dots are escaped too, so '.' or '..' are not special
+        return os.path.join(self.path, *[
+            quote(part, safe='').replace('.', '%2E') for part in key])
+
+    def _load(self) -> None:
+        assert self.path is not None
+        for device in sorted(os.listdir(self.path)):
+            device_dir = os.path.join(self.path, device)
+            if not os.path.isdir(device_dir):
+                continue
+            for report in sorted(os.listdir(device_dir)):
+                self._load_series((unquote(device), unquote(report)),
+                                  os.path.join(device_dir, report))
+
+    def _load_series(self, key: Key, directory: str) -> None:
+        series = _Series()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(_EXTENSION):
+                continue
+            try:
+                series.next_index = max(series.next_index,
+                                        int(name[:-len(_EXTENSION)]) + 1)
+                series.segments.append(
+                    _open_segment(os.path.join(directory, name)))
+            except (OSError, ValueError, struct.error):
+                _LOGGER.warning('Cannot load segment %s of %s', name, key,
+                                exc_info=True)
+        if series.segments:
+            self._series[key] = series
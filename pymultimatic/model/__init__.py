@@ -2,7 +2,8 @@
 # pylint: disable=cyclic-import
 from .mode import Mode, OperatingMode, OperatingModes, QuickVeto, ActiveMode,\
     SettingMode, SettingModes
-from .timeprogram import TimeProgram, TimeProgramDay, TimePeriodSetting
+from .timeprogram import TimeProgram, TimeProgramDay, TimePeriodSetting, \
+    TimeProgramSeries, TimeProgramInterval, TimeProgramTransition
 from .common import Component, Function
 from .zone import ZoneCooling, ZoneHeating, Zone, ActiveFunction
 from .room import Device, Room
@@ -10,6 +11,7 @@ from .status import BoilerStatus, Error
 from .syncstate import SyncState
 from .dhw import Dhw, HotWater, Circulation
 from .report import Report
+from .energy import EnergyHistory, EnergySeries
 from .quick_mode import QuickMode, QuickModes, HolidayMode
 from .ventilation import Ventilation
 from .system import System, SystemInfo
@@ -10,7 +10,7 @@ from . import TimeProgram, OperatingMode, QuickVeto, \
     ActiveMode, SettingModes, OperatingModes
 
 
-@attr.s
+@attr.s(slots=True)
 class Function:
     """This is a common class for function in the system. A function is
     basically something that has a time program and an operating mode.
@@ -66,7 +66,6 @@ class Function:
         pass
 
 
-@attr.s
 class Component:
     """This is a common class for components in the system.
     A component can be :class:`~pymultimatic.model.room.Room`,
@@ -93,13 +92,19 @@ class Component:
         quick_veto (QuickVeto): Will be populated if there is a
             :class:`~pymultimatic.model.mode.QuickVeto` running on. Always
             `None` for :class:`Circulation` and :class:`HotWater`.
+
+    Note:
+        Attributes are declared by the concrete components, this way they
+        can be slotted along with the attributes of :class:`Function`.
     """
 
+    __slots__ = ()
+
     # pylint: disable=invalid-name
-    id = attr.ib(type=str, default=None)
-    name = attr.ib(type=str, default=None)
-    temperature = attr.ib(type=Optional[float], default=None)
-    quick_veto = attr.ib(type=Optional[QuickVeto], default=None)
+    id: str
+    name: str
+    temperature: Optional[float]
+    quick_veto: Optional[QuickVeto]
 
     @property
     @abc.abstractmethod
@@ -6,7 +6,7 @@ import attr
 from . import ActiveMode, OperatingModes, constants, Component, Function
 
 
-@attr.s
+@attr.s(slots=True)
 class HotWater(Function, Component):
     """This is representing the hot water from the system.
 
@@ -22,6 +22,10 @@ class HotWater(Function, Component):
     MAX_TARGET_TEMP = 70
     """Max `target temperature` for the hot water."""
 
+    # pylint: disable=invalid-name
+    id = attr.ib(type=str, default=None)
+    name = attr.ib(type=str, default=None)
+    temperature = attr.ib(type=Optional[float], default=None)
     quick_veto = attr.ib(default=None, init=False)
     target_low = attr.ib(default=MIN_TARGET_TEMP, init=False)
 
@@ -34,7 +38,7 @@ class HotWater(Function, Component):
         return mode
 
 
-@attr.s
+@attr.s(slots=True)
 class Circulation(Function, Component):
     """This is representing the circulation from the system.
     This is a bit special component since there is no
@@ -44,6 +48,9 @@ class Circulation(Function, Component):
     MODES = [OperatingModes.ON, OperatingModes.OFF, OperatingModes.AUTO]
     """List of mode that are applicable to the hot water component."""
 
+    # pylint: disable=invalid-name
+    id = attr.ib(type=str, default=None)
+    name = attr.ib(type=str, default=None)
     temperature = attr.ib(default=None, init=False)
     quick_veto = attr.ib(default=None, init=False)
     target_high = attr.ib(default=None, init=False)
@@ -57,7 +64,7 @@ class Circulation(Function, Component):
         return mode
 
 
-@attr.s
+@attr.s(slots=True)
 class Dhw:
     """This is representing the DHW (Domestic Hot Water) from the system."""
 
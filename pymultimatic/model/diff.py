@@ -0,0 +1,151 @@
+"""Differences between two :class:`~pymultimatic.model.system.System`.
+
+:func:`diff_systems` compares two snapshots of a system and returns a list
+of :class:`Change`, one per modified attribute of each entity (zone, room,
+hot water, circulation, report, error) and of the system itself.
+
+Entities are matched by id (device id and id for reports). When an entity is the same object in both
+snapshots (see :class:`~pymultimatic.model.mapper.MappingCache`), it is not
+compared at all.
+"""
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, \
+    TypeVar
+
+import attr
+
+from . import Error, Function, Report, System
+
+T = TypeVar('T')  # pylint: disable=invalid-name
+
+_SYSTEM_ATTRIBUTES = ('holiday', 'quick_mode', 'info', 'outdoor_temperature',
+                      'boiler_status', 'ventilation')
+
+
+class ChangeType(Enum):
+    """Type of a :class:`Change`."""
+
+    ADDED = 'added'
+    REMOVED = 'removed'
+    CHANGED = 'changed'
+
+
+@attr.s(frozen=True, slots=True)
+class Change:
+    """A change between two snapshots of a system.
+
+    Args:
+        type (ChangeType): Type of change.
+        entity (str): Kind of entity which changed: ``system``, ``zone``,
+            ``room``, ``hot_water``, ``circulation``, ``report`` or
+            ``error``.
+        id (str): Id of the entity, ``None`` for the system. Reports are
+            identified by device id and report id (``device_id/id``), as
+            many devices have the same reports, errors by their status code.
+        attribute (str): Changed attribute, ``None`` when the entity is
+            added or removed. Attributes of heating and cooling of zones are
+            prefixed, e.g. ``heating.target_high``.
+        old (Any): Previous value, or removed entity.
+        new (Any): New value, or added entity.
+    """
+
+    # pylint: disable=invalid-name
+    type = attr.ib(type=ChangeType)
+    entity = attr.ib(type=str)
+    id = attr.ib(type=Optional[str])
+    attribute = attr.ib(type=Optional[str], default=None)
+    old = attr.ib(type=Any, default=None)
+    new = attr.ib(type=Any, default=None)
+
+
+def diff_systems(old: System, new: System) -> List[Change]:
+    """Get changes between two snapshots of a system.
+
+    Args:
+        old (System): Previous snapshot.
+        new (System): New snapshot.
+
+    Returns:
+        List[Change]: Changes, empty if nothing changed.
+    """
+    changes: List[Change] = []
+    if old is new:
+        return changes
+
+    for name in _SYSTEM_ATTRIBUTES:
+        old_value, new_value = getattr(old, name), getattr(new, name)
+        if old_value != new_value:
+            changes.append(Change(ChangeType.CHANGED, 'system', None, name,
+                                  old_value, new_value))
+
+    _diff_entities(changes, 'zone', old.zones, new.zones, _by_id)
+    _diff_entities(changes, 'room', old.rooms, new.rooms, _by_id)
+    _diff_entities(changes, 'hot_water',
+                   [old.dhw.hotwater] if old.dhw else [],
+                   [new.dhw.hotwater] if new.dhw else [], _by_id)
+    _diff_entities(changes, 'circulation',
+                   [old.dhw.circulation] if old.dhw else [],
+                   [new.dhw.circulation] if new.dhw else [], _by_id)
+    _diff_entities(changes, 'report', old.reports, new.reports, _report_key)
+    _diff_entities(changes, 'error', old.errors, new.errors, _error_key)
+    return changes
+
+
+def _by_id(entity: Any) -> Hashable:
+    return entity.id  # type: ignore
+
+
+def _report_key(report: Report) -> Hashable:
+    return report.device_id, report.id
+
+
+def _error_key(error: Error) -> Hashable:
+    return error.device_name, error.status_code
+
+
+def _diff_entities(changes: List[Change], entity: str,
+                   old: Iterable[Optional[T]], new: Iterable[Optional[T]],
+                   key: Callable[[T], Hashable]) -> None:
+    old_entities: Dict[Hashable, T] = {key(e): e for e in old if e}
+    new_entities: Dict[Hashable, T] = {key(e): e for e in new if e}
+
+    for entity_key, old_entity in old_entities.items():
+        new_entity = new_entities.get(entity_key)
+        if new_entity is None:
+            changes.append(Change(ChangeType.REMOVED, entity,
+                                  _entity_id(old_entity), old=old_entity))
+        elif new_entity is not old_entity:
+            _diff_attributes(changes, entity, _entity_id(old_entity), '',
+                             old_entity, new_entity)
+
+    for entity_key, new_entity in new_entities.items():
+        if entity_key not in old_entities:
+            changes.append(Change(ChangeType.ADDED, entity,
+                                  _entity_id(new_entity), new=new_entity))
+
+
+def _entity_id(entity: Any) -> str:
+    if isinstance(entity, Error):
+        return entity.status_code
+    if isinstance(entity, Report):
+        return '{}/{}'.format(entity.device_id, entity.id)
+    return entity.id  # type: ignore
+
+
+# pylint: disable=too-many-arguments
+def _diff_attributes(changes: List[Change], entity: str, entity_id: str,
+                     prefix: str, old: Any, new: Any) -> None:
+    for field in attr.fields(type(old)):
+        if field.name.startswith('_') or not field.eq:
+            continue
+        old_value = getattr(old, field.name)
+        new_value = getattr(new, field.name)
+        if old_value is new_value:
+            continue
+        if isinstance(old_value, Function) \
+                and type(old_value) is type(new_value):
+            _diff_attributes(changes, entity, entity_id,
+                             prefix + field.name + '.', old_value, new_value)
+        elif old_value != new_value:
+            changes.append(Change(ChangeType.CHANGED, entity, entity_id,
+                                  prefix + field.name, old_value, new_value))
@@ -0,0 +1,132 @@
+"""Groups everything related to energy history, coming from the emf
+(Embedded Metering Function) reports."""
+import calendar
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+
+import attr
+
+TIME_RANGES = ('DAY', 'WEEK', 'MONTH', 'YEAR')
+"""Time ranges accepted by the API, a report covers one time range."""
+
+
+@attr.s(slots=True)
+class EnergySeries:
+    """Energy history of a device, for an energy type and a function, stored
+    in columns.
+
+    Timestamps are the dates reported by the API (they are in the time zone
+    of the installation), converted to seconds since epoch as if they were
+    UTC.
+
+    Args:
+        device_id (str): Id of the device.
+        energy_type (str): Energy type, e.g. ``CONSUMED_ELECTRICAL_POWER``,
+            ``ENVIRONMENTAL_YIELD``.
+        function (str): Function, e.g. ``CENTRAL_HEATING``, ``DHW``.
+        timestamps (array): Start of each period, sorted.
+        values (array): Energy (in Wh) of each period.
+    """
+
+    device_id = attr.ib(type=str)
+    energy_type = attr.ib(type=str)
+    function = attr.ib(type=str)
+    timestamps = attr.ib(type='array[float]', factory=lambda: array('d'))
+    values = attr.ib(type='array[float]', factory=lambda: array('d'))
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def total(self) -> float:
+        """float: Sum of the values."""
+        return sum(self.values)
+
+    def points(self) -> Iterator[Tuple[datetime, float]]:
+        """Iterate over the periods.
+
+        Returns:
+            Iterator[Tuple[datetime, float]]: Start of the period and energy.
+        """
+        for timestamp, value in zip(self.timestamps, self.values):
+            yield from_timestamp(timestamp), value
+
+
+@attr.s(slots=True)
+class EnergyHistory:
+    """Energy history of the devices of an installation, between two dates.
+
+    Args:
+        start (date): First day of the history.
+        end (date): Last day of the history (included).
+        time_range (str): Time range of the reports the history was built
+            from, see :data:`TIME_RANGES`, it defines the granularity of the
+            values.
+        series (List[EnergySeries]): History of each device, energy type and
+            function.
+    """
+
+    start = attr.ib(type=date)
+    end = attr.ib(type=date)
+    time_range = attr.ib(type=str)
+    series = attr.ib(type=List[EnergySeries], factory=list)
+
+    def get(self, device_id: str, energy_type: str,
+            function: str) -> Optional[EnergySeries]:
+        """Get the history of a device, for an energy type and a function.
+
+        Returns:
+            EnergySeries: The history, if any.
+        """
+        for series in self.series:
+            if series.device_id == device_id \
+                    and series.energy_type == energy_type \
+                    and series.function == function:
+                return series
+        return None
+
+
+def to_timestamp(value: datetime) -> float:
+    """Convert a naive datetime coming from the API to a timestamp of
+    :class:`EnergySeries`."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def from_timestamp(timestamp: float) -> datetime:
+    """Convert a timestamp of :class:`EnergySeries` to a naive datetime."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def split_range(start: date, end: date,
+                time_range: str) -> List[Tuple[date, date]]:
+    """Split a range of days into windows the API can report at once. Weeks
+    are counted from ``start``, whereas months and years are calendar ones.
+
+    Args:
+        start (date): First day.
+        end (date): Last day (included).
+        time_range (str): See :data:`TIME_RANGES`.
+
+    Returns:
+        List[Tuple[date, date]]: First and last day of each window.
+    """
+    if time_range not in TIME_RANGES:
+        raise ValueError('Unknown time range ' + time_range)
+
+    windows = []
+    current = start
+    while current <= end:
+        if time_range == 'DAY':
+            last = current
+        elif time_range == 'WEEK':
+            last = current + timedelta(days=6)
+        elif time_range == 'MONTH':
+            last = current.replace(day=calendar.monthrange(
+                current.year, current.month)[1])
+        else:
+            last = current.replace(month=12, day=31)
+        last = min(last, end)
+        windows.append((current, last))
+        current = last + timedelta(days=1)
+    return windows
@@ -1,14 +1,82 @@
 """Mappers from json to model classes."""
-from datetime import datetime
-from typing import Optional, List, Any, Tuple
+import marshal
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Any, Tuple, Dict, Hashable, Callable
+from weakref import WeakValueDictionary
 
 from . import (BoilerStatus, Circulation, Device, HolidayMode, HotWater,
                QuickMode, QuickModes, QuickVeto, Room, TimeProgram,
                TimeProgramDay, TimePeriodSetting, OperatingModes, Error,
                SyncState, SettingModes, SystemInfo, Dhw, OperatingMode, Zone,
-               ZoneHeating, ZoneCooling, Report, Ventilation, ActiveFunction)
+               ZoneHeating, ZoneCooling, Report, Ventilation, ActiveFunction,
+               EnergyHistory, EnergySeries)
+from .energy import to_timestamp
 
 _DATE_FORMAT = "%Y-%m-%d"
+# from version 3, marshal output depends on objects reference counts
+_MARSHAL_VERSION = 2
+
+# mapped time programs are shared while in use, see map_time_program
+_TIME_PROGRAMS: 'WeakValueDictionary[bytes, TimeProgram]' = \
+    WeakValueDictionary()
+_TIME_PROGRAM_DAYS: 'WeakValueDictionary[bytes, TimeProgramDay]' = \
+    WeakValueDictionary()
+_TIME_PERIOD_SETTINGS: 'WeakValueDictionary[Hashable, TimePeriodSetting]' = \
+    WeakValueDictionary()
+
+
+class MappingCache:
+    """Keeps mapped objects along with a fingerprint of the raw json they were
+    mapped from, so an entity (zone, room, reports of a device, dhw) is not
+    mapped again if its json did not change since the previous mapping.
+
+    Note:
+        Objects returned when using a cache may be shared between successive
+        mappings, they should not be modified.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Hashable, Tuple[bytes, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, raw: Any,
+            map_func: Callable[..., Any], *args: Any) -> Any:
+        """Get the object mapped from the raw json, map it if the raw json
+        changed.
+
+        Args:
+            key (Hashable): Identifies the entity, e.g. ``('zone', id)``.
+            raw (Any): Raw json of the entity.
+            map_func (Callable): Function mapping the raw json.
+            *args: Other arguments of ``map_func``, they are part of the
+                fingerprint.
+        """
+        # json is made of builtin types, marshal is the fastest to serialize
+        fingerprint = marshal.dumps((raw, args), _MARSHAL_VERSION)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        mapped = map_func(raw, *args)
+        self._entries[key] = (fingerprint, mapped)
+        return mapped
+
+    def clear(self) -> None:
+        """Remove all the mapped objects."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _cached(cache: Optional[MappingCache], key: Hashable, raw: Any,
+            map_func: Callable[..., Any], *args: Any) -> Any:
+    if cache is None:
+        return map_func(raw, *args)
+    return cache.get(key, raw, map_func, *args)
 
 
 def map_quick_mode(full_system) -> Optional[QuickMode]:
@@ -33,12 +101,13 @@ def map_outdoor_temp(full_system) -> Optional[float]:
     return None
 
 
-def map_rooms(raw_rooms) -> List[Room]:
+def map_rooms(raw_rooms, cache: Optional[MappingCache] = None) -> List[Room]:
     """Map *rooms*."""
     rooms: List[Room] = []
     if raw_rooms:
         for raw_room in raw_rooms.get("body", dict()).get("rooms", list()):
-            room = map_room(raw_room)
+            room = _cached(cache, ('room', raw_room.get("roomIndex")),
+                           raw_room, map_room)
             if room:
                 rooms.append(room)
 
@@ -103,7 +172,21 @@ def map_devices(raw_devices) -> List[Device]:
 
 def map_time_program(raw_time_program, key: Optional[str] = None) \
         -> TimeProgram:
-    """Map *time program*."""
+    """Map *time program*.
+
+    Identical time programs are mapped to the same instance (as well as
+    identical days and settings), which is shared between all the components
+    using it, time programs are immutable.
+    """
+    fingerprint = marshal.dumps((raw_time_program, key), _MARSHAL_VERSION)
+    time_program = _TIME_PROGRAMS.get(fingerprint)
+    if time_program is None:
+        time_program = _map_time_program(raw_time_program, key)
+        _TIME_PROGRAMS[fingerprint] = time_program
+    return time_program
+
+
+def _map_time_program(raw_time_program, key: Optional[str]) -> TimeProgram:
     result = {}
     if raw_time_program:
         result["monday"] = map_time_program_day(
@@ -126,21 +209,40 @@ def map_time_program(raw_time_program, key: Optional[str] = None) \
 
 def map_time_program_day(raw_time_program_day, key: Optional[str] = None) \
         -> TimeProgramDay:
-    """Map *time program day* and *time program day settings*."""
-    settings = []
-    if raw_time_program_day:
-        for time_setting in raw_time_program_day:
-            start_time = time_setting.get("startTime")
-            target_temp = time_setting.get("temperatureSetpoint")
-
-            mode = None
-            if key:
-                mode = SettingModes.get(time_setting.get(key))
-
-            settings.append(
-                TimePeriodSetting(start_time, target_temp, mode))
-
-    return TimeProgramDay(settings)
+    """Map *time program day* and *time program day settings*.
+
+    Like time programs, identical days are mapped to the same instance.
+    """
+    fingerprint = marshal.dumps((raw_time_program_day, key),
+                                _MARSHAL_VERSION)
+    day = _TIME_PROGRAM_DAYS.get(fingerprint)
+    if day is None:
+        settings = []
+        if raw_time_program_day:
+            for time_setting in raw_time_program_day:
+                start_time = time_setting.get("startTime")
+                target_temp = time_setting.get("temperatureSetpoint")
+
+                mode = None
+                if key:
+                    mode = SettingModes.get(time_setting.get(key))
+
+                settings.append(
+                    _map_time_period_setting(start_time, target_temp, mode))
+        day = TimeProgramDay(settings)
+        _TIME_PROGRAM_DAYS[fingerprint] = day
+    return day
+
+
+def _map_time_period_setting(start_time, target_temp, mode) \
+        -> TimePeriodSetting:
+    # 20 and 20.0 are equal, but should not be mixed up
+    setting_key = (start_time, target_temp, type(target_temp), mode)
+    setting = _TIME_PERIOD_SETTINGS.get(setting_key)
+    if setting is None:
+        setting = TimePeriodSetting(start_time, target_temp, mode)
+        _TIME_PERIOD_SETTINGS[setting_key] = setting
+    return setting
 
 
 def map_holiday_mode(full_system) -> HolidayMode:
@@ -211,12 +313,14 @@ def map_system_info(facilities, gateway, hvac, serial) -> SystemInfo:
                       online, update)
 
 
-def map_zones(full_system) -> List[Zone]:
+def map_zones(full_system, cache: Optional[MappingCache] = None) \
+        -> List[Zone]:
     """Map *zones*."""
     zones = []
     if full_system:
         for raw_zone in full_system.get("body", dict()).get("zones", list()):
-            zone = map_zone(raw_zone)
+            zone = _cached(cache, ('zone', raw_zone.get("_id")), raw_zone,
+                           map_zone)
             if zone:
                 zones.append(zone)
 
@@ -329,10 +433,25 @@ def map_hot_water_alone(raw_hot_water, dhw_id: str, live_report) \
     return None
 
 
-def map_dhw(full_system, live_report) -> Dhw:
+def map_dhw(full_system, live_report,
+            cache: Optional[MappingCache] = None) -> Dhw:
     """Map *dhw*."""
+    if cache is not None and full_system:
+        hot_water_list = full_system.get("body", dict()).get("dhw")
+        if hot_water_list:
+            # only the hot water temperature is used from the live report
+            dhw: Dhw = cache.get(('dhw', hot_water_list[0].get("_id")),
+                                 {"body": {"dhw": hot_water_list[:1]}},
+                                 _map_dhw, map_dhw_temperature(live_report))
+            return dhw
+    return _map_dhw(full_system, map_dhw_temperature(live_report))
+
+
+def _map_dhw(full_system, temperature: Optional[float]) -> Dhw:
     circulation = map_circulation(full_system)
-    hotwater = map_hot_water(full_system, live_report)
+    hotwater = map_hot_water(full_system, None)
+    if hotwater:
+        hotwater.temperature = temperature
     return Dhw(hotwater=hotwater, circulation=circulation)
 
 
@@ -395,37 +514,109 @@ def _map_state(raw_state) -> Optional[SyncState]:
     return SyncState(state, timestamp, link)
 
 
-def map_reports(live_report) -> List[Report]:
+def map_reports(live_report,
+                cache: Optional[MappingCache] = None) -> List[Report]:
     """Maps *Reports*."""
-    reports = []
+    reports: List[Report] = []
 
     if live_report:
         for device in live_report.get("body", dict()).get("devices", list()):
-            device_id = device.get("_id")
-            device_name = device.get("name")
-
-            for report in device.get("reports", list()):
-                report_id = report.get("_id")
-                name = report.get("name")
-                value = report.get("value")
-                unit = report.get("unit")
-                report = Report(id=report_id, value=value, name=name,
-                                unit=unit, device_id=device_id,
-                                device_name=device_name)
-                reports.append(report)
+            reports.extend(_cached(cache, ('reports', device.get("_id")),
+                                   device, _map_device_reports))
 
     return reports
 
 
-def _map_hot_water(raw_hot_water, dhw_id: str, report) -> Optional[HotWater]:
-    func = _map_function(raw_hot_water, "mode")
+def _map_device_reports(device) -> List[Report]:
+    reports = []
+    device_id = device.get("_id")
+    device_name = device.get("name")
+
+    for report in device.get("reports", list()):
+        report_id = report.get("_id")
+        name = report.get("name")
+        value = report.get("value")
+        unit = report.get("unit")
+        report = Report(id=report_id, value=value, name=name,
+                        unit=unit, device_id=device_id,
+                        device_name=device_name)
+        reports.append(report)
+
+    return reports
 
-    current_temp = None
 
-    if report:
-        dhw_report = _find_dhw_temperature_report(report)
+def map_emf_series(emf_devices) -> List[Tuple[str, str, str]]:
+    """Map the device id, energy type and function of each emf report."""
+    series = []
+    for device in emf_devices.get("body", list()):
+        for report in device.get("reports", list()):
+            series.append((device.get("id"), report.get("energyType"),
+                           report.get("function")))
+    return series
+
+
+def map_energy_history(
+        start: date, end: date, time_range: str,
+        emf_reports: List[Tuple[Tuple[str, str, str], Any]]) \
+        -> EnergyHistory:
+    """Map *EnergyHistory* from emf reports of the windows of the history.
+
+    Values are keyed by their date, when windows overlap, the value of the
+    last report wins. Values out of the range are dropped.
+
+    Args:
+        start (date): First day of the history.
+        end (date): Last day of the history (included).
+        time_range (str): Time range of the reports.
+        emf_reports: Device id, energy type and function of each report,
+            along with the report.
+    """
+    low = to_timestamp(datetime.combine(start, datetime.min.time()))
+    high = to_timestamp(datetime.combine(end + timedelta(days=1),
+                                         datetime.min.time()))
+    merged: Dict[Tuple[str, str, str], Dict[float, float]] = {}
+    for key, emf_report in emf_reports:
+        _merge_dataset(merged.setdefault(key, {}), emf_report, low, high)
+
+    history = EnergyHistory(start, end, time_range)
+    for key, values in merged.items():
+        series = EnergySeries(*key)
+        for timestamp in sorted(values):
+            series.timestamps.append(timestamp)
+            series.values.append(values[timestamp])
+        history.series.append(series)
+    return history
+
+
+def _merge_dataset(values: Dict[float, float], emf_report, low: float,
+                   high: float) -> None:
+    for point in emf_report.get("body", dict()).get("dataset", list()):
+        timestamp = to_timestamp(_energy_date(point.get("key")))
+        if low <= timestamp < high:
+            values[timestamp] = float(point.get("value"))
+
+
+def _energy_date(raw_date: str) -> datetime:
+    # daily reports have hourly values (with a time), yearly reports have
+    # monthly values
+    if len(raw_date) == 7:
+        raw_date += '-01'
+    return datetime.fromisoformat(raw_date)
+
+
+def map_dhw_temperature(live_report) -> Optional[float]:
+    """Map *hot water* temperature from live report."""
+    if live_report:
+        dhw_report = _find_dhw_temperature_report(live_report)
         if dhw_report:
-            current_temp = dhw_report.get("value")
+            return dhw_report.get("value")  # type: ignore
+    return None
+
+
+def _map_hot_water(raw_hot_water, dhw_id: str, report) -> Optional[HotWater]:
+    func = _map_function(raw_hot_water, "mode")
+
+    current_temp = map_dhw_temperature(report)
 
     return HotWater(id=dhw_id,
                     name='hotwater',
@@ -3,7 +3,7 @@ from typing import Optional
 import attr
 
 
-@attr.s
+@attr.s(slots=True)
 class Mode:
     """This is the base class for modes, it groups :class:`QuickVeto`,
     :class:`OperatingMode`, :class:`QuickMode` and :class:`SettingMode`.
@@ -15,7 +15,7 @@ class Mode:
     name = attr.ib(type=str, default=None)
 
 
-@attr.s(frozen=True)
+@attr.s(frozen=True, slots=True)
 class OperatingMode(Mode):
     """Represents the operating mode of a
     :class:`~pymultimatic.model.component.Component`"""
@@ -82,7 +82,7 @@ class OperatingModes:
         return cls._VALUES[name]
 
 
-@attr.s
+@attr.s(slots=True)
 class QuickVeto(Mode):
     """Represents a quick veto which can be applied to a
     :class:`~pymultimatic.model.component.Zone` or a
@@ -126,7 +126,7 @@ class QuickVeto(Mode):
                              .format(attribute, value))
 
 
-@attr.s(frozen=True)
+@attr.s(frozen=True, slots=True)
 class SettingMode(Mode):
     """This is the setting which is configured in
     :class:`~pymultimatic.model.timeprogram.TimePeriodSetting`."""
@@ -176,7 +176,7 @@ class SettingModes:
         return cls._VALUES[name]
 
 
-@attr.s
+@attr.s(slots=True)
 class ActiveMode:
     """Active mode will let you know the real target temperature and the real
     :class:`Mode` applied to a
@@ -6,7 +6,7 @@ import attr
 from . import Mode, HotWater, Circulation, Room, Zone, Component, ActiveMode
 
 
-@attr.s(frozen=True)
+@attr.s(frozen=True, slots=True)
 class QuickMode(Mode):
     """This class is a helper to check what is impacted by a quick mode.
 
@@ -193,7 +193,7 @@ class QuickModes:
         return cls._VALUES[name]
 
 
-@attr.s
+@attr.s(slots=True)
 class HolidayMode:
     """Represents system's holiday mode.
 
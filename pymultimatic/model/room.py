@@ -4,10 +4,11 @@ from typing import List, Optional
 
 import attr
 
-from . import (Component, Function, OperatingModes, constants, ActiveMode)
+from . import (Component, Function, OperatingModes, constants, ActiveMode,
+               QuickVeto)
 
 
-@attr.s
+@attr.s(slots=True)
 class Device:
     """This is a physical device inside a :class:`Room`. It can be a VR50
     VR51 or VR52.
@@ -28,7 +29,8 @@ class Device:
     radio_out_of_reach = attr.ib(type=bool)
 
 
-@attr.s
+# pylint: disable=too-many-instance-attributes
+@attr.s(slots=True)
 class Room(Function, Component):
     """This is representing a room from the system.
 
@@ -58,6 +60,11 @@ class Room(Function, Component):
     MAX_TARGET_TEMP = constants.THERMOSTAT_MAX_TEMP
     """Max `target temperature` that can be apply to a room."""
 
+    # pylint: disable=invalid-name, duplicate-code
+    id = attr.ib(type=str, default=None)
+    name = attr.ib(type=str, default=None)
+    temperature = attr.ib(type=Optional[float], default=None)
+    quick_veto = attr.ib(type=Optional[QuickVeto], default=None)
     target_low = attr.ib(default=None, init=False)
     humidity = attr.ib(type=Optional[float], default=None)
     child_lock = attr.ib(type=bool, default=None)
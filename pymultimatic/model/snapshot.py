@@ -0,0 +1,283 @@
+"""Binary snapshots of a :class:`~pymultimatic.model.system.System`.
+
+A snapshot is the system (and all its nested models) encoded as builtin
+types, then serialized with :mod:`marshal`. Models are encoded as tuples
+referencing their class by index in a header, along with the values of their
+attributes. An object referenced many times (e.g. a shared
+:class:`~pymultimatic.model.timeprogram.TimeProgram`) is encoded once.
+
+Only the classes of :mod:`pymultimatic.model` can be loaded from a snapshot.
+Attributes are identified by name, so a snapshot saved by a previous version
+can be loaded as long as the new attributes have a default value.
+"""
+import marshal
+import os
+from datetime import date, datetime
+from enum import Enum
+from types import MappingProxyType, MemberDescriptorType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+import attr
+
+from . import System
+
+_FORMAT = 'pymultimatic.snapshot'
+_VERSION = 1
+_MARSHAL_VERSION = 4
+
+_OBJECT = 0
+_REF = 1
+_ENUM = 2
+_DATETIME = 3
+_DATE = 4
+_TUPLE = 5
+_MAPPING = 6
+
+_SCALARS = (str, int, float, bool, type(None))
+_SCALAR_TYPES = frozenset(_SCALARS)
+
+# class, setters of the saved attributes by position, attributes to default
+_Plan = Tuple[Type[Any], Tuple[Tuple[int, Callable[[Any, Any], None]], ...],
+              Tuple['attr.Attribute[Any]', ...]]
+
+_MODEL_CLASSES: Optional[Dict[str, type]] = None
+_PLANS: Dict[Tuple[str, Tuple[str, ...]], _Plan] = {}
+
+
+def dumps(system: System) -> bytes:
+    """Serialize the system.
+
+    Args:
+        system (System): The system to serialize.
+
+    Returns:
+        bytes: The snapshot.
+    """
+    encoder = _Encoder()
+    payload = encoder.encode(system)
+    return marshal.dumps((_FORMAT, _VERSION, encoder.classes, payload),
+                         _MARSHAL_VERSION)
+
+
+def loads(data: bytes) -> System:
+    """Load a system from a snapshot.
+
+    Args:
+        data (bytes): Snapshot created by :func:`dumps`.
+
+    Returns:
+        System: The system.
+
+    Raises:
+        ValueError: If the snapshot is invalid or comes from an incompatible
+            version.
+    """
+    try:
+        header, version, classes, payload = marshal.loads(data)
+    except (EOFError, ValueError, TypeError) as exc:
+        raise ValueError('Invalid snapshot') from exc
+    if header != _FORMAT or version != _VERSION:
+        raise ValueError('Unsupported snapshot: {} {}'.format(header, version))
+
+    try:
+        system = _Decoder(classes).decode(payload)
+    except (IndexError, KeyError, TypeError, AttributeError) as exc:
+        raise ValueError('Invalid snapshot') from exc
+    if not isinstance(system, System):
+        raise ValueError('Snapshot does not contain a system')
+    return system
+
+
+def dump(system: System, path: str) -> None:
+    """Save a snapshot of the system in a file, the file is replaced
+    atomically.
+
+    Args:
+        system (System): The system to save.
+        path (str): Path of the file.
+    """
+    data = dumps(system)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def load(path: str) -> System:
+    """Load a system from a snapshot file, see :func:`loads`.
+
+    Args:
+        path (str): Path of the file.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the snapshot is invalid.
+    """
+    with open(path, 'rb') as file:
+        return loads(file.read())
+
+
+def _model_classes() -> Dict[str, type]:
+    global _MODEL_CLASSES  # pylint: disable=global-statement
+    if _MODEL_CLASSES is None:
+        from .. import model  # pylint: disable=import-outside-toplevel
+        classes = {}
+        for value in vars(model).values():
+            if isinstance(value, type) and (attr.has(value)
+                                            or issubclass(value, Enum)):
+                classes[value.__name__] = value
+        _MODEL_CLASSES = classes
+    return _MODEL_CLASSES
+
+
+def _setter(cls: type, name: str) -> Callable[[Any, Any], None]:
+    # slots are set through their descriptor, which skips the checks of
+    # frozen classes
+    descriptor = getattr(cls, name, None)
+    if isinstance(descriptor, MemberDescriptorType):
+        return descriptor.__set__
+
+    def _set(obj: Any, value: Any) -> None:
+        object.__setattr__(obj, name, value)
+    return _set
+
+
+def _plan(name: str, names: Tuple[str, ...]) -> _Plan:
+    """Get how to decode the objects of a class saved with the given
+    attributes, plans are computed once by snapshot header entry."""
+    plan = _PLANS.get((name, names))
+    if plan is None:
+        cls = _model_classes()[name]
+        setters = []
+        missing = []
+        if attr.has(cls):
+            positions = {field: idx for idx, field in enumerate(names)}
+            for field in attr.fields(cls):
+                if field.name in positions:
+                    # values follow the tag and the class id
+                    setters.append((positions[field.name] + 2,
+                                    _setter(cls, field.name)))
+                elif field.default is attr.NOTHING:
+                    raise ValueError('Missing attribute {}.{}'.format(
+                        name, field.name))
+                else:
+                    missing.append(field)
+        plan = (cls, tuple(setters), tuple(missing))
+        _PLANS[(name, names)] = plan
+    return plan
+
+
+def _encoded_fields(cls: type) -> Tuple[str, ...]:
+    # lazily computed attributes (not part of equality) are not saved
+    return tuple(field.name for field in attr.fields(cls) if field.eq)
+
+
+class _Encoder:
+    """Encodes models as builtin types."""
+
+    def __init__(self) -> None:
+        self.classes: List[Tuple[str, Tuple[str, ...]]] = []
+        self._class_ids: Dict[type, Tuple[int, Tuple[str, ...]]] = {}
+        self._refs: Dict[int, int] = {}
+
+    def encode(self, value: Any) -> Any:
+        """Encode the value and the objects it references."""
+        # pylint: disable=too-many-return-statements
+        # pylint: disable=consider-using-generator
+        kind = type(value)
+        if kind in _SCALARS:
+            return value
+        if kind is list:
+            return [self.encode(item) for item in value]
+        if kind is dict:
+            return {key: self.encode(item) for key, item in value.items()}
+
+        if attr.has(kind):
+            ref = self._refs.get(id(value))
+            if ref is not None:
+                return (_REF, ref)
+            self._refs[id(value)] = len(self._refs)
+            class_id, names = self._class_id(kind)
+            return (_OBJECT, class_id) \
+                + tuple([self.encode(getattr(value, name)) for name in names])
+        if isinstance(value, Enum):
+            return (_ENUM, self._class_id(kind)[0], value.value)
+        if isinstance(value, datetime):
+            return (_DATETIME, value.isoformat())
+        if isinstance(value, date):
+            return (_DATE, value.isoformat())
+        if kind is tuple:
+            return (_TUPLE,) + tuple([self.encode(item) for item in value])
+        if kind is MappingProxyType:
+            return (_MAPPING, self.encode(dict(value)))
+        raise TypeError('Cannot snapshot {}'.format(kind.__name__))
+
+    def _class_id(self, cls: type) -> Tuple[int, Tuple[str, ...]]:
+        class_id = self._class_ids.get(cls)
+        if class_id is None:
+            names = _encoded_fields(cls) if attr.has(cls) else ()
+            class_id = (len(self.classes), names)
+            self.classes.append((cls.__name__, names))
+            self._class_ids[cls] = class_id
+        return class_id
+
+
+class _Decoder:
+    """Decodes models encoded by :class:`_Encoder`."""
+
+    def __init__(self, classes: List[Tuple[str, Tuple[str, ...]]]) -> None:
+        self._classes = [_plan(name, tuple(names)) for name, names in classes]
+        self._objects: List[Any] = []
+        self._decoders: Dict[int, Callable[[Tuple[Any, ...]], Any]] = {
+            _OBJECT: self._decode_object,
+            _REF: self._decode_ref,
+            _ENUM: self._decode_enum,
+            _DATETIME: lambda value: datetime.fromisoformat(value[1]),
+            _DATE: lambda value: date.fromisoformat(value[1]),
+            _TUPLE: self._decode_tuple,
+            _MAPPING: self._decode_mapping,
+        }
+
+    def decode(self, value: Any) -> Any:
+        """Decode a value encoded by :func:`_Encoder.encode`."""
+        kind = type(value)
+        if kind in _SCALAR_TYPES:
+            return value
+        if kind is tuple:
+            return self._decoders[value[0]](value)
+        if kind is list:
+            return [item if type(item) in _SCALAR_TYPES else self.decode(item)
+                    for item in value]
+        if kind is dict:
+            return {key: item if type(item) in _SCALAR_TYPES
+                    else self.decode(item) for key, item in value.items()}
+        return value
+
+    def _decode_object(self, value: Tuple[Any, ...]) -> Any:
+        cls, setters, missing = self._classes[value[1]]
+        obj = cls.__new__(cls)
+        # registered before its attributes, as when encoded
+        self._objects.append(obj)
+        decode = self.decode
+        for position, setter in setters:
+            item = value[position]
+            setter(obj, item if type(item) in _SCALAR_TYPES else decode(item))
+        for field in missing:
+            default = field.default
+            if isinstance(default, attr.Factory):  # type: ignore
+                default = default.factory()
+            object.__setattr__(obj, field.name, default)
+        return obj
+
+    def _decode_ref(self, value: Tuple[Any, ...]) -> Any:
+        return self._objects[value[1]]
+
+    def _decode_enum(self, value: Tuple[Any, ...]) -> Any:
+        return self._classes[value[1]][0](value[2])
+
+    def _decode_tuple(self, value: Tuple[Any, ...]) -> Any:
+        # pylint: disable=consider-using-generator
+        decode = self.decode
+        return tuple([decode(item) for item in value[1:]])
+
+    def _decode_mapping(self, value: Tuple[Any, ...]) -> Any:
+        return MappingProxyType(self.decode(value[1]))
@@ -3,7 +3,7 @@ from datetime import datetime
 import attr
 
 
-@attr.s
+@attr.s(slots=True)
 class Error:
     """Errors coming from your system.
 
@@ -22,7 +22,7 @@ class Error:
     timestamp = attr.ib(type=datetime)
 
 
-@attr.s
+@attr.s(slots=True)
 class BoilerStatus(Error):
     """Status of the boiler. This is sent with an error format, but in this
     case, it's more like a status.
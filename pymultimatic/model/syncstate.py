@@ -16,7 +16,7 @@ INITIALIZING = 'INITIALIZING'
 """Resource is initializing."""
 
 
-@attr.s
+@attr.s(slots=True)
 class SyncState:
     """Sync state coming from the API.
     In the vaillant API, most resource you can ask for are flagged with a
@@ -10,7 +10,7 @@ from . import (ActiveMode, HolidayMode, Room, Zone, BoilerStatus,
 
 
 # pylint: disable=too-many-instance-attributes
-@attr.s
+@attr.s(slots=True)
 class SystemInfo:
     """"Information about the system.
 
@@ -46,7 +46,7 @@ class SystemInfo:
 
 
 # pylint: disable=too-many-instance-attributes
-@attr.s
+@attr.s(slots=True)
 class System:
     """This class represents the main class to manipulate vaillant system. It
     groups all the information about the system.
@@ -105,6 +105,30 @@ class System:
         self._zones[zone_id] = zone
         self.zones = list(self._zones.values())
 
+    def set_zones(self, zones: List[Zone]) -> None:
+        """Replace all the :class:`~pymultimatic.model.component.Zone`.
+
+        Args:
+            zones (List[Zone]): the new zones
+
+        Returns:
+            None
+        """
+        self.zones = zones
+        self._zones = dict((zone.id, zone) for zone in zones)
+
+    def set_rooms(self, rooms: List[Room]) -> None:
+        """Replace all the :class:`~pymultimatic.model.component.Room`.
+
+        Args:
+            rooms (List[Room]): the new rooms
+
+        Returns:
+            None
+        """
+        self.rooms = rooms
+        self._rooms = dict((room.id, room) for room in rooms)
+
     def set_room(self, room_id: str, room: Room) -> None:
         """Set :class:`~pymultimatic.model.component.Room` for the given id.
 
@@ -1,25 +1,39 @@
 """Groups all time program related functionality. Time program is used when
 :class:`~pymultimatic.model.mode.OperatingModes.AUTO` operation mode is
 activated."""
-import copy
-from datetime import timedelta, datetime
-from typing import List, Dict, Optional, Any
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Any, Tuple, Iterable, Iterator
 
 import re
 import attr
 
 from . import SettingMode
 
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday',
+        'sunday')
+"""Days of the week, in the order of :func:`datetime.weekday`."""
 
-def _to_absolute_minutes(start_time: str) -> int:
-    """Convert hh:mm to absolute minutes."""
-    split = start_time.split(":")
-    hour = int(split[0]) * 60
-    minute = int(split[1])
-    return hour + minute
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
 
+_START_TIME = re.compile('[0-9]{1,2}:[0-9]{2}')
 
-@attr.s
+
+def _week_minute(date: datetime) -> int:
+    """Minute of the week of the date, monday 00:00 is 0."""
+    return date.weekday() * MINUTES_PER_DAY + date.hour * 60 + date.minute
+
+
+def _week_microsecond(date: datetime) -> int:
+    """Microsecond of the week of the date, monday 00:00:00 is 0."""
+    return (_week_minute(date) * 60 + date.second) * 1000000 \
+        + date.microsecond
+
+
+@attr.s(frozen=True, slots=True)
 class TimePeriodSetting:
     """This is a period setting, defining what the
     :class:`~pymultimatic.model.component.Component` should do when on
@@ -28,6 +42,8 @@ class TimePeriodSetting:
     There is not end of the period, the end of the period is equal to the start
     time of the next period.
 
+    A period setting is immutable, so it can be shared.
+
     Args:
         start_time (str): Start time of the period, format is HH:mm.
         target_temperature (float): Target temperature to reach during this
@@ -50,48 +66,148 @@ class TimePeriodSetting:
     This is more convenient to compare TimePeriodSetting using this."""
 
     def __attrs_post_init__(self) -> None:
-        self.absolute_minutes = _to_absolute_minutes(self.start_time)
-        self.hour = int(self.start_time.split(':')[0])
-        self.minute = int(self.start_time.split(':')[1])
+        hour, minute = self.start_time.split(':')
+        object.__setattr__(self, 'hour', int(hour))
+        object.__setattr__(self, 'minute', int(minute))
+        object.__setattr__(self, 'absolute_minutes',
+                           self.hour * 60 + self.minute)
 
     # pylint: disable=unused-argument, no-self-use
     @start_time.validator
     def _validate_start_time(self, attribute: Any, value: Any) -> None:
-        validator = re.compile('[0-9]{1,2}:[0-9]{2}')
-        if not validator.match(value):
+        if not _START_TIME.match(value):
             raise ValueError(value)
 
     def __deepcopy__(self, memodict: Any = None) -> 'TimePeriodSetting':
-        return TimePeriodSetting(self.start_time, self.target_temperature,
-                                 self.setting)
+        return self
+
+
+def _settings(settings: Iterable[TimePeriodSetting]) \
+        -> Tuple[TimePeriodSetting, ...]:
+    return tuple(settings)
 
 
-@attr.s
+@attr.s(frozen=True, slots=True)
 class TimeProgramDay:
     """This is a day, this is basically a list of :class:`TimePeriodSetting`.
 
+    A day is immutable, so it can be shared.
+
+    Args:
+        settings (Tuple[TimePeriodSetting, ...]): Periods for this day.
+    """
+
+    settings = attr.ib(type=Tuple[TimePeriodSetting, ...], converter=_settings)
+
+    def __deepcopy__(self, memodict: Any = None) -> 'TimeProgramDay':
+        return self
+
+
+@attr.s(frozen=True, slots=True)
+class TimeProgramInterval:
+    """Interval of the week during which a setting is active.
+
+    Args:
+        start (int): Start of the interval (included), in minutes since
+            monday 00:00.
+        end (int): End of the interval (excluded), in minutes since monday
+            00:00. The last interval of the week ends after the end of the
+            week (up to the start of the first interval, next week).
+        setting (TimePeriodSetting): The setting active during the interval.
+    """
+
+    start = attr.ib(type=int)
+    end = attr.ib(type=int)
+    setting = attr.ib(type=TimePeriodSetting)
+
+    @property
+    def target_temperature(self) -> Optional[float]:
+        """float: Target temperature of the setting."""
+        return self.setting.target_temperature
+
+
+@attr.s(frozen=True, slots=True)
+class TimeProgramTransition:
+    """Change of the active setting of a time program.
+
+    Args:
+        at (datetime): When the setting becomes active.
+        setting (TimePeriodSetting): The setting becoming active.
+    """
+
+    at = attr.ib(type=datetime)
+    setting = attr.ib(type=TimePeriodSetting)
+
+
+@attr.s(slots=True)
+class TimeProgramSeries:
+    """Result of the evaluation of a :class:`TimeProgram` over many dates.
+
+    Values are stored in :mod:`array` (they can be wrapped without copy by
+    ``numpy.frombuffer``).
+
     Args:
-        settings (List[TimePeriodSetting]): List of periods for this day.
+        settings (List[TimePeriodSetting]): Settings of the time program,
+            :attr:`ids` are indexes in this list.
+        ids (array): For each date, index of the active setting in
+            :attr:`settings` (typecode ``H``).
+        targets (array): For each date, target temperature of the active
+            setting, ``nan`` if there is none (typecode ``d``).
     """
 
     settings = attr.ib(type=List[TimePeriodSetting])
+    ids = attr.ib(type='array[int]')
+    targets = attr.ib(type='array[float]')
 
+    def __len__(self) -> int:
+        return len(self.ids)
 
-@attr.s
+    def setting(self, idx: int) -> TimePeriodSetting:
+        """Get the setting active at the date with the given index."""
+        return self.settings[self.ids[idx]]
+
+
+def _read_only(days: Mapping[str, TimeProgramDay]) \
+        -> Mapping[str, TimeProgramDay]:
+    return MappingProxyType(dict(days))
+
+
+def _same(first: TimePeriodSetting, second: TimePeriodSetting) -> bool:
+    return first.setting == second.setting \
+        and first.target_temperature == second.target_temperature
+
+
+@attr.s(frozen=True, slots=True)
 class TimeProgram:
     """This is the full time program, a week, reflecting the configuration done
     through mobile app.
 
+    A time program is immutable (:attr:`days` is a read-only mapping), to
+    change a day, create a new time program.
+
+    Note:
+        Identical time programs coming from the API are mapped to the same
+        instance, see :func:`~pymultimatic.model.mapper.map_time_program`.
+
     Args:
-        days (Dict[str, TimeProgramDay]): Days of the week.
+        days (Mapping[str, TimeProgramDay]): Days of the week.
     """
 
-    days = attr.ib(type=Dict[str, TimeProgramDay])
+    days = attr.ib(type=Mapping[str, TimeProgramDay], converter=_read_only)
+    _index = attr.ib(type=Optional[Tuple[List[int], List[TimePeriodSetting]]],
+                     default=None, init=False, repr=False, eq=False)
+    _table = attr.ib(type=Optional['array[int]'], default=None, init=False,
+                     repr=False, eq=False)
+    _intervals = attr.ib(type=Optional[List[TimeProgramInterval]],
+                         default=None, init=False, repr=False, eq=False)
 
     def get_for(self, search_date: datetime) -> TimePeriodSetting:
         """Get the corresponding :class:`TimePeriodSetting`
         for the given time.
 
+        If the given time is before the first setting of the day, the last
+        setting of the previous days is returned.
+
         Args:
             search_date (datetime): Only the day, the hour and minute are used
                 in order to get the right :class:`TimePeriodSetting`.
@@ -99,32 +215,10 @@ class TimeProgram:
         Returns:
             TimePeriodSetting: The corresponding setting.
         """
-        day = search_date.strftime("%A").lower()
-        day_before = (search_date - timedelta(days=1)).strftime("%A").lower()
-        time = str(search_date.hour) + ':' + str(search_date.minute)
-
-        abs_minutes = _to_absolute_minutes(time)
-        tp_day = self.days[day]
-        tp_day_before = self.days[day_before]
-
-        # if given hour:minute is before the first setting of the day,
-        # get last setting of the previous day
-        if abs_minutes < tp_day.settings[0].absolute_minutes:
-            return copy.deepcopy(tp_day_before.settings[-1])
-
-        idx: int = 0
-        max_len: int = len(tp_day.settings)
-        while idx < max_len and\
-                abs_minutes > tp_day.settings[idx].absolute_minutes:
-            idx += 1
-
-        if not idx == max_len:
-            # At this point, we went 1 step too far, so idx - 1
-            return copy.deepcopy(tp_day.settings[idx - 1])
-
-        # if no match a this point, it means search date is after the last
-        # setting of the day
-        return copy.deepcopy(tp_day.settings[-1])
+        starts, settings = self._week_index()
+        # a setting is active from its start time, included
+        # if before the first setting of the week, idx is -1: last setting
+        return settings[bisect_right(starts, _week_minute(search_date)) - 1]
 
     def get_next(self, search_date: datetime) -> TimePeriodSetting:
         """
@@ -144,29 +238,158 @@ class TimeProgram:
         Returns:
             TimePeriodSetting: The corresponding setting.
         """
-        day = search_date.strftime("%A").lower()
-        day_after = (search_date + timedelta(days=1)).strftime("%A").lower()
-        time = str(search_date.hour) + ':' + str(search_date.minute)
-
-        abs_minutes = _to_absolute_minutes(time)
-        tp_day = self.days[day]
-        tp_day_after = self.days[day_after]
-
-        # if given hour:minute is before the first setting of the day,
-        # get the first setting of the day
-        if abs_minutes < tp_day.settings[0].absolute_minutes:
-            return copy.deepcopy(tp_day.settings[0])
-
-        idx: int = 0
-        max_len: int = len(tp_day.settings)
-        while idx < max_len and \
-                abs_minutes > tp_day.settings[idx].absolute_minutes:
+        starts, settings = self._week_index()
+        idx = bisect_right(starts, _week_minute(search_date))
+        # after the last setting of the week, next one is the first one
+        return settings[idx % len(settings)]
+
+    def intervals(self) -> List[TimeProgramInterval]:
+        """Get the intervals of the week, sorted by start. Consecutive
+        settings with the same setting and target temperature are merged in
+        one interval, so the start of each interval is a real change.
+
+        Returns:
+            List[TimeProgramInterval]: The intervals, covering the whole week.
+        """
+        if self._intervals is None:
+            starts, settings = self._week_index()
+            changes = [(start, setting) for idx, (start, setting)
+                       in enumerate(zip(starts, settings))
+                       if not _same(setting, settings[idx - 1])]
+            if not changes and settings:
+                # same setting during the whole week
+                changes = [(starts[0], settings[0])]
+
+            intervals = []
+            for idx, (start, setting) in enumerate(changes):
+                end = changes[idx + 1][0] if idx + 1 < len(changes) \
+                    else changes[0][0] + MINUTES_PER_WEEK
+                intervals.append(TimeProgramInterval(start, end, setting))
+            object.__setattr__(self, '_intervals', intervals)
+            return intervals
+        return self._intervals
+
+    def transitions(self, from_date: datetime) \
+            -> Iterator[TimeProgramTransition]:
+        """Iterate over the next changes of the active setting, strictly after
+        the given date. The iteration is endless, unless the setting never
+        changes (then, there is no transition).
+
+        Args:
+            from_date (datetime): Date from which transitions are searched.
+
+        Returns:
+            Iterator[TimeProgramTransition]: The transitions, in order.
+        """
+        intervals = self.intervals()
+        if len(intervals) < 2:
+            return
+
+        week_minute = _week_minute(from_date)
+        week_start = from_date.replace(second=0, microsecond=0) \
+            - timedelta(minutes=week_minute)
+        starts = [interval.start for interval in intervals]
+        # a change at the current minute is already past
+        idx = bisect_right(starts, week_minute)
+        week = 0
+        while True:
+            if idx == len(intervals):
+                idx = 0
+                week += 1
+            interval = intervals[idx]
+            yield TimeProgramTransition(
+                week_start + timedelta(weeks=week, minutes=interval.start),
+                interval.setting)
             idx += 1
 
-        if not idx == max_len:
-            # At this point, we are on next setting, so it's fine
-            return copy.deepcopy(tp_day.settings[idx])
+    def evaluate(self, start: datetime, step: timedelta,
+                 count: int) -> TimeProgramSeries:
+        """Evaluate the time program for ``count`` dates, starting at
+        ``start`` and separated by ``step``. This is the same as calling
+        :func:`get_for` for each date, in a single pass.
+
+        Args:
+            start (datetime): First date.
+            step (timedelta): Time between two dates, it can be negative.
+            count (int): Number of dates.
 
-        # if no match a this point, it means search date is after the last
-        # setting of the day, so next one, is the first setting of the next day
-        return copy.deepcopy(tp_day_after.settings[0])
+        Returns:
+            TimeProgramSeries: Active settings and target temperatures.
+        """
+        table = self._week_table()
+        first = _week_microsecond(start)
+        step_us = step // timedelta(microseconds=1)
+
+        if step_us > 0 and step_us % 60000000 == 0:
+            # whole minutes: slice the table, one week at a time
+            step_minutes = step_us // 60000000
+            ids = array('H')
+            slot = first // 60000000
+            while len(ids) < count:
+                size = min(count - len(ids),
+                           (MINUTES_PER_WEEK - slot - 1) // step_minutes + 1)
+                ids.extend(table[slot:slot + size * step_minutes:step_minutes])
+                slot = (slot + size * step_minutes) % MINUTES_PER_WEEK
+            return self._series(ids)
+
+        week_us = MINUTES_PER_WEEK * 60000000
+        slots = ((first + i * step_us) % week_us // 60000000
+                 for i in range(count))
+        return self._series(array('H', (table[slot] for slot in slots)))
+
+    def evaluate_at(self, dates: Iterable[datetime]) -> TimeProgramSeries:
+        """Evaluate the time program for each date, this is the same as
+        calling :func:`get_for` for each date, in a single pass.
+
+        Args:
+            dates (Iterable[datetime]): Dates to evaluate.
+
+        Returns:
+            TimeProgramSeries: Active settings and target temperatures.
+        """
+        table = self._week_table()
+        return self._series(array('H', (table[_week_minute(date)]
+                                        for date in dates)))
+
+    def _series(self, ids: 'array[int]') -> TimeProgramSeries:
+        settings = self._week_index()[1]
+        by_id = [float('nan') if s.target_temperature is None
+                 else float(s.target_temperature) for s in settings]
+        return TimeProgramSeries(settings, ids,
+                                 array('d', map(by_id.__getitem__, ids)))
+
+    def _week_table(self) -> 'array[int]':
+        """Index of the active setting in :func:`_week_index`, for each minute
+        of the week."""
+        if self._table is None:
+            starts, settings = self._week_index()
+            if not settings:
+                raise IndexError('Time program is empty')
+            # before the first setting of the week, last setting is active
+            table = array('H', [len(settings) - 1]) * MINUTES_PER_WEEK
+            for idx, start in enumerate(starts):
+                end = starts[idx + 1] if idx + 1 < len(starts) \
+                    else MINUTES_PER_WEEK
+                table[start:end] = array('H', [idx]) * (end - start)
+            object.__setattr__(self, '_table', table)
+            return table
+        return self._table
+
+    def _week_index(self) -> Tuple[List[int], List[TimePeriodSetting]]:
+        """Sorted start times (in minutes of the week) of the settings, along
+        with the settings, computed on first use."""
+        if self._index is None:
+            starts: List[int] = []
+            settings: List[TimePeriodSetting] = []
+            for day_idx, day_name in enumerate(DAYS):
+                day = self.days.get(day_name)
+                if day is None:
+                    continue
+                for setting in sorted(day.settings,
+                                      key=lambda s: s.absolute_minutes):
+                    starts.append(day_idx * MINUTES_PER_DAY
+                                  + setting.absolute_minutes)
+                    settings.append(setting)
+            object.__setattr__(self, '_index', (starts, settings))
+            return starts, settings
+        return self._index
@@ -1,16 +1,22 @@
 """Groups everything related to the ventilation."""
+from typing import Optional
+
 import attr
 
-from . import Component, Function, ActiveMode, OperatingModes
+from . import Component, Function, ActiveMode, OperatingModes, QuickVeto
 
 
-@attr.s
+@attr.s(slots=True)
 class Ventilation(Function, Component):
     """Represent the ventilation."""
 
     MODES = [OperatingModes.OFF, OperatingModes.NIGHT, OperatingModes.DAY]
     """List of mode that are applicable to ventilation."""
 
+    # pylint: disable=invalid-name
+    id = attr.ib(type=str, default=None)
+    name = attr.ib(type=str, default=None)
+    quick_veto = attr.ib(type=Optional[QuickVeto], default=None)
     temperature = attr.ib(default=None, init=False)
 
     def _active_mode(self) -> ActiveMode:
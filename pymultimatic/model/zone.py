@@ -4,7 +4,8 @@ from typing import Optional
 
 import attr
 
-from . import (Function, ActiveMode, OperatingModes, constants, Component)
+from . import (Function, ActiveMode, OperatingModes, constants, Component,
+               QuickVeto)
 
 
 class ActiveFunction(Enum):
@@ -18,6 +19,7 @@ class ActiveFunction(Enum):
     HEATING = 'HEATING'
 
 
+@attr.s(slots=True)
 class ZoneHeating(Function):
     """Represent the heating function of a zone."""
 
@@ -37,6 +39,7 @@ class ZoneHeating(Function):
         return mode
 
 
+@attr.s(slots=True)
 class ZoneCooling(Function):
     """Represent the cooling function of a zone."""
 
@@ -50,7 +53,8 @@ class ZoneCooling(Function):
         return mode
 
 
-@attr.s
+# pylint: disable=too-many-instance-attributes
+@attr.s(slots=True)
 class Zone(Component):
     """This is representing a zone from the system.
 
@@ -80,6 +84,11 @@ class Zone(Component):
     MAX_TARGET_TEMP = constants.THERMOSTAT_MAX_TEMP
     """Max temperature that can be apply to a zone."""
 
+    # pylint: disable=invalid-name, duplicate-code
+    id = attr.ib(type=str, default=None)
+    name = attr.ib(type=str, default=None)
+    temperature = attr.ib(type=Optional[float], default=None)
+    quick_veto = attr.ib(type=Optional[QuickVeto], default=None)
     active_function = attr.ib(type=ActiveFunction, default=None)
     rbr = attr.ib(type=bool, default=False)
     heating = attr.ib(type=ZoneHeating, default=None)
@@ -1,16 +1,29 @@
 """Convenient manager to easily gets data from API."""
+# pylint: disable=too-many-lines
 import asyncio
 import logging
+import time
+from contextlib import nullcontext
 from datetime import date, timedelta
-from typing import Optional, List, Callable, Any, Tuple, Type
+from typing import Optional, List, Callable, Any, Tuple, Type, Iterable, \
+    Dict, Set, AsyncIterator, ContextManager
 
+import attr
 from aiohttp import ClientSession
+from aiohttp.abc import AbstractCookieJar
 from schema import Schema, SchemaError
 
-from .api import Connector, urls, payloads, defaults, ApiError, schemas
-from .model import mapper, System, HotWater, QuickMode, QuickVeto, Room, \
-    Zone, OperatingMode, Circulation, OperatingModes, constants, \
-    ZoneHeating, ZoneCooling
+from .api import Connector, urls, payloads, defaults, ApiError, schemas, \
+    validation
+from .api.cache import ResponseCache
+from .api.metrics import MetricsRegistry
+from .api.ratelimit import RateLimiter
+from .api.sessionstore import SessionStore
+from .history import RollupEngine, SeriesStore
+from .model import diff, mapper, snapshot, System, HotWater, QuickMode, QuickVeto, \
+    Room, Zone, OperatingMode, Circulation, OperatingModes, constants, \
+    ZoneHeating, ZoneCooling, EnergyHistory
+from .model.energy import split_range
 
 _LOGGER = logging.getLogger('SystemManager')
 
@@ -20,6 +33,7 @@ def retry_async(  # type: ignore
         on_exceptions: Tuple[Type[BaseException], ...] = (Exception, ),
         on_status_codes: Tuple[int, ...] = (),
         backoff_base: float = 0.5,
+        on_retry: Optional[Callable[..., None]] = None,
 ):
     """In case of exceptions, retries decoreted async function multiple times.
     Uses increasing backoff between tries.
@@ -30,6 +44,8 @@ def retry_async(  # type: ignore
          on_status_codes (tuple): If `ApiError` occurs,
             retry only on specified status codes.
          backoff_base (float): Backoff base value.
+         on_retry (Callable): Called with the exception and the arguments of
+            the decorated function before each retry.
     """
     on_exceptions = on_exceptions + (ApiError, )
 
@@ -46,6 +62,8 @@ def retry_async(  # type: ignore
                     if isinstance(ex, ApiError) and \
                             ex.response.status not in on_status_codes:
                         raise
+                    if on_retry is not None:
+                        on_retry(ex, *args, **kwargs)
                     retry_in = backoff_base * (num_tries - _num_tries)
                     _LOGGER.debug('Error occurred, retrying in %s', retry_in, exc_info=True)
                     await asyncio.sleep(retry_in)
@@ -53,7 +71,52 @@ def retry_async(  # type: ignore
     return decorator
 
 
-# pylint: disable=too-many-public-methods
+async def _none() -> None:
+    return None
+
+
+def _record_retry(_error: BaseException, manager: 'SystemManager',
+                  url_call: Callable[..., str], *_args: Any,
+                  **_kwargs: Any) -> None:
+    if manager.metrics is not None:
+        manager.metrics.record_retry(url_call.__name__)
+
+
+_NO_TIMING: ContextManager[None] = nullcontext()
+
+
+_ENDPOINTS: Dict[str, Tuple[Callable[..., str], Schema]] = {
+    'facilities': (urls.facilities_list, schemas.FACILITIES),
+    'gateway': (urls.gateway_type, schemas.GATEWAY),
+    'system': (urls.system, schemas.SYSTEM),
+    'live_report': (urls.live_report, schemas.LIVE_REPORT),
+    'hvac': (urls.hvac, schemas.HVAC),
+    'rooms': (urls.rooms, schemas.ROOM_LIST),
+}
+"""Endpoints used to get the system, with their schema."""
+
+_PARTS: Dict[str, Tuple[str, ...]] = {
+    'holiday': ('system',),
+    'quick_mode': ('system',),
+    'info': ('facilities', 'gateway', 'hvac'),
+    'zones': ('system',),
+    'rooms': ('rooms',),
+    'dhw': ('system', 'live_report'),
+    'reports': ('live_report',),
+    'outdoor_temperature': ('system',),
+    'boiler_status': ('hvac',),
+    'errors': ('hvac',),
+    'ventilation': ('system',),
+}
+"""Endpoints needed by each part (attribute) of the system."""
+
+_PART_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'live_report': ('reports',),
+    'hvac': ('boiler_status', 'errors'),
+}
+
+
+# pylint: disable=too-many-public-methods, too-many-instance-attributes
 class SystemManager:
     """This is a convenient manager to help interact with vaillant API.
 
@@ -71,22 +134,107 @@ class SystemManager:
         smartphone_id (str): This is required by the API to login.
         serial (str): If you have multiple facilities,
             you can specify which one to access
+        cache (ResponseCache): If set, responses are cached according to
+            the :class:`~pymultimatic.api.cache.CachePolicy` of each endpoint
+            and invalidated when the manager writes to the API.
+        session_store (SessionStore): If set, the session (cookies and serial
+            number) is saved after login and re-used when the manager
+            starts, saving the authentication round trips.
+        cookie_jar (AbstractCookieJar): If set, cookies of the account are
+            stored in this jar instead of the cookie jar of the session, see
+            :class:`~pymultimatic.api.connector.Connector`.
+        rate_limiter (RateLimiter): If set, requests are paced according to
+            the global and per endpoint
+            :class:`~pymultimatic.api.ratelimit.RatePolicy`. A limiter can
+            be shared by many managers.
+        validation_policy (ValidationPolicy): Decides which responses are
+            validated, by default, every response is validated. See
+            :class:`~pymultimatic.api.validation.ValidationPolicy`.
+        speculative_rooms (bool): If set, :func:`get_system` requests rooms
+            along with the other data, before knowing whether the system is
+            room by room, saving a round trip. Otherwise, rooms are requested
+            along with the other data only once the manager has seen a room
+            by room system.
+        incremental_mapping (bool): If set, zones, rooms, reports and dhw are
+            mapped again only if their json changed since the previous call,
+            otherwise, the previously mapped objects are re-used, see
+            :class:`~pymultimatic.model.mapper.MappingCache`.
+        snapshot_path (str): If set, a snapshot of the system is saved to
+            this file each time :func:`get_system` succeeds, so it can be
+            served right away when the manager starts, see
+            :func:`warm_start`.
+        base_url (str): If set, requests are sent to this URL instead of the
+            vaillant API, see :class:`~pymultimatic.api.connector.Connector`.
+        series_store (SeriesStore): If set, the values of the live reports
+            and the temperatures are appended to the store each time they
+            are received, see
+            :func:`~pymultimatic.history.store.SeriesStore.feed_system`.
+        rollup (RollupEngine): If set, the values of the live reports, the
+            temperatures and the energy history are added to the rollups
+            each time they are received, see
+            :class:`~pymultimatic.history.rollup.RollupEngine`.
+        metrics (MetricsRegistry): If set, requests, retries, new logins,
+            the time spent validating the responses and mapping them (in
+            :func:`get_system` and the getters of a single component) are
+            recorded by endpoint, see
+            :class:`~pymultimatic.api.metrics.MetricsRegistry`.
+        connector_factory (Callable[..., Connector]): Creates the connector
+            of the manager, it's called with the same arguments as
+            :class:`~pymultimatic.api.connector.Connector`, e.g.
+            :class:`~pymultimatic.api.replay.RecordingConnector` to record
+            the session of the manager.
     """
-    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-arguments, too-many-locals
     def __init__(self,
                  user: str,
                  password: str,
                  session: ClientSession,
                  smartphone_id: str = defaults.SMARTPHONE_ID,
-                 serial: Optional[str] = None):
-        self._connector: Connector = Connector(
+                 serial: Optional[str] = None,
+                 cache: Optional[ResponseCache] = None,
+                 session_store: Optional[SessionStore] = None,
+                 cookie_jar: Optional[AbstractCookieJar] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 validation_policy: Optional[
+                     validation.ValidationPolicy] = None,
+                 speculative_rooms: bool = False,
+                 incremental_mapping: bool = False,
+                 snapshot_path: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 series_store: Optional[SeriesStore] = None,
+                 rollup: Optional[RollupEngine] = None,
+                 metrics: Optional[MetricsRegistry] = None,
+                 connector_factory: Callable[..., Connector] = Connector):
+        self._connector: Connector = connector_factory(
             user,
             password,
             session,
-            smartphone_id)
+            smartphone_id,
+            session_store,
+            cookie_jar,
+            rate_limiter,
+            base_url,
+            metrics)
         self._serial = serial
         self._fixed_serial = self._serial is not None
         self._ensure_ready_lock = asyncio.Lock()
+        self._cache = cache
+        self._session_store = session_store
+        self._validation_policy = validation_policy \
+            or validation.ValidationPolicy()
+        self._speculative_rooms = speculative_rooms
+        self._has_rbr: Optional[bool] = None
+        self._mapping_cache = mapper.MappingCache() if incremental_mapping \
+            else None
+        self._snapshot_path = snapshot_path
+        self._series_store = series_store
+        self._rollup = rollup
+        self._metrics = metrics
+
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """MetricsRegistry: Metrics of the API calls, if enabled."""
+        return self._metrics
 
     async def login(self, force_login: bool = False) -> bool:
         """Try to login to the API, see
@@ -106,6 +254,10 @@ class SystemManager:
         """
         if not self._fixed_serial:
             self._serial = None
+        if self._cache is not None:
+            self._cache.clear()
+        if self._mapping_cache is not None:
+            self._mapping_cache.clear()
         await self._connector.logout()
 
     # pylint: disable=too-many-locals
@@ -118,45 +270,200 @@ class SystemManager:
             System: the full system.
         """
 
-        facilities, full_system, live_report, hvac_state, gateway = await asyncio.gather(
-            self._call_api(urls.facilities_list, schema=schemas.FACILITIES),
-            self._call_api(urls.system, schema=schemas.SYSTEM),
-            self._call_api(urls.live_report, schema=schemas.LIVE_REPORT),
-            self._call_api(urls.hvac, schema=schemas.HVAC),
-            self._call_api(urls.gateway_type, schema=schemas.GATEWAY),
-        )
+        prefetch_rooms = self._has_rbr if self._has_rbr is not None \
+            else self._speculative_rooms
+
+        facilities, full_system, live_report, hvac_state, gateway, rooms_raw = \
+            await asyncio.gather(
+                self._call_api(urls.facilities_list, schema=schemas.FACILITIES),
+                self._call_api(urls.system, schema=schemas.SYSTEM),
+                self._call_api(urls.live_report, schema=schemas.LIVE_REPORT),
+                self._call_api(urls.hvac, schema=schemas.HVAC),
+                self._call_api(urls.gateway_type, schema=schemas.GATEWAY),
+                self._prefetch_rooms() if prefetch_rooms else _none(),
+            )
 
-        system_info = mapper.map_system_info(
-            facilities, gateway, hvac_state, self._serial)
+        with self._timed('mapping', 'facilities_list'):
+            system_info = mapper.map_system_info(
+                facilities, gateway, hvac_state, self._serial)
 
-        boiler_status = mapper.map_boiler_status(hvac_state)
-        errors = mapper.map_errors(hvac_state)
+        with self._timed('mapping', 'hvac'):
+            boiler_status = mapper.map_boiler_status(hvac_state)
+            errors = mapper.map_errors(hvac_state)
 
-        holiday = mapper.map_holiday_mode(full_system)
-        zones = mapper.map_zones(full_system)
-        outdoor_temp = mapper.map_outdoor_temp(full_system)
-        quick_mode = mapper.map_quick_mode(full_system)
-        ventilation = mapper.map_ventilation(full_system)
+        with self._timed('mapping', 'system'):
+            holiday = mapper.map_holiday_mode(full_system)
+            zones = mapper.map_zones(full_system, self._mapping_cache)
+            outdoor_temp = mapper.map_outdoor_temp(full_system)
+            quick_mode = mapper.map_quick_mode(full_system)
+            ventilation = mapper.map_ventilation(full_system)
 
-        dhw = mapper.map_dhw(full_system, live_report)
-        reports = mapper.map_reports(live_report)
+        with self._timed('mapping', 'live_report'):
+            dhw = mapper.map_dhw(full_system, live_report, self._mapping_cache)
+            reports = mapper.map_reports(live_report, self._mapping_cache)
 
         rooms: List[Room] = []
-        if [z for z in zones if z.rbr]:
-            rooms_raw = await self._call_api(urls.rooms, schema=schemas.ROOM_LIST)
-            rooms = mapper.map_rooms(rooms_raw)
-
-        return System(holiday=holiday,
-                      quick_mode=quick_mode,
-                      info=system_info,
-                      zones=zones,
-                      rooms=rooms,
-                      dhw=dhw,
-                      reports=reports,
-                      outdoor_temperature=outdoor_temp,
-                      boiler_status=boiler_status,
-                      errors=errors,
-                      ventilation=ventilation)
+        self._has_rbr = any(z.rbr for z in zones)
+        if self._has_rbr:
+            if rooms_raw is None:
+                rooms_raw = await self._call_api(urls.rooms, schema=schemas.ROOM_LIST)
+            with self._timed('mapping', 'rooms'):
+                rooms = mapper.map_rooms(rooms_raw, self._mapping_cache)
+
+        system = System(holiday=holiday,
+                        quick_mode=quick_mode,
+                        info=system_info,
+                        zones=zones,
+                        rooms=rooms,
+                        dhw=dhw,
+                        reports=reports,
+                        outdoor_temperature=outdoor_temp,
+                        boiler_status=boiler_status,
+                        errors=errors,
+                        ventilation=ventilation)
+        self._save_snapshot(system)
+        self._store(system)
+        return system
+
+    def load_snapshot(self) -> Optional[System]:
+        """Load the last saved snapshot of the system, see ``snapshot_path``.
+
+        Returns:
+            System: The saved system, ``None`` if there is no snapshot or it
+            cannot be loaded.
+        """
+        if self._snapshot_path is None:
+            return None
+        try:
+            return snapshot.load(self._snapshot_path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            _LOGGER.warning('Cannot load snapshot %s', self._snapshot_path,
+                            exc_info=True)
+            return None
+
+    async def warm_start(self) \
+            -> Tuple[Optional[System], 'asyncio.Future[System]']:
+        """Get the last saved snapshot of the system immediately, while the
+        system is fetched in the background.
+
+        Returns:
+            Tuple[System, asyncio.Future]: The saved system (``None`` if
+            there is no snapshot) and the pending :func:`get_system`.
+        """
+        return self.load_snapshot(), asyncio.ensure_future(self.get_system())
+
+    async def refresh(self, system: System, parts: Iterable[str]) -> System:
+        """Refresh only some parts of the system, in place. Only the
+        endpoints needed by the parts are requested.
+
+        Parts are names of :class:`~pymultimatic.model.system.System`
+        attributes (e.g. ``zones``, ``reports``, ``boiler_status``), along
+        with ``live_report`` (same as ``reports``) and ``hvac`` (same as
+        ``boiler_status`` and ``errors``).
+
+        When the live report is requested, the temperature of the hot water
+        is updated as well.
+
+        Args:
+            system (System): The system to refresh.
+            parts (Iterable[str]): Parts to refresh.
+
+        Returns:
+            System: the same system, refreshed.
+
+        Raises:
+            ValueError: When a part is unknown.
+        """
+        wanted: Set[str] = set()
+        for part in parts:
+            if part in _PART_ALIASES:
+                wanted.update(_PART_ALIASES[part])
+            elif part in _PARTS:
+                wanted.add(part)
+            else:
+                raise ValueError('Unknown part: ' + part)
+
+        names = sorted({name for part in wanted for name in _PARTS[part]})
+        responses = dict(zip(names, await asyncio.gather(*[
+            self._call_api(_ENDPOINTS[name][0], schema=_ENDPOINTS[name][1])
+            for name in names
+        ])))
+
+        self._apply_parts(system, wanted, responses)
+        return system
+
+    async def watch(self, interval: float,
+                    system: Optional[System] = None) \
+            -> AsyncIterator[List[diff.Change]]:
+        """Poll the system every ``interval`` seconds and yield changes
+        since the previous poll (see
+        :func:`~pymultimatic.model.diff.diff_systems`). Polls without any
+        change are not yielded.
+
+        Errors while polling are raised to the caller, which may start to
+        watch again from the last known system.
+
+        Args:
+            interval (float): Seconds to wait between polls.
+            system (System): Previous snapshot of the system, changes are
+                computed against it. If not set, the first poll only
+                initializes the snapshot.
+        """
+        previous = system
+        while True:
+            current = await self.get_system()
+            if previous is not None:
+                changes = diff.diff_systems(previous, current)
+                if changes:
+                    yield changes
+            previous = current
+            await asyncio.sleep(interval)
+
+    # pylint: disable=too-many-branches
+    def _apply_parts(self, system: System, parts: Set[str],
+                     responses: Dict[str, Any]) -> None:
+        full_system = responses.get('system')
+        live_report = responses.get('live_report')
+        hvac_state = responses.get('hvac')
+
+        if 'holiday' in parts:
+            system.holiday = mapper.map_holiday_mode(full_system)
+        if 'quick_mode' in parts:
+            system.quick_mode = mapper.map_quick_mode(full_system)
+        if 'info' in parts:
+            system.info = mapper.map_system_info(
+                responses['facilities'], responses['gateway'], hvac_state,
+                self._serial)
+        if 'zones' in parts:
+            system.set_zones(mapper.map_zones(full_system,
+                                              self._mapping_cache))
+            self._has_rbr = any(z.rbr for z in system.zones)
+        if 'rooms' in parts:
+            system.set_rooms(mapper.map_rooms(responses['rooms'],
+                                              self._mapping_cache))
+        if 'dhw' in parts:
+            system.dhw = mapper.map_dhw(full_system, live_report,
+                                        self._mapping_cache)
+        elif live_report is not None and system.dhw \
+                and system.dhw.hotwater:
+            # mapped objects may be shared, don't modify them
+            system.dhw = attr.evolve(system.dhw, hotwater=attr.evolve(
+                system.dhw.hotwater,
+                temperature=mapper.map_dhw_temperature(live_report)))
+        if 'reports' in parts:
+            system.reports = mapper.map_reports(live_report,
+                                                self._mapping_cache)
+            self._store(system, reports_only=True)
+        if 'outdoor_temperature' in parts:
+            system.outdoor_temperature = mapper.map_outdoor_temp(full_system)
+        if 'boiler_status' in parts:
+            system.boiler_status = mapper.map_boiler_status(hvac_state)
+        if 'errors' in parts:
+            system.errors = mapper.map_errors(hvac_state)
+        if 'ventilation' in parts:
+            system.ventilation = mapper.map_ventilation(full_system)
 
     async def get_hot_water(self, dhw_id: str) -> Optional[HotWater]:
         """Get the :class:`~pymultimatic.model.component.HotWater`
@@ -173,7 +480,8 @@ class SystemManager:
             self._call_api(urls.hot_water, params={'id': dhw_id}, schema=schemas.FUNCTION),
             self._call_api(urls.live_report, schema=schemas.LIVE_REPORT),
         )
-        return mapper.map_hot_water_alone(dhw, dhw_id, report)
+        with self._timed('mapping', 'hot_water'):
+            return mapper.map_hot_water_alone(dhw, dhw_id, report)
 
     async def get_room(self, room_id: str) -> Optional[Room]:
         """Get the :class:`~pymultimatic.model.component.Room` information
@@ -187,7 +495,8 @@ class SystemManager:
             Room: the room information, if any.
         """
         new_room = await self._call_api(urls.room, params={'id': room_id}, schema=schemas.ROOM)
-        return mapper.map_room(new_room)
+        with self._timed('mapping', 'room'):
+            return mapper.map_room(new_room)
 
     async def get_zone(self, zone_id: str) -> Optional[Zone]:
         """"Get the :class:`~pymultimatic.model.component.Zone` information
@@ -201,7 +510,8 @@ class SystemManager:
             Zone: the zone information, if any.
         """
         new_zone = await self._call_api(urls.zone, params={'id': zone_id}, schema=schemas.ZONE)
-        return mapper.map_zone(new_zone)
+        with self._timed('mapping', 'zone'):
+            return mapper.map_zone(new_zone)
 
     async def get_circulation(self, dhw_id: str) -> Optional[Circulation]:
         """"Get the :class:`~pymultimatic.model.component.Circulation`
@@ -216,7 +526,67 @@ class SystemManager:
         new_circulation = await self._call_api(urls.circulation,
                                                params={'id': dhw_id},
                                                schema=schemas.FUNCTION)
-        return mapper.map_circulation_alone(new_circulation, dhw_id)
+        with self._timed('mapping', 'circulation'):
+            return mapper.map_circulation_alone(new_circulation, dhw_id)
+
+    # pylint: disable=too-many-arguments
+    async def get_energy_history(
+            self, start: date, end: date, time_range: str = 'MONTH',
+            series: Optional[List[Tuple[str, str, str]]] = None,
+            max_concurrency: int = 4) -> EnergyHistory:
+        """Get the :class:`~pymultimatic.model.energy.EnergyHistory` of the
+        installation between two dates.
+
+        The range is split into windows of ``time_range``, the report of each
+        window is requested (at most ``max_concurrency`` at the same time),
+        then reports are merged.
+
+        Args:
+            start (date): First day of the history.
+            end (date): Last day of the history (included).
+            time_range (str): Size of the windows, the API reports hourly
+                values for a ``DAY``, daily values for a ``WEEK`` or a
+                ``MONTH`` and monthly values for a ``YEAR``.
+            series (List[Tuple[str, str, str]]): Device id, energy type and
+                function of the history to get, by default, every emf report
+                of the installation.
+            max_concurrency (int): Max number of reports requested at the
+                same time.
+
+        Returns:
+            EnergyHistory: The history.
+        """
+        windows = split_range(start, end, time_range)
+        if series is None:
+            devices = await self._call_api(urls.emf_report,
+                                           schema=schemas.EMF_DEVICES)
+            series = mapper.map_emf_series(devices)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _fetch(key: Tuple[str, str, str],
+                         window_start: date) \
+                -> Tuple[Tuple[str, str, str], Any]:
+            device_id, energy_type, function = key
+            async with semaphore:
+                return key, await self._call_api(
+                    urls.emf_report_device, schema=schemas.EMF_REPORT,
+                    params={'device_id': device_id,
+                            'energy_type': energy_type,
+                            'function': function,
+                            'time_range': time_range,
+                            'start': window_start.isoformat(),
+                            'offset': '0'})
+
+        reports = await asyncio.gather(*[
+            _fetch(key, window_start) for key in series
+            for window_start, _ in windows])
+        with self._timed('mapping', 'emf_report_device'):
+            history = mapper.map_energy_history(start, end, time_range,
+                                                list(reports))
+        if self._rollup is not None:
+            self._rollup.feed_energy(history)
+        return history
 
     async def set_quick_mode(self, quick_mode: QuickMode) -> None:
         """Set a :class:`~pymultimatic.model.mode.QuickMode` system wise.
@@ -674,6 +1044,37 @@ class SystemManager:
         if state and not state.is_pending:
             await self._call_api(urls.hvac_update, 'put')
 
+    def _save_snapshot(self, system: System) -> None:
+        if self._snapshot_path is None:
+            return
+        try:
+            snapshot.dump(system, self._snapshot_path)
+        except (OSError, TypeError):
+            _LOGGER.warning('Cannot save snapshot %s', self._snapshot_path,
+                            exc_info=True)
+
+    def _store(self, system: System, reports_only: bool = False) -> None:
+        now = time.time()
+        for history in (self._series_store, self._rollup):
+            if history is None:
+                continue
+            try:
+                if reports_only:
+                    history.feed(system.reports, now)
+                else:
+                    history.feed_system(system, now)
+            except (OSError, ValueError):
+                _LOGGER.warning('Cannot store reports', exc_info=True)
+
+    async def _prefetch_rooms(self) -> Any:
+        """Get rooms before knowing if they are needed, errors are ignored,
+        rooms will be requested again if they are needed."""
+        try:
+            return await self._call_api(urls.rooms, schema=schemas.ROOM_LIST)
+        except (ApiError, SchemaError):
+            _LOGGER.debug('Cannot prefetch rooms', exc_info=True)
+            return None
+
     @staticmethod
     def _round(number: float) -> float:
         """round a float to the nearest 0.5, as vaillant API only accepts 0.5
@@ -683,7 +1084,8 @@ class SystemManager:
     @retry_async(  # type: ignore
         on_exceptions=(SchemaError, ),
         on_status_codes=tuple(range(500, 600)),
-        backoff_base=1
+        backoff_base=1,
+        on_retry=_record_retry
     )
     async def _call_api(self,
                         url_call: Callable[..., str],
@@ -703,11 +1105,45 @@ class SystemManager:
                 method = 'put'
 
         url = url_call(**params)
-        response = await self._connector.request(method, url, payload)
-        if schema:
-            return schema.validate(response)
+        endpoint = url_call.__name__
+        cached = None
+        if self._cache is not None and method == 'get':
+            cached = self._cache.get(url_call, url)
+
+        if cached is not None:
+            # validated when it was fetched
+            return cached
+
+        if self._cache is None or method == 'get':
+            response = await self._connector.request(method, url, payload,
+                                                     endpoint=endpoint)
+        else:
+            try:
+                response = await self._connector.request(method, url, payload,
+                                                         endpoint=endpoint)
+            finally:
+                self._cache.invalidate(url_call, url, **params)
+
+        raw_response = response
+        if schema and self._validation_policy.should_validate(endpoint,
+                                                              response):
+            try:
+                with self._timed('validation', endpoint):
+                    response = validation.validate(schema, response)
+            except SchemaError:
+                self._validation_policy.on_invalid(endpoint)
+                raise
+
+        # only valid responses are cached, as returned by the connector
+        if self._cache is not None and method == 'get':
+            self._cache.set(url_call, url, raw_response)
         return response
 
+    def _timed(self, metric: str, endpoint: str) -> ContextManager[None]:
+        if self._metrics is None:
+            return _NO_TIMING
+        return self._metrics.timed(metric, endpoint)
+
     async def _ensure_ready(self) -> None:
         if not await self._connector.is_logged():
             async with self._ensure_ready_lock:
@@ -722,5 +1158,12 @@ class SystemManager:
 
     async def _fetch_serial(self) -> None:
         if not self._fixed_serial:
+            if self._session_store is not None:
+                self._serial = self._session_store.load_serial()
+                if self._serial:
+                    return
+
             facilities = await self._connector.get(urls.facilities_list())
             self._serial = mapper.map_serial_number(facilities)
+            if self._session_store is not None:
+                self._session_store.save_serial(self._serial)
@@ -0,0 +1,254 @@
+"""Pool of managers to poll many installations."""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import (Any, AsyncIterator, Callable, Dict, Hashable, Iterator,
+                    List, Optional, Set, Tuple)
+
+import attr
+
+from .model import System
+from .systemmanager import SystemManager
+
+_LOGGER = logging.getLogger('SystemManagerPool')
+
+
+@attr.s
+class PoolResult:
+    """Result of the refresh of one manager of the pool.
+
+    Args:
+        key (Hashable): Key of the manager in the pool.
+        system (System): The refreshed system, `None` if there is an error.
+        error (BaseException): Error raised during the refresh, if any.
+        started_at (float): When the refresh started, according to the clock
+            of the pool.
+        duration (float): How long (in seconds) the refresh took.
+    """
+
+    key = attr.ib(type=Hashable)
+    system = attr.ib(type=Optional[System], default=None)
+    error = attr.ib(type=Optional[BaseException], default=None)
+    started_at = attr.ib(type=float, default=0.0)
+    duration = attr.ib(type=float, default=0.0)
+
+    @property
+    def is_success(self) -> bool:
+        """bool: Checks if the refresh succeeded."""
+        return self.error is None
+
+
+class SystemManagerPool:
+    """Groups many :class:`~pymultimatic.systemmanager.SystemManager` (one per
+    account or installation) and refreshes them with a global concurrency
+    limit.
+
+    Refreshes are scheduled by due date, so every manager gets its turn, and a
+    manager is not refreshed more often than ``min_interval``. A manager is
+    never refreshed twice at the same time, this also holds between
+    :func:`refresh_all` and :func:`poll`.
+
+    Args:
+        max_concurrency (int): Max number of managers refreshed at the same
+            time.
+        min_interval (float): Min time (in seconds) between the start of two
+            refreshes of the same manager.
+        clock (Callable[[], float]): Source of time, in seconds.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 10,
+                 min_interval: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self._max_concurrency = max_concurrency
+        self._min_interval = min_interval
+        self._clock = clock
+        self._managers: Dict[Hashable, SystemManager] = {}
+        self._wake_ups: Set[asyncio.Event] = set()
+        # refresh in progress and start of the last refresh, by key
+        self._refreshing: Dict[Hashable, 'asyncio.Future[PoolResult]'] = {}
+        self._started: Dict[Hashable, float] = {}
+
+    def add(self, key: Hashable, manager: SystemManager) -> None:
+        """Add (or replace) a manager to the pool, it will be refreshed as
+        soon as possible."""
+        self._managers[key] = manager
+        self._started.pop(key, None)
+        self._wake_up()
+
+    def remove(self, key: Hashable) -> Optional[SystemManager]:
+        """Remove a manager from the pool, a refresh already running is not
+        cancelled."""
+        self._started.pop(key, None)
+        return self._managers.pop(key, None)
+
+    def get(self, key: Hashable) -> Optional[SystemManager]:
+        """Get the manager for the given key, if any."""
+        return self._managers.get(key)
+
+    def __len__(self) -> int:
+        return len(self._managers)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._managers
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._managers))
+
+    async def refresh_all(self) -> AsyncIterator[PoolResult]:
+        """Refresh every manager once, results are yielded as soon as they are
+        available.
+
+        Managers already refreshing (e.g. by :func:`poll`) or refreshed less
+        than ``min_interval`` ago are skipped.
+        """
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def _limited(key: Hashable, manager: SystemManager) -> PoolResult:
+            async with semaphore:
+                return await self._refresh(key, manager)
+
+        futures = []
+        for key, manager in list(self._managers.items()):
+            if self._is_due(key):
+                futures.append(self._track(key, asyncio.ensure_future(
+                    _limited(key, manager))))
+        for future in asyncio.as_completed(futures):
+            yield await future
+
+    async def poll(self) -> AsyncIterator[PoolResult]:
+        """Refresh managers continuously, results are yielded as soon as they
+        are available. Stopping the iteration stops the scheduling.
+        """
+        results: 'asyncio.Queue[PoolResult]' = asyncio.Queue()
+        wake_up = asyncio.Event()
+        self._wake_ups.add(wake_up)
+        scheduler = asyncio.ensure_future(self._schedule(results, wake_up))
+        try:
+            while True:
+                getter = asyncio.ensure_future(results.get())
+                await asyncio.wait([getter, scheduler],
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    # scheduler stopped, raise its error
+                    scheduler.result()
+                yield getter.result()
+        finally:
+            self._wake_ups.discard(wake_up)
+            scheduler.cancel()
+            await asyncio.gather(scheduler, return_exceptions=True)
+
+    async def logout(self) -> None:
+        """Logout all the managers."""
+        await asyncio.gather(*[manager.logout()
+                               for manager in self._managers.values()],
+                             return_exceptions=True)
+
+    # pylint: disable=too-many-locals
+    async def _schedule(self, results: 'asyncio.Queue[PoolResult]',
+                        wake_up: asyncio.Event) -> None:
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        sequence = itertools.count()
+        due: List[Tuple[float, int, Hashable]] = []
+        scheduled: Set[Hashable] = set()
+        running: Set['asyncio.Future[PoolResult]'] = set()
+
+        def _reschedule(key: Hashable, started: float) -> None:
+            heapq.heappush(due, (started + self._min_interval,
+                                 next(sequence), key))
+            wake_up.set()
+
+        def _done(key: Hashable, future: 'asyncio.Future[PoolResult]') -> None:
+            semaphore.release()
+            running.discard(future)
+            if future.cancelled():
+                return
+            result = future.result()
+            results.put_nowait(result)
+            _reschedule(key, result.started_at)
+
+        try:
+            while True:
+                for key in self._managers:
+                    if key not in scheduled:
+                        scheduled.add(key)
+                        heapq.heappush(due, (self._clock(), next(sequence),
+                                             key))
+
+                delay = due[0][0] - self._clock() if due else None
+                if delay is None or delay > 0:
+                    wake_up.clear()
+                    try:
+                        await asyncio.wait_for(wake_up.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                _, _, key = heapq.heappop(due)
+                manager = self._managers.get(key)
+                if manager is None:
+                    scheduled.discard(key)
+                    continue
+
+                await semaphore.acquire()
+                refreshing = self._refreshing.get(key)
+                if refreshing is not None:
+                    # refreshed by refresh_all, due again after it
+                    semaphore.release()
+                    refreshing.add_done_callback(
+                        lambda _, key=key: _reschedule(  # type: ignore
+                            key, self._started.get(key, self._clock())))
+                    continue
+                if not self._is_due(key):
+                    semaphore.release()
+                    _reschedule(key, self._started[key])
+                    continue
+
+                future = self._track(key, asyncio.ensure_future(
+                    self._refresh(key, manager)))
+                running.add(future)
+                future.add_done_callback(
+                    lambda done, key=key: _done(key, done))  # type: ignore
+        finally:
+            for pending in list(running):
+                pending.cancel()
+
+    def _is_due(self, key: Hashable) -> bool:
+        """Checks if a manager is not refreshing and its last refresh
+        started at least ``min_interval`` ago."""
+        if key in self._refreshing:
+            return False
+        started = self._started.get(key)
+        return started is None \
+            or self._clock() - started >= self._min_interval
+
+    def _track(self, key: Hashable, future: 'asyncio.Future[PoolResult]') \
+            -> 'asyncio.Future[PoolResult]':
+        self._refreshing[key] = future
+
+        def _done(_: Any) -> None:
+            if self._refreshing.get(key) is future:
+                del self._refreshing[key]
+
+        future.add_done_callback(_done)
+        return future
+
+    async def _refresh(self, key: Hashable,
+                       manager: SystemManager) -> PoolResult:
+        started_at = self._clock()
+        self._started[key] = started_at
+        try:
+            system = await manager.get_system()
+            return PoolResult(key, system=system, started_at=started_at,
+                              duration=self._clock() - started_at)
+        except Exception as exc:  # pylint: disable=broad-except
+            _LOGGER.debug('Cannot refresh %s', key, exc_info=True)
+            return PoolResult(key, error=exc, started_at=started_at,
+                              duration=self._clock() - started_at)
+
+    def _wake_up(self) -> None:
+        for wake_up in self._wake_ups:
+            wake_up.set()
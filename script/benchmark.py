@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""Benchmarks of pymultimatic, based on the responses used by the tests.
+
+Usage: python3 benchmark.py [suite|validation|time_program|memory|snapshot|history]
+                            [--scales 1,10] [--json FILE] [--baseline FILE]
+
+The suite measures every step of get_system (from the HTTP request to the
+active modes), on installations scaled up from the test responses. The other
+benchmarks compare alternative implementations.
+"""
+import argparse
+import asyncio
+import copy
+import json
+from datetime import datetime, timedelta
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+import aiohttp
+import attr
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from pymultimatic.api import Connector, schemas, urls, validation
+from pymultimatic.api.replay import RecordedExchange, Recording, ReplayServer
+from pymultimatic.history import SeriesStore
+from pymultimatic.model import System, mapper, snapshot
+from pymultimatic.systemmanager import SystemManager
+
+RESPONSES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'files',
+                         'responses')
+
+VALIDATIONS = [
+    ('facilities', schemas.FACILITIES),
+    ('systemcontrol', schemas.SYSTEM),
+    ('livereport', schemas.LIVE_REPORT),
+    ('hvacstate_errors', schemas.HVAC),
+    ('rooms', schemas.ROOM_LIST),
+    ('gateway', schemas.GATEWAY),
+]
+
+
+def _load(name):
+    with open(os.path.join(RESPONSES, name), 'r') as file:
+        return json.loads(file.read())
+
+
+def _time(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def bench_validation(number=200):
+    print('{:<20}{:>14}{:>14}{:>10}{:>12}'.format(
+        'validation', 'schema (us)', 'compiled (us)', 'speedup', 'shape (us)'))
+    for name, schema in VALIDATIONS:
+        data = _load(name)
+        # make sure the fast path is taken
+        assert validation.validate(schema, data) is data
+        # fixture may be mutated by schema, work on copies
+        data_copy = copy.deepcopy(data)
+
+        slow = _time(lambda: schema.validate(data_copy), number)
+        fast = _time(lambda: validation.validate(schema, data), number)
+        # cost of a sampled validation which is skipped
+        shape = _time(lambda: validation.shape(data), number)
+        print('{:<20}{:>14.1f}{:>14.1f}{:>9.1f}x{:>12.1f}'.format(
+            name, slow * 1e6, fast * 1e6, slow / fast, shape * 1e6))
+
+
+def bench_time_program(number=5):
+    time_program = mapper.map_zones(_load('systemcontrol'))[0] \
+        .heating.time_program
+    start = datetime(2019, 2, 18)
+    step = timedelta(minutes=1)
+    minutes = 7 * 24 * 60
+
+    def _loop():
+        return [time_program.get_for(start + i * step)
+                for i in range(minutes)]
+
+    loop = _time(_loop, number)
+    batch = _time(lambda: time_program.evaluate(start, step, minutes), number)
+    print('{:<20}{:>14}{:>14}{:>10}'.format('time program (week)',
+                                            'get_for (ms)', 'evaluate (ms)',
+                                            'speedup'))
+    print('{:<20}{:>14.1f}{:>14.1f}{:>9.1f}x'.format(
+        '1 minute step', loop * 1e3, batch * 1e3, loop / batch))
+
+
+def _map_system(responses):
+    full_system, rooms, live_report, hvac, facilities, gateway = responses
+    return System(
+        holiday=mapper.map_holiday_mode(full_system),
+        quick_mode=mapper.map_quick_mode(full_system),
+        info=mapper.map_system_info(facilities, gateway, hvac, None),
+        zones=mapper.map_zones(full_system),
+        rooms=mapper.map_rooms(rooms),
+        dhw=mapper.map_dhw(full_system, live_report),
+        reports=mapper.map_reports(live_report),
+        outdoor_temperature=mapper.map_outdoor_temp(full_system),
+        boiler_status=mapper.map_boiler_status(hvac),
+        errors=mapper.map_errors(hvac),
+        ventilation=mapper.map_ventilation(full_system))
+
+
+def bench_memory(count=1000):
+    responses = [_load(name) for name in ('systemcontrol', 'rooms',
+                                          'livereport', 'hvacstate_errors',
+                                          'facilities', 'gateway')]
+    _map_system(responses)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    systems = [_map_system(responses) for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print('{:<20}{:>14}'.format('memory', 'bytes'))
+    print('{:<20}{:>14.0f}'.format('per system', size / len(systems)))
+
+
+def bench_snapshot(number=200):
+    responses = [_load(name) for name in ('systemcontrol', 'rooms',
+                                          'livereport', 'hvacstate_errors',
+                                          'facilities', 'gateway')]
+    system = _map_system(responses)
+
+    def _json_dumps():
+        return json.dumps(attr.asdict(system), default=str)
+
+    data = snapshot.dumps(system)
+    json_data = _json_dumps()
+    print('{:<20}{:>14}{:>14}{:>10}'.format('snapshot', 'dumps (us)',
+                                            'loads (us)', 'bytes'))
+    print('{:<20}{:>14.1f}{:>14.1f}{:>10}'.format(
+        'json (asdict)', _time(_json_dumps, number) * 1e6,
+        _time(lambda: json.loads(json_data), number) * 1e6,
+        len(json_data.encode())))
+    print('{:<20}{:>14.1f}{:>14.1f}{:>10}'.format(
+        'marshal', _time(lambda: snapshot.dumps(system), number) * 1e6,
+        _time(lambda: snapshot.loads(data), number) * 1e6, len(data)))
+
+
+def bench_history(polls=10000):
+    """Memory used to keep the live reports of many polls."""
+    live_report = _load('livereport')
+
+    def _size(func):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        kept = func()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        del kept
+        return sum(stat.size_diff
+                   for stat in after.compare_to(before, 'filename'))
+
+    def _reports():
+        return [(poll, [attr.evolve(report, value=report.value + poll)
+                        for report in mapper.map_reports(live_report)])
+                for poll in range(polls)]
+
+    def _store(compress=False):
+        store = SeriesStore(compress=compress)
+        for poll in range(polls):
+            store.feed([attr.evolve(report, value=report.value + poll)
+                        for report in mapper.map_reports(live_report)], poll)
+        return store
+
+    points = polls * len(mapper.map_reports(live_report))
+    print('{:<20}{:>14}'.format('history', 'bytes/point'))
+    print('{:<20}{:>14.1f}'.format('Report objects', _size(_reports) / points))
+    print('{:<20}{:>14.1f}'.format('SeriesStore', _size(_store) / points))
+    print('{:<20}{:>14.1f}'.format(
+        'compressed store', _size(lambda: _store(True)) / points))
+
+
+SUITE_RESPONSES = ('systemcontrol', 'rooms', 'livereport', 'hvacstate_errors',
+                   'facilities', 'gateway')
+
+
+def _scale(responses, factor):
+    """Installation with `factor` times more zones and rooms. Copies get a
+    setpoint out of 10, so they don't all share the same time program."""
+    full_system, rooms = copy.deepcopy(responses[:2])
+    zones = full_system['body']['zones']
+    raw_rooms = rooms['body']['rooms']
+    original_zones = list(zones)
+    original_rooms = list(raw_rooms)
+    for copy_idx in range(1, factor):
+        for zone in original_zones:
+            zone = copy.deepcopy(zone)
+            zone['_id'] = '{}_{}'.format(zone['_id'], copy_idx)
+            zone['heating']['configuration']['setpoint_temperature'] = \
+                18 + copy_idx % 10 * 0.5
+            zones.append(zone)
+        for room in original_rooms:
+            room = copy.deepcopy(room)
+            room['roomIndex'] = room['roomIndex'] + 100 * copy_idx
+            room['timeprogram']['monday'][0]['temperatureSetpoint'] = \
+                18 + copy_idx % 10 * 0.5
+            raw_rooms.append(room)
+    return (full_system, rooms) + tuple(responses[2:])
+
+
+def _measure(name, scale, func, batches):
+    """Measure latency percentiles, throughput and peak allocation of a
+    call. Calls are timed in batches lasting at least 1ms."""
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= 1e-3:
+            break
+        number *= 2
+
+    samples = []
+    for _ in range(batches):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    samples.sort()
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    def _percentile(percent):
+        return samples[min(len(samples) - 1,
+                           int(len(samples) * percent / 100))] * 1e6
+
+    return {
+        'name': name,
+        'scale': scale,
+        'calls': number * batches,
+        'ops_per_sec': len(samples) / sum(samples),
+        'mean_us': sum(samples) / len(samples) * 1e6,
+        'p50_us': _percentile(50),
+        'p95_us': _percentile(95),
+        'p99_us': _percentile(99),
+        'peak_alloc_bytes': peak,
+    }
+
+
+def _cases(responses, loop, base_url, session):
+    full_system, rooms, live_report, hvac, facilities, gateway = responses
+    system = _map_system(responses)
+    zone = system.zones[0]
+    room = system.rooms[0]
+    now = datetime.now()
+    serial = mapper.map_serial_number(facilities)
+
+    manager = SystemManager('user', 'pass', session, base_url=base_url)
+    connector = Connector('user', 'pass', session, base_url=base_url)
+    system_url = urls.system(serial=serial)
+    cases = [
+        ('get_system', lambda: loop.run_until_complete(manager.get_system())),
+        ('connector.get system', lambda: loop.run_until_complete(
+            connector.get(system_url))),
+    ]
+    cases += [('validate ' + name,
+               lambda data=responses[SUITE_RESPONSES.index(name)],
+               schema=schema: validation.validate(schema, data))
+              for name, schema in VALIDATIONS]
+    cases += [
+        ('map_zones', lambda: mapper.map_zones(full_system)),
+        ('map_rooms', lambda: mapper.map_rooms(rooms)),
+        ('map_dhw', lambda: mapper.map_dhw(full_system, live_report)),
+        ('map_reports', lambda: mapper.map_reports(live_report)),
+        ('map_holiday_mode', lambda: mapper.map_holiday_mode(full_system)),
+        ('map_quick_mode', lambda: mapper.map_quick_mode(full_system)),
+        ('map_outdoor_temp', lambda: mapper.map_outdoor_temp(full_system)),
+        ('map_ventilation', lambda: mapper.map_ventilation(full_system)),
+        ('map_system_info', lambda: mapper.map_system_info(
+            facilities, gateway, hvac, None)),
+        ('map_boiler_status', lambda: mapper.map_boiler_status(hvac)),
+        ('map_errors', lambda: mapper.map_errors(hvac)),
+        ('System', lambda: System(
+            holiday=system.holiday, quick_mode=system.quick_mode,
+            info=system.info, zones=system.zones, rooms=system.rooms,
+            dhw=system.dhw, reports=system.reports,
+            outdoor_temperature=system.outdoor_temperature,
+            boiler_status=system.boiler_status, errors=system.errors,
+            ventilation=system.ventilation)),
+        ('get_active_mode_zone (all)', lambda: [
+            system.get_active_mode_zone(item) for item in system.zones]),
+        ('get_active_mode_room (all)', lambda: [
+            system.get_active_mode_room(item) for item in system.rooms]),
+        ('get_active_mode_hot_water',
+         lambda: system.get_active_mode_hot_water()),
+        ('get_active_mode_circulation',
+         lambda: system.get_active_mode_circulation()),
+        ('get_active_mode_ventilation',
+         lambda: system.get_active_mode_ventilation()),
+        ('TimeProgram.get_for zone',
+         lambda: zone.heating.time_program.get_for(now)),
+        ('TimeProgram.get_for room', lambda: room.time_program.get_for(now)),
+    ]
+    return cases
+
+
+async def _serve(responses):
+    recording = Recording()
+    serial = mapper.map_serial_number(responses[4])
+    for url, data in ((urls.system(serial=serial), responses[0]),
+                      (urls.rooms(serial=serial), responses[1]),
+                      (urls.live_report(serial=serial), responses[2]),
+                      (urls.hvac(serial=serial), responses[3]),
+                      (urls.facilities_list(), responses[4]),
+                      (urls.gateway_type(serial=serial), responses[5])):
+        recording.add(RecordedExchange('get', url[len(urls.base()):], 200,
+                                       json.dumps(data)))
+    server = ReplayServer(recording)
+    await server.start()
+    return server, aiohttp.ClientSession()
+
+
+def bench_suite(scales=(1, 10, 50), batches=30):
+    responses = tuple(_load(name) for name in SUITE_RESPONSES)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = []
+    print('{:<30}{:>6}{:>12}{:>10}{:>10}{:>10}{:>12}'.format(
+        'suite', 'scale', 'ops/s', 'p50 (us)', 'p95 (us)', 'p99 (us)',
+        'peak (B)'))
+    for scale in scales:
+        scaled = _scale(responses, scale)
+        server, session = loop.run_until_complete(_serve(scaled))
+        try:
+            for name, func in _cases(scaled, loop, server.base_url, session):
+                result = _measure(name, scale, func, batches)
+                results.append(result)
+                print('{name:<30}{scale:>6}{ops_per_sec:>12.0f}{p50_us:>10.1f}'
+                      '{p95_us:>10.1f}{p99_us:>10.1f}{peak_alloc_bytes:>12}'
+                      .format(**result))
+        finally:
+            loop.run_until_complete(session.close())
+            loop.run_until_complete(server.close())
+    loop.close()
+    return results
+
+
+def _compare(results, baseline_path):
+    with open(baseline_path, 'r') as file:
+        baseline = {(result['name'], result['scale']): result
+                    for result in json.load(file)['results']}
+    print('{:<30}{:>6}{:>14}{:>14}{:>10}'.format(
+        'versus baseline', 'scale', 'p50 base (us)', 'p50 (us)', 'change'))
+    for result in results:
+        base = baseline.get((result['name'], result['scale']))
+        if base is not None:
+            print('{:<30}{:>6}{:>14.1f}{:>14.1f}{:>+9.1f}%'.format(
+                result['name'], result['scale'], base['p50_us'],
+                result['p50_us'],
+                (result['p50_us'] / base['p50_us'] - 1) * 100))
+
+
+BENCHES = {
+    'validation': bench_validation,
+    'time_program': bench_time_program,
+    'memory': bench_memory,
+    'snapshot': bench_snapshot,
+    'history': bench_history,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('benches', nargs='*',
+                        help='benchmarks to run among suite, {}, all by '
+                        'default'.format(', '.join(BENCHES)))
+    parser.add_argument('--scales', default='1,10,50',
+                        help='number of copies of the zones and rooms')
+    parser.add_argument('--batches', type=int, default=30)
+    parser.add_argument('--json', help='save results of the suite to FILE')
+    parser.add_argument('--baseline',
+                        help='compare the suite with results saved in FILE')
+    args = parser.parse_args()
+    benches = args.benches or ['suite'] + list(BENCHES)
+    unknown = set(benches) - set(BENCHES) - {'suite'}
+    if unknown:
+        parser.error('unknown benchmarks: ' + ', '.join(sorted(unknown)))
+
+    for bench in benches:
+        if bench != 'suite':
+            BENCHES[bench]()
+            print()
+            continue
+
+        suite_results = bench_suite(
+            [int(scale) for scale in args.scales.split(',')], args.batches)
+        print()
+        if args.baseline:
+            _compare(suite_results, args.baseline)
+            print()
+        if args.json:
+            with open(args.json, 'w') as out:
+                json.dump({
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'date': datetime.now().isoformat(),
+                    'results': suite_results,
+                }, out, indent=2)
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import asyncio
+from datetime import date, timedelta
 import json
 import os
 import shutil
@@ -8,7 +9,8 @@ import sys
 import aiohttp
 
 sys.path.append("../")
-from pymultimatic.api import Connector, ApiError, urls
+from pymultimatic.api import ApiError, urls
+from pymultimatic.api.replay import RecordingConnector
 from pymultimatic.model import mapper
 
 URLS = [
@@ -30,7 +32,7 @@ async def main(user, passw):
         shutil.rmtree('./dump_result', ignore_errors=True)
         os.mkdir('./dump_result')
 
-        connector = Connector(user, passw, sess)
+        connector = RecordingConnector(user, passw, sess)
 
         try:
             await connector.login(True)
@@ -56,6 +58,22 @@ async def main(user, passw):
             except:
                 print('Cannot get response for {}, skipping it'.format(key))
 
+        if 'emf_report' in responses:
+            start = (date.today() - timedelta(days=7)).isoformat()
+            for device_id, energy_type, function \
+                    in mapper.map_emf_series(responses['emf_report']):
+                key = 'emf_report_device_{}_{}_{}'.format(
+                    device_id, energy_type, function)
+                print('requesting ' + key)
+                try:
+                    responses[key] = await connector.get(
+                        urls.emf_report_device(energy_type, function, 'WEEK',
+                                               start, '0', serial=serial,
+                                               device_id=device_id))
+                except:
+                    print('Cannot get response for {}, skipping it'
+                          .format(key))
+
         print('received {} responses'.format(len(responses)))
 
         for key in responses:
@@ -67,6 +85,9 @@ async def main(user, passw):
             except:
                 print('cannot write to file {}'.format(file.name))
 
+        # can be replayed with pymultimatic.api.replay.ReplayServer
+        connector.recording.save('./dump_result/recording.json')
+
 
 if __name__ == "__main__":
     if not len(sys.argv) == 3:
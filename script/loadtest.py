@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Load test a fleet of managers against a local replay of the API.
+
+Usage: python3 loadtest.py [--recording FILE] [--managers N] ...
+
+Without recording, the responses of the tests are replayed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from pymultimatic.api import urls
+from pymultimatic.api.metrics import MetricsRegistry
+from pymultimatic.api.replay import RecordedExchange, Recording, ReplayServer
+from pymultimatic.model import mapper
+from pymultimatic.systemmanager import SystemManager
+from pymultimatic.systemmanagerpool import SystemManagerPool
+
+RESPONSES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'files',
+                         'responses')
+
+
+def _load(name):
+    with open(os.path.join(RESPONSES, name), 'r') as file:
+        return file.read()
+
+
+def _fixtures_recording():
+    serial = mapper.map_serial_number(json.loads(_load('facilities')))
+    recording = Recording()
+    for url, name in ((urls.facilities_list(), 'facilities'),
+                      (urls.system(serial=serial), 'systemcontrol'),
+                      (urls.live_report(serial=serial), 'livereport'),
+                      (urls.hvac(serial=serial), 'hvacstate'),
+                      (urls.gateway_type(serial=serial), 'gateway'),
+                      (urls.rooms(serial=serial), 'rooms')):
+        recording.add(RecordedExchange('get', url[len(urls.base()):], 200,
+                                       _load(name), elapsed=0.2))
+    return recording
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+async def main(args):
+    recording = Recording.load(args.recording) if args.recording \
+        else _fixtures_recording()
+    errors = {int(status): float(prob) for status, prob
+              in (error.split('=') for error in args.error)}
+    server = ReplayServer(recording, latency=args.latency, jitter=args.jitter,
+                          errors=errors,
+                          max_concurrency=args.server_concurrency, seed=1)
+
+    metrics = MetricsRegistry()
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    async with server, aiohttp.ClientSession(
+            connector=connector, cookie_jar=aiohttp.DummyCookieJar()) as sess:
+        pool = SystemManagerPool(max_concurrency=args.concurrency)
+        for idx in range(args.managers):
+            pool.add(idx, SystemManager('user{}'.format(idx), 'pass', sess,
+                                        cookie_jar=aiohttp.CookieJar(),
+                                        base_url=server.base_url,
+                                        metrics=metrics))
+
+        for round_idx in range(args.rounds):
+            start = time.monotonic()
+            durations = []
+            failures = 0
+            async for result in pool.refresh_all():
+                durations.append(result.duration * 1000)
+                failures += 0 if result.is_success else 1
+            elapsed = time.monotonic() - start
+            print('round {}: {} refreshes in {:.2f}s ({:.0f}/s), {} failed, '
+                  'p50 {:.0f}ms, p95 {:.0f}ms, p99 {:.0f}ms'.format(
+                      round_idx, len(durations), elapsed,
+                      len(durations) / elapsed, failures,
+                      _percentile(durations, 50), _percentile(durations, 95),
+                      _percentile(durations, 99)))
+
+    print('server: {} requests, {} max in flight, statuses {}'.format(
+        sum(server.statuses.values()), server.max_in_flight,
+        dict(sorted(server.statuses.items()))))
+    for endpoint in metrics.endpoints():
+        endpoint_metrics = metrics.get(endpoint)
+        print('{:<20} {:>7} requests, {:>5} retries, {:>5} relogins, '
+              'errors {:.1%}, p95 {:.0f}ms, validation p95 {:.1f}ms, '
+              'mapping p95 {:.1f}ms'.format(
+                  endpoint, endpoint_metrics.requests,
+                  endpoint_metrics.retries, endpoint_metrics.relogins,
+                  endpoint_metrics.error_rate,
+                  endpoint_metrics.latency.quantile(0.95) * 1000,
+                  endpoint_metrics.validation.quantile(0.95) * 1000,
+                  endpoint_metrics.mapping.quantile(0.95) * 1000))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recording', help='recording file to replay')
+    parser.add_argument('--managers', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='managers refreshed at the same time')
+    parser.add_argument('--connections', type=int, default=100,
+                        help='size of the connection pool')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='server latency (s), -1 for recorded latency')
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--server-concurrency', type=int, default=None)
+    parser.add_argument('--error', action='append', default=[],
+                        help='injected error, e.g. 409=0.01, repeatable')
+    arguments = parser.parse_args()
+    if arguments.latency < 0:
+        arguments.latency = None
+
+    asyncio.get_event_loop().run_until_complete(main(arguments))
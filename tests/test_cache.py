@@ -0,0 +1,102 @@
+"""Test for response cache."""
+import unittest
+
+from pymultimatic.api import urls
+from pymultimatic.api.cache import ResponseCache, CachePolicy
+
+SERIAL = '123'
+
+
+class ResponseCacheTest(unittest.TestCase):
+    """Test class."""
+
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.cache = ResponseCache(clock=lambda: self.now)
+
+    def test_get_cached(self) -> None:
+        """Test response is cached."""
+        url = urls.system(serial=SERIAL)
+        self.cache.set(urls.system, url, {'body': 1})
+
+        self.assertEqual({'body': 1}, self.cache.get(urls.system, url))
+
+    def test_expired(self) -> None:
+        """Test response expires according to the policy."""
+        url = urls.live_report(serial=SERIAL)
+        self.cache.set(urls.live_report, url, {'body': 1})
+
+        self.now = 9
+        self.assertIsNotNone(self.cache.get(urls.live_report, url))
+        self.now = 10
+        self.assertIsNone(self.cache.get(urls.live_report, url))
+        self.assertEqual(0, len(self.cache))
+
+    def test_no_policy(self) -> None:
+        """Test response is not cached without policy."""
+        url = urls.hvac_update(serial=SERIAL)
+        self.cache.set(urls.hvac_update, url, {'body': 1})
+
+        self.assertIsNone(self.cache.get(urls.hvac_update, url))
+
+    def test_lru_eviction(self) -> None:
+        """Test least recently used response is evicted."""
+        cache = ResponseCache(max_size=2)
+        system = urls.system(serial=SERIAL)
+        hvac = urls.hvac(serial=SERIAL)
+        report = urls.live_report(serial=SERIAL)
+
+        cache.set(urls.system, system, 1)
+        cache.set(urls.hvac, hvac, 2)
+        cache.get(urls.system, system)
+        cache.set(urls.live_report, report, 3)
+
+        self.assertEqual(1, cache.get(urls.system, system))
+        self.assertIsNone(cache.get(urls.hvac, hvac))
+        self.assertEqual(3, cache.get(urls.live_report, report))
+
+    def test_write_invalidates_parent_and_child(self) -> None:
+        """Test quick veto on a zone invalidates system and zone."""
+        system = urls.system(serial=SERIAL)
+        zone = urls.zone(serial=SERIAL, id='zone1')
+        other_zone = urls.zone(serial=SERIAL, id='zone2')
+        facilities = urls.facilities_list(serial=SERIAL)
+        report = urls.live_report(serial=SERIAL)
+
+        self.cache.set(urls.system, system, 1)
+        self.cache.set(urls.zone, zone, 2)
+        self.cache.set(urls.zone, other_zone, 3)
+        self.cache.set(urls.facilities_list, facilities, 4)
+        self.cache.set(urls.live_report, report, 5)
+
+        self.cache.invalidate(urls.zone_quick_veto,
+                              urls.zone_quick_veto(serial=SERIAL, id='zone1'),
+                              serial=SERIAL, id='zone1')
+
+        self.assertIsNone(self.cache.get(urls.system, system))
+        self.assertIsNone(self.cache.get(urls.zone, zone))
+        self.assertEqual(3, self.cache.get(urls.zone, other_zone))
+        self.assertEqual(4, self.cache.get(urls.facilities_list, facilities))
+        self.assertEqual(5, self.cache.get(urls.live_report, report))
+
+    def test_hvac_update_invalidates_hvac(self) -> None:
+        """Test hvac update request invalidates hvac state."""
+        hvac = urls.hvac(serial=SERIAL)
+        self.cache.set(urls.hvac, hvac, 1)
+
+        self.cache.invalidate(urls.hvac_update,
+                              urls.hvac_update(serial=SERIAL), serial=SERIAL)
+
+        self.assertIsNone(self.cache.get(urls.hvac, hvac))
+
+    def test_custom_policy(self) -> None:
+        """Test custom policies."""
+        cache = ResponseCache(policies={'hvac': CachePolicy(5)},
+                              clock=lambda: self.now)
+        hvac = urls.hvac(serial=SERIAL)
+        system = urls.system(serial=SERIAL)
+        cache.set(urls.hvac, hvac, 1)
+        cache.set(urls.system, system, 2)
+
+        self.assertEqual(1, cache.get(urls.hvac, hvac))
+        self.assertIsNone(cache.get(urls.system, system))
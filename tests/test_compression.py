@@ -0,0 +1,117 @@
+"""Tests for series compression."""
+import json
+import math
+import random
+import unittest
+from array import array
+
+from pymultimatic.history import compression
+from pymultimatic.model import mapper
+from tests.conftest import path
+
+
+class CompressionTest(unittest.TestCase):
+    """Test class."""
+
+    def test_bits(self) -> None:
+        """Bits are read as written."""
+        writer = compression.BitWriter()
+        writer.write(1, 1)
+        writer.write(0b101, 3)
+        writer.write(2 ** 64 - 1, 64)
+        writer.write(-3, 5)
+
+        data = writer.getvalue()
+        reader = compression.BitReader(data)
+
+        self.assertEqual(73, writer.length)
+        self.assertEqual(10, len(data))
+        self.assertEqual(1, reader.read_bit())
+        self.assertEqual(0b101, reader.read(3))
+        self.assertEqual(2 ** 64 - 1, reader.read(64))
+        self.assertEqual(0b11101, reader.read(5))
+        reader.read(7)
+        with self.assertRaises(EOFError):
+            reader.read(1)
+
+    def test_round_trip(self) -> None:
+        """Timestamps (ms) and values are decoded as encoded."""
+        rand = random.Random(1)
+        points = []
+        timestamp = 1580000000.0
+        value = 20.0
+        for _ in range(1000):
+            timestamp += rand.choice([60, 60, 60, 60.001, 59.5, 3600])
+            value = round(value + rand.uniform(-0.2, 0.2), 1)
+            points.append((timestamp, value))
+        points += [(timestamp + 1e8, -0.0), (timestamp + 1e8, 1e300),
+                   (timestamp + 2e8, -1e-300), (timestamp + 2e8, math.inf)]
+
+        decoded = list(compression.decode(compression.encode(points)))
+
+        self.assertEqual(len(points), len(decoded))
+        for (timestamp, value), (decoded_ts, decoded_value) \
+                in zip(points, decoded):
+            self.assertAlmostEqual(timestamp, decoded_ts, places=3)
+            self.assertEqual(repr(value), repr(decoded_value))
+
+    def test_nan(self) -> None:
+        """NaN is kept."""
+        decoded = list(compression.decode(compression.encode(
+            [(0, 1.0), (1, math.nan), (2, 1.0)])))
+
+        self.assertTrue(math.isnan(decoded[1][1]))
+        self.assertEqual((2.0, 1.0), decoded[2])
+
+    def test_regular_series(self) -> None:
+        """Regular series takes a few bits per point."""
+        points = [(1580000000 + idx * 60, 21.5 if idx % 10 else 22.0)
+                  for idx in range(1000)]
+
+        data = compression.encode(points)
+
+        self.assertLess(len(data), 1000 * 16 / 10)
+        self.assertEqual((1000, 1580000000.0, 1580000000.0 + 999 * 60),
+                         compression.header(data))
+
+    def test_streaming(self) -> None:
+        """Series is available while appending."""
+        encoder = compression.Encoder()
+        encoder.append(10, 1.5)
+        first = encoder.getvalue()
+        encoder.append(20, 2.5)
+
+        self.assertEqual([(10.0, 1.5)], list(compression.decode(first)))
+        self.assertEqual((array('d', [10, 20]), array('d', [1.5, 2.5])),
+                         compression.decode_arrays(encoder.getvalue()))
+
+    def test_reports(self) -> None:
+        """Reports values are compressed."""
+        with open(path('files/responses/livereport'), 'r') as file:
+            reports = mapper.map_reports(json.loads(file.read()))
+
+        points = [(idx * 60.0, reports[0].value) for idx in range(100)]
+
+        self.assertEqual(points, list(compression.decode(
+            compression.encode(points))))
+
+    def test_empty(self) -> None:
+        """Empty series."""
+        self.assertEqual([], list(compression.decode(
+            compression.encode([]))))
+
+    def test_before_last(self) -> None:
+        """Timestamps must be increasing."""
+        encoder = compression.Encoder()
+        encoder.append(10, 1)
+
+        with self.assertRaises(ValueError):
+            encoder.append(9, 1)
+
+    def test_invalid(self) -> None:
+        """Invalid data."""
+        data = compression.encode([(1, 1.0), (2, 2.0)])
+
+        for invalid in (b'', b'invalid' * 10, data[:-3]):
+            with self.assertRaises(ValueError):
+                list(compression.decode(invalid))
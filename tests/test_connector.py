@@ -1,9 +1,13 @@
+import asyncio
 from unittest import mock
 
 import pytest
+from aiohttp import ClientSession, CookieJar
 from aioresponses import aioresponses
+from yarl import URL
 
 from pymultimatic.api import urls, ApiError, Connector
+from pymultimatic.api.sessionstore import SessionStore
 
 
 @pytest.mark.asyncio
@@ -107,3 +111,85 @@ async def test_post(connector: Connector, resp: aioresponses) -> None:
 
     resp.post(url=url, status=200)
     await connector.post(url)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_coalesced(connector: Connector,
+                                        resp: aioresponses) -> None:
+    url = urls.system(serial='123')
+    mock_payload = {'test': 'test'}
+    resp.get(url, status=200, payload=mock_payload)
+
+    await connector.login()
+    first, second = await asyncio.gather(connector.get(url),
+                                         connector.get(url))
+
+    assert first == mock_payload
+    assert first is second
+    assert not connector._in_flight
+
+
+@pytest.mark.asyncio
+async def test_sequential_get_not_coalesced(connector: Connector,
+                                            resp: aioresponses) -> None:
+    url = urls.system(serial='123')
+    resp.get(url, status=200, payload={'call': 1})
+    resp.get(url, status=200, payload={'call': 2})
+
+    await connector.login()
+    assert await connector.get(url) == {'call': 1}
+    assert await connector.get(url) == {'call': 2}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_error_shared(connector: Connector,
+                                           resp: aioresponses) -> None:
+    url = urls.system(serial='123')
+    resp.get(url, status=500)
+
+    await connector.login()
+    results = await asyncio.gather(connector.get(url), connector.get(url),
+                                   return_exceptions=True)
+
+    assert all(isinstance(result, ApiError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_own_cookie_jar_isolated(session: ClientSession,
+                                       raw_resp: aioresponses) -> None:
+    for value in ('account1', 'account2'):
+        raw_resp.post(urls.new_token(), status=200,
+                      payload={'body': {'authToken': '123'}})
+        raw_resp.post(urls.authenticate(), status=200,
+                      headers={'Set-Cookie': 'test=' + value + '; Path=/'})
+    raw_resp.post(urls.logout(), status=200)
+
+    first = Connector('user1', 'test', session, cookie_jar=CookieJar())
+    second = Connector('user2', 'test', session, cookie_jar=CookieJar())
+
+    await first.login()
+    await second.login()
+    assert first._get_cookies()['test'].value == 'account1'
+    assert second._get_cookies()['test'].value == 'account2'
+
+    await first.logout()
+    assert not await first.is_logged()
+    assert await second.is_logged()
+
+
+@pytest.mark.asyncio
+async def test_saved_session_base_url(session: ClientSession,
+                                      raw_resp: aioresponses,
+                                      tmpdir: str) -> None:
+    store = SessionStore(str(tmpdir))
+    jar = CookieJar()
+    jar.update_cookies({'test': 'value'}, URL('http://replay.test/login'))
+    store.save_cookies(jar)
+    connector = Connector('user', 'test', session, session_store=store,
+                          cookie_jar=CookieJar(),
+                          base_url='http://replay.test')
+
+    # no authentication mocked, saved cookies must be re-used
+    assert await connector.login()
+    assert await connector.is_logged()
+    assert not raw_resp.requests
@@ -0,0 +1,135 @@
+"""Test for diff."""
+import json
+import unittest
+from typing import Any
+
+from pymultimatic.model import System, QuickVeto, mapper
+from pymultimatic.model.diff import Change, ChangeType, diff_systems
+from tests.conftest import path
+
+
+def _load(name: str) -> Any:
+    with open(path('files/responses/' + name), 'r') as file:
+        return json.loads(file.read())
+
+
+def _system(full_system: Any = None, rooms: Any = None,
+            live_report: Any = None, hvac: Any = None,
+            cache: Any = None) -> System:
+    full_system = full_system or _load('systemcontrol')
+    live_report = live_report or _load('livereport')
+    hvac = hvac or _load('hvacstate_errors')
+    return System(
+        holiday=mapper.map_holiday_mode(full_system),
+        quick_mode=mapper.map_quick_mode(full_system),
+        zones=mapper.map_zones(full_system, cache),
+        rooms=mapper.map_rooms(rooms or _load('rooms'), cache),
+        dhw=mapper.map_dhw(full_system, live_report, cache),
+        reports=mapper.map_reports(live_report, cache),
+        outdoor_temperature=mapper.map_outdoor_temp(full_system),
+        boiler_status=mapper.map_boiler_status(hvac),
+        errors=mapper.map_errors(hvac))
+
+
+class DiffTest(unittest.TestCase):
+    """Test class."""
+
+    def test_no_change(self) -> None:
+        """Test equal systems have no changes."""
+        self.assertEqual([], diff_systems(_system(), _system()))
+
+    def test_same_objects_not_compared(self) -> None:
+        """Test entities shared thanks to the mapping cache."""
+        cache = mapper.MappingCache()
+        old = _system(cache=cache)
+        new = _system(cache=cache)
+
+        self.assertIs(old.zones[0], new.zones[0])
+        self.assertEqual([], diff_systems(old, new))
+
+    def test_room_temperature(self) -> None:
+        """Test changed temperature of a room."""
+        rooms = _load('rooms')
+        rooms['body']['rooms'][0]['configuration']['currentTemperature'] = 30
+        old = _system()
+        new = _system(rooms=rooms)
+
+        self.assertEqual([Change(ChangeType.CHANGED, 'room', old.rooms[0].id,
+                                 'temperature', old.rooms[0].temperature, 30)],
+                         diff_systems(old, new))
+
+    def test_quick_veto_and_zone_heating(self) -> None:
+        """Test nested attributes of zones."""
+        old = _system()
+        new = _system()
+        new.zones[0].quick_veto = QuickVeto(target=22)
+        new.zones[0].heating.target_high = 25
+
+        changes = diff_systems(old, new)
+
+        self.assertEqual(['quick_veto', 'heating.target_high'],
+                         [change.attribute for change in changes])
+        self.assertEqual({'zone'}, {change.entity for change in changes})
+        self.assertEqual(25, changes[1].new)
+
+    def test_outdoor_temperature_and_reports(self) -> None:
+        """Test system attributes and reports."""
+        full_system = _load('systemcontrol')
+        full_system['body']['status']['outside_temperature'] = 30.5
+        live_report = _load('livereport')
+        live_report['body']['devices'][0]['reports'][0]['value'] = 2.5
+        old = _system()
+        new = _system(full_system=full_system, live_report=live_report)
+
+        changes = diff_systems(old, new)
+
+        self.assertEqual([('system', None, 'outdoor_temperature', 30.5),
+                          ('report', 'Control_SYS_MultiMatic/WaterPressureSensor',
+                           'value', 2.5)],
+                         [(c.entity, c.id, c.attribute, c.new)
+                          for c in changes])
+
+    def test_reports_same_id(self) -> None:
+        """Test reports are matched by device and id."""
+        live_report = _load('livereport')
+        devices = live_report['body']['devices']
+        second = json.loads(json.dumps(devices[-1]))
+        second['_id'] = 'Control_CC2'
+        devices.append(second)
+        old = _system(live_report=live_report)
+        devices[-2]['reports'][0]['value'] = 35.0
+        new = _system(live_report=live_report)
+
+        changes = diff_systems(old, new)
+
+        self.assertEqual([('report', 'Control_CC1/FlowTemperatureSensor',
+                           'value', 35.0)],
+                         [(c.entity, c.id, c.attribute, c.new)
+                          for c in changes])
+
+    def test_errors_added_and_removed(self) -> None:
+        """Test errors are matched by device and status code."""
+        hvac = _load('hvacstate_errors')
+        removed = hvac['body']['errorMessages'].pop(1)
+        hvac['body']['errorMessages'].append(
+            dict(removed, statusCode='F.901'))
+        old = _system()
+        new = _system(hvac=hvac)
+
+        changes = diff_systems(old, new)
+
+        self.assertEqual([(ChangeType.REMOVED, 'F.900'),
+                          (ChangeType.ADDED, 'F.901')],
+                         [(c.type, c.id) for c in changes])
+        self.assertIsNone(changes[0].attribute)
+        self.assertEqual(old.errors[-1], changes[0].old)
+
+    def test_zone_removed(self) -> None:
+        """Test zone removed."""
+        old = _system()
+        new = _system()
+        zone = new.zones.pop()
+
+        self.assertEqual([Change(ChangeType.REMOVED, 'zone', zone.id,
+                                 old=old.zones[-1])],
+                         diff_systems(old, new))
@@ -0,0 +1,60 @@
+"""Tests for energy history."""
+from datetime import date
+import unittest
+
+from pymultimatic.model import EnergyHistory, EnergySeries
+from pymultimatic.model.energy import split_range
+
+
+class EnergyTest(unittest.TestCase):
+    """Test class."""
+
+    def test_split_range_day(self) -> None:
+        """One window per day."""
+        self.assertEqual([(date(2021, 1, 30), date(2021, 1, 30)),
+                          (date(2021, 1, 31), date(2021, 1, 31))],
+                         split_range(date(2021, 1, 30), date(2021, 1, 31),
+                                     'DAY'))
+
+    def test_split_range_week(self) -> None:
+        """Weeks start at the first day."""
+        self.assertEqual([(date(2021, 1, 6), date(2021, 1, 12)),
+                          (date(2021, 1, 13), date(2021, 1, 15))],
+                         split_range(date(2021, 1, 6), date(2021, 1, 15),
+                                     'WEEK'))
+
+    def test_split_range_month(self) -> None:
+        """Calendar months."""
+        self.assertEqual([(date(2020, 1, 15), date(2020, 1, 31)),
+                          (date(2020, 2, 1), date(2020, 2, 29)),
+                          (date(2020, 3, 1), date(2020, 3, 2))],
+                         split_range(date(2020, 1, 15), date(2020, 3, 2),
+                                     'MONTH'))
+
+    def test_split_range_year(self) -> None:
+        """Calendar years."""
+        self.assertEqual([(date(2019, 6, 1), date(2019, 12, 31)),
+                          (date(2020, 1, 1), date(2020, 5, 31))],
+                         split_range(date(2019, 6, 1), date(2020, 5, 31),
+                                     'YEAR'))
+
+    def test_split_range_empty(self) -> None:
+        """End before start."""
+        self.assertEqual([], split_range(date(2021, 1, 2), date(2021, 1, 1),
+                                         'DAY'))
+
+    def test_split_range_unknown(self) -> None:
+        """Unknown time range."""
+        with self.assertRaises(ValueError):
+            split_range(date(2021, 1, 1), date(2021, 1, 2), 'HOUR')
+
+    def test_get(self) -> None:
+        """Get series by device, energy type and function."""
+        series = EnergySeries('device', 'CONSUMED_ELECTRICAL_POWER', 'DHW')
+        history = EnergyHistory(date(2021, 1, 1), date(2021, 1, 31), 'MONTH',
+                                [series])
+
+        self.assertIs(series, history.get(
+            'device', 'CONSUMED_ELECTRICAL_POWER', 'DHW'))
+        self.assertIsNone(history.get(
+            'device', 'CONSUMED_ELECTRICAL_POWER', 'CENTRAL_HEATING'))
@@ -456,3 +456,143 @@ class MapperTest(unittest.TestCase):
         self.assertEqual(3, ventilation.target_high)
         self.assertEqual(1, ventilation.target_low)
         self.assertIsNone(ventilation.temperature)
+
+    def test_mapping_cache_zones(self) -> None:
+        """Test unchanged zones are not mapped again."""
+        with open(path("files/responses/systemcontrol"), 'r') as file:
+            system = json.loads(file.read())
+        cache = mapper.MappingCache()
+
+        first = mapper.map_zones(system, cache)
+        system['body']['zones'][1]['configuration']['inside_temperature'] \
+            = 12.5
+        second = mapper.map_zones(system, cache)
+
+        self.assertIs(first[0], second[0])
+        self.assertIsNot(first[1], second[1])
+        self.assertEqual(12.5, second[1].temperature)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(3, cache.misses)
+
+    def test_mapping_cache_rooms_and_reports(self) -> None:
+        """Test rooms and reports are re-used."""
+        with open(path("files/responses/rooms"), 'r') as file:
+            rooms = json.loads(file.read())
+        with open(path("files/responses/livereport"), 'r') as file:
+            live_report = json.loads(file.read())
+        cache = mapper.MappingCache()
+
+        first_rooms = mapper.map_rooms(rooms, cache)
+        first_reports = mapper.map_reports(live_report, cache)
+
+        self.assertEqual(mapper.map_rooms(rooms), first_rooms)
+        self.assertEqual(mapper.map_reports(live_report), first_reports)
+        self.assertTrue(all(a is b for a, b in
+                            zip(first_rooms, mapper.map_rooms(rooms, cache))))
+        self.assertTrue(all(a is b for a, b in zip(
+            first_reports, mapper.map_reports(live_report, cache))))
+
+    def test_mapping_cache_dhw(self) -> None:
+        """Test dhw is mapped again when temperature changes."""
+        with open(path("files/responses/systemcontrol"), 'r') as file:
+            system = json.loads(file.read())
+        with open(path("files/responses/livereport"), 'r') as file:
+            live_report = json.loads(file.read())
+        cache = mapper.MappingCache()
+
+        first = mapper.map_dhw(system, live_report, cache)
+        self.assertEqual(mapper.map_dhw(system, live_report), first)
+        self.assertIs(first, mapper.map_dhw(system, live_report, cache))
+
+        for device in live_report['body']['devices']:
+            for report in device['reports']:
+                report['value'] = 61.5
+        second = mapper.map_dhw(system, live_report, cache)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(61.5, second.hotwater.temperature)
+
+    def test_time_program_interned(self) -> None:
+        """Test identical time programs are shared."""
+        with open(path("files/responses/rooms"), 'r') as file:
+            rooms = json.loads(file.read())
+        raw = rooms['body']['rooms'][0]['timeprogram']
+
+        first = mapper.map_time_program(raw)
+        second = mapper.map_time_program(json.loads(json.dumps(raw)))
+
+        self.assertIs(first, second)
+        self.assertIs(first.days['monday'].settings[0],
+                      mapper.map_time_program_day(
+                          raw['monday']).settings[0])
+
+        raw['monday'][0]['temperatureSetpoint'] = 30
+        changed = mapper.map_time_program(raw)
+        self.assertIsNot(first, changed)
+        self.assertIs(first.days['sunday'], changed.days['sunday'])
+        self.assertEqual(30, changed.days['monday'].settings[0]
+                         .target_temperature)
+
+    def test_map_emf_series(self) -> None:
+        """Test map emf devices."""
+        with open(path("files/responses/emf_devices"), 'r') as file:
+            devices = json.loads(file.read())
+
+        series = mapper.map_emf_series(devices)
+
+        self.assertEqual(3, len(series))
+        self.assertEqual(('Control_SYS_MultiMatic', 'CONSUMED_PRIMARY_ENERGY',
+                          'DHW'), series[1])
+
+    def test_map_energy_history(self) -> None:
+        """Test map and merge emf reports."""
+        with open(path("files/responses/emf_report_device"), 'r') as file:
+            report = json.loads(file.read())
+        other = json.loads(json.dumps(report))
+        other['body']['dataset'] = [{'key': '2021-01-10', 'value': 1.5},
+                                    {'key': '2021-01-11', 'value': 2.5},
+                                    {'key': '2021-01-12', 'value': 3.5}]
+        key = ('device', 'CONSUMED_PRIMARY_ENERGY', 'CENTRAL_HEATING')
+
+        history = mapper.map_energy_history(
+            date(2021, 1, 5), date(2021, 1, 11), 'WEEK',
+            [(key, report), (key, other)])
+
+        series = history.get(*key)
+        self.assertEqual(1, len(history.series))
+        self.assertEqual(7, len(series))
+        points = list(series.points())
+        self.assertEqual((datetime(2021, 1, 5), 6100.0), points[0])
+        self.assertEqual((datetime(2021, 1, 10), 1.5), points[-2])
+        self.assertEqual((datetime(2021, 1, 11), 2.5), points[-1])
+        self.assertEqual(6100 + 4800 + 5300 + 5900 + 6000 + 1.5 + 2.5,
+                         series.total)
+
+    def test_map_energy_history_day(self) -> None:
+        """Test hourly values are mapped."""
+        report = {'body': {'dataset': [
+            {'key': '2021-01-04T00:00:00', 'value': 10},
+            {'key': '2021-01-04T01:00:00', 'value': 20},
+            {'key': '2021-01-04T23:00', 'value': 30}]}}
+        key = ('device', 'CONSUMED_PRIMARY_ENERGY', 'DHW')
+
+        history = mapper.map_energy_history(
+            date(2021, 1, 4), date(2021, 1, 4), 'DAY', [(key, report)])
+
+        self.assertEqual([(datetime(2021, 1, 4, 0), 10.0),
+                          (datetime(2021, 1, 4, 1), 20.0),
+                          (datetime(2021, 1, 4, 23), 30.0)],
+                         list(history.get(*key).points()))
+
+    def test_map_energy_history_year(self) -> None:
+        """Test monthly values are mapped."""
+        report = {'body': {'dataset': [{'key': '2020-01', 'value': 10},
+                                       {'key': '2020-02', 'value': 20}]}}
+        key = ('device', 'CONSUMED_PRIMARY_ENERGY', 'DHW')
+
+        history = mapper.map_energy_history(
+            date(2020, 1, 1), date(2020, 12, 31), 'YEAR', [(key, report)])
+
+        self.assertEqual([(datetime(2020, 1, 1), 10.0),
+                          (datetime(2020, 2, 1), 20.0)],
+                         list(history.get(*key).points()))
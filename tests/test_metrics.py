@@ -0,0 +1,130 @@
+"""Tests for metrics."""
+import asyncio
+import json
+import unittest
+from typing import List, Tuple
+from unittest import mock
+
+import pytest
+from aiohttp import ClientError
+from aioresponses import aioresponses
+
+from pymultimatic.api import urls, Connector
+from pymultimatic.api.metrics import Histogram, MetricsRegistry, \
+    NETWORK_ERROR
+from pymultimatic.systemmanager import SystemManager
+from tests.conftest import path
+
+
+class MetricsTest(unittest.TestCase):
+    """Test class."""
+
+    def test_histogram(self) -> None:
+        """Values are counted in their bucket."""
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 0.6, 2):
+            histogram.observe(value)
+
+        self.assertEqual([2, 2, 1], histogram.counts)
+        self.assertAlmostEqual(0.65, histogram.mean)
+        self.assertEqual(0.1, histogram.quantile(0.4))
+        self.assertEqual(1.0, histogram.quantile(0.5))
+        self.assertEqual(float('inf'), histogram.quantile(0.99))
+
+    def test_histogram_empty(self) -> None:
+        """Empty histogram."""
+        self.assertEqual(0, Histogram().mean)
+        self.assertEqual(0, Histogram().quantile(0.5))
+
+    def test_registry(self) -> None:
+        """Metrics are recorded by endpoint."""
+        values: List[Tuple[str, str, float]] = []
+        registry = MetricsRegistry([lambda *args: values.append(args)])
+        registry.record_request('system', 200, 0.2, 100)
+        registry.record_request('system', 500, 0.3, 10)
+        registry.record_retry('system')
+        with registry.timed('mapping', 'hvac'):
+            pass
+
+        system = registry.get('system')
+        self.assertEqual(['hvac', 'system'], registry.endpoints())
+        self.assertEqual((2, 110, 1, 0.5), (system.requests,
+                                            system.bytes_received,
+                                            system.retries,
+                                            system.error_rate))
+        self.assertEqual(1, registry.get('hvac').mapping.count)
+        self.assertEqual(('system', 'request', 200), values[0])
+        self.assertEqual(('hvac', 'mapping'), values[-1][:2])
+        self.assertEqual({'200': 1, '500': 1},
+                         json.loads(json.dumps(registry.to_dict()))
+                         ['system']['statuses'])
+
+        registry.reset()
+        self.assertEqual([], registry.endpoints())
+
+
+@pytest.mark.asyncio
+async def test_connector(connector: Connector, resp: aioresponses) -> None:
+    registry = MetricsRegistry()
+    connector._metrics = registry
+    resp.get(urls.system(serial='123'), status=401)
+    resp.get(urls.system(serial='123'), status=200, payload={'test': 'ok'})
+
+    await connector.request('get', urls.system(serial='123'),
+                            endpoint='system')
+
+    metrics = registry.get('system')
+    assert metrics.requests == 2
+    assert metrics.relogins == 1
+    assert metrics.statuses == {401: 1, 200: 1}
+    assert metrics.bytes_received == len(b'{"test": "ok"}')
+    assert metrics.latency.count == 2
+
+
+@pytest.mark.asyncio
+async def test_connector_network_error(connector: Connector,
+                                       resp: aioresponses) -> None:
+    registry = MetricsRegistry()
+    connector._metrics = registry
+    resp.get(urls.system(serial='123'), exception=ClientError())
+    resp.get(urls.system(serial='123'), exception=asyncio.TimeoutError())
+
+    for error in (ClientError, asyncio.TimeoutError):
+        with pytest.raises(error):
+            await connector.request('get', urls.system(serial='123'),
+                                    endpoint='system')
+
+    metrics = registry.get('system')
+    assert metrics.requests == 2
+    assert metrics.statuses == {NETWORK_ERROR: 2}
+    assert metrics.error_rate == 1
+    assert metrics.latency.count == 2
+
+
+@pytest.mark.asyncio
+async def test_manager(connector: Connector, resp: aioresponses) -> None:
+    registry = MetricsRegistry()
+    manager = SystemManager('user', 'pass', mock.Mock(), 'pymultiMATIC',
+                            '123', metrics=registry)
+    connector._metrics = registry
+    manager._connector = connector
+    await connector.login()
+    with open(path('files/responses/zone'), 'r') as file:
+        raw_zone = json.loads(file.read())
+    url = urls.zone(serial='123', id='Control_ZO1')
+    resp.get(url, status=500)
+    resp.get(url, status=200, payload=raw_zone)
+
+    async def _sleep(_: float) -> None:
+        pass
+
+    with mock.patch('asyncio.sleep', new=_sleep):
+        await manager.get_zone('Control_ZO1')
+
+    metrics = registry.get('zone')
+    assert manager.metrics is registry
+    assert metrics.requests == 2
+    assert metrics.retries == 1
+    assert metrics.statuses == {500: 1, 200: 1}
+    assert metrics.validation.count == 1
+    assert metrics.mapping.count == 1
@@ -0,0 +1,149 @@
+import asyncio
+from typing import List
+
+import pytest
+from aiohttp import ClientSession
+from aioresponses import aioresponses
+
+from pymultimatic.api import urls, Connector, ApiError
+from pymultimatic.api.ratelimit import RateLimiter, RatePolicy, TokenBucket
+
+
+class _Clock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+
+    async def wait(self, delay: float) -> None:
+        # other tasks run before the time passes
+        self.sleeps.append(delay)
+        await asyncio.sleep(0)
+        self.now += delay
+
+
+@pytest.mark.asyncio
+async def test_bucket_burst_then_rate() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(RatePolicy(rate=2, burst=3), clock, clock.sleep)
+
+    for _ in range(3):
+        await bucket.acquire()
+    assert not clock.sleeps
+
+    await bucket.acquire()
+    assert clock.sleeps == [0.5]
+
+
+@pytest.mark.asyncio
+async def test_bucket_waiters_in_order() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(RatePolicy(rate=1, burst=1), clock, clock.wait)
+
+    await asyncio.gather(*[bucket.acquire() for _ in range(4)])
+    assert clock.sleeps == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_bucket_throttled_while_waiting() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(RatePolicy(rate=2, burst=1), clock, clock.wait)
+    await bucket.acquire()
+    waiter = asyncio.ensure_future(bucket.acquire())
+    await asyncio.sleep(0)
+
+    bucket.on_throttled()
+    await waiter
+    assert clock.sleeps == [0.5, 0.5]
+    assert clock.now == 1
+
+
+def test_bucket_aimd() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(RatePolicy(rate=10, min_rate=2, increase=1),
+                         clock, clock.sleep)
+
+    bucket.on_throttled()
+    assert bucket.rate == 5
+    bucket.on_throttled()
+    bucket.on_throttled()
+    assert bucket.rate == 2
+
+    bucket.on_success()
+    assert bucket.rate == 3
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+
+def test_bucket_retry_after() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(RatePolicy(rate=4, burst=4), clock, clock.sleep)
+
+    bucket.on_throttled(retry_after=3)
+    assert bucket.rate == 2
+    assert bucket.tokens == -6
+
+
+@pytest.mark.asyncio
+async def test_limiter_endpoint_and_global() -> None:
+    clock = _Clock()
+    limiter = RateLimiter(RatePolicy(rate=10, burst=10),
+                          {'hvac_update': RatePolicy(rate=0.1)},
+                          clock, clock.sleep)
+
+    await limiter.acquire('hvac_update')
+    await limiter.acquire('system')
+    assert not clock.sleeps
+
+    await limiter.acquire('hvac_update')
+    assert clock.sleeps == [10]
+    assert limiter.bucket('system') is None
+
+
+def test_limiter_throttled() -> None:
+    limiter = RateLimiter(RatePolicy(rate=10),
+                          {'hvac_update': RatePolicy(rate=1)})
+
+    limiter.on_response('hvac_update', 429)
+    assert limiter.bucket('hvac_update').rate == 0.5
+    assert limiter.bucket().rate == 5
+
+    limiter.on_response('hvac_update', 500)
+    assert limiter.bucket('hvac_update').rate == 0.5
+
+
+def test_limiter_conflict() -> None:
+    limiter = RateLimiter(RatePolicy(rate=10))
+
+    limiter.on_response('hvac_update', 409)
+    assert limiter.bucket('hvac_update').rate == 1 / 120
+    assert limiter.bucket().rate == 10
+
+    limiter.on_response('system_quickmode', 409)
+    assert limiter.bucket().rate == 10
+
+
+@pytest.mark.asyncio
+async def test_connector_throttled(session: ClientSession,
+                                   raw_resp: aioresponses) -> None:
+    clock = _Clock()
+    limiter = RateLimiter(RatePolicy(rate=10), {}, clock, clock.sleep)
+    connector = Connector('user', 'pass', session, rate_limiter=limiter)
+    # pylint: disable=protected-access
+    session.cookie_jar.update_cookies({'test': 'value'})
+    url = urls.hvac_update(serial='123')
+    raw_resp.put(url, status=429, headers={'Retry-After': '2'})
+
+    with pytest.raises(ApiError):
+        await connector.put(url)
+
+    assert limiter.bucket().rate == 5
+    assert limiter.bucket().tokens == -10
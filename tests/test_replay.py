@@ -0,0 +1,195 @@
+"""Test for record and replay."""
+import asyncio
+import functools
+import json
+import os
+from typing import Any
+
+import pytest
+from aiohttp import ClientSession
+from aioresponses import aioresponses
+
+from pymultimatic.api import ApiError, Connector, urls
+from pymultimatic.api.replay import (RecordedExchange, Recording,
+                                     RecordingConnector, ReplayServer)
+from pymultimatic.model import mapper
+from pymultimatic.systemmanager import SystemManager
+from tests.conftest import path
+
+
+def _load(name: str) -> Any:
+    with open(path('files/responses/' + name), 'r') as file:
+        return json.loads(file.read())
+
+
+SERIAL = mapper.map_serial_number(_load('facilities'))
+
+
+def _exchange(url: str, name: str) -> RecordedExchange:
+    return RecordedExchange('get', url[len(urls.base()):], 200,
+                            json.dumps(_load(name)), elapsed=0.01)
+
+
+def _recording() -> Recording:
+    return Recording([
+        _exchange(urls.facilities_list(), 'facilities'),
+        _exchange(urls.system(serial=SERIAL), 'systemcontrol'),
+        _exchange(urls.live_report(serial=SERIAL), 'livereport'),
+        _exchange(urls.hvac(serial=SERIAL), 'hvacstate'),
+        _exchange(urls.gateway_type(serial=SERIAL), 'gateway'),
+        _exchange(urls.rooms(serial=SERIAL), 'rooms'),
+    ])
+
+
+@pytest.mark.asyncio
+async def test_record(session: ClientSession, resp: aioresponses) -> None:
+    resp.get(urls.system(serial=SERIAL), payload=_load('systemcontrol'))
+    resp.get(urls.rooms(serial=SERIAL), status=500, body='error')
+    connector = RecordingConnector('user', 'pass', session)
+
+    await connector.get(urls.system(serial=SERIAL))
+    with pytest.raises(ApiError):
+        await connector.get(urls.rooms(serial=SERIAL))
+
+    exchanges = connector.recording.exchanges
+    assert [(e.method, e.path, e.status) for e in exchanges] == [
+        ('get', '/facilities/{}/systemcontrol/v1'.format(SERIAL), 200),
+        ('get', '/facilities/{}/rbr/v1/rooms'.format(SERIAL), 500),
+    ]
+    assert json.loads(exchanges[0].body) == _load('systemcontrol')
+    assert exchanges[1].body == 'error'
+    assert exchanges[0].elapsed >= 0
+
+
+@pytest.mark.asyncio
+async def test_record_manager(session: ClientSession) -> None:
+    recording = Recording()
+    async with ReplayServer(_recording()) as server:
+        manager = SystemManager(
+            'user', 'pass', session, base_url=server.base_url,
+            connector_factory=functools.partial(RecordingConnector,
+                                                recording=recording))
+        recorded = await manager.get_system()
+
+    assert {e.path for e in recording.exchanges} \
+        == {e.path for e in _recording().exchanges}
+    async with ReplayServer(recording) as server:
+        replayed = await SystemManager('user', 'pass', session,
+                                       base_url=server.base_url).get_system()
+    assert replayed == recorded
+
+
+def test_save_load(tmpdir: str) -> None:
+    file = os.path.join(str(tmpdir), 'recording.json')
+    recording = _recording()
+    recording.add(RecordedExchange('put', '/path', 200, '', {'a': 1}))
+
+    recording.save(file)
+
+    assert Recording.load(file) == recording
+
+
+def test_load_invalid(tmpdir: str) -> None:
+    file = os.path.join(str(tmpdir), 'recording.json')
+    with open(file, 'w') as out:
+        out.write('[{"method": "get"}]')
+
+    with pytest.raises(ValueError):
+        Recording.load(file)
+
+
+@pytest.mark.asyncio
+async def test_replay_system(session: ClientSession) -> None:
+    async with ReplayServer(_recording()) as server:
+        manager = SystemManager('user', 'pass', session,
+                                base_url=server.base_url)
+
+        system = await manager.get_system()
+
+        assert len(system.zones) == 2
+        assert len(system.rooms) == 4
+        assert list(server.statuses) == [200]
+
+
+@pytest.mark.asyncio
+async def test_replay_in_turn(session: ClientSession) -> None:
+    recording = _recording()
+    recording.add(RecordedExchange('get', '/facilities', 200, '{"b": 2}'))
+    async with ReplayServer(recording) as server:
+        connector = Connector('user', 'pass', session,
+                              base_url=server.base_url)
+
+        first = await connector.get(urls.facilities_list())
+        second = await connector.get(urls.facilities_list())
+        third = await connector.get(urls.facilities_list())
+
+        assert first == third == _load('facilities')
+        assert second == {'b': 2}
+
+
+@pytest.mark.asyncio
+async def test_replay_not_recorded(session: ClientSession) -> None:
+    async with ReplayServer(_recording()) as server:
+        connector = Connector('user', 'pass', session,
+                              base_url=server.base_url)
+
+        with pytest.raises(ApiError) as exc:
+            await connector.get(urls.zones(serial=SERIAL))
+
+        assert exc.value.response.status == 404
+
+
+@pytest.mark.asyncio
+async def test_replay_not_logged_in(session: ClientSession) -> None:
+    async with ReplayServer(_recording()) as server:
+        async with session.get(server.base_url + '/facilities') as response:
+            assert response.status == 401
+
+
+@pytest.mark.asyncio
+async def test_replay_session_expired(session: ClientSession) -> None:
+    async with ReplayServer(_recording(), errors={401: 0.5},
+                            seed=1) as server:
+        connector = Connector('user', 'pass', session,
+                              base_url=server.base_url)
+
+        for _ in range(10):
+            assert await connector.get(urls.facilities_list()) \
+                == _load('facilities')
+
+        assert server.statuses[401] > 0
+        assert server.statuses[200] > 10
+
+
+@pytest.mark.asyncio
+async def test_replay_throttled(session: ClientSession) -> None:
+    async with ReplayServer(_recording(), errors={409: 1.0},
+                            retry_after=12) as server:
+        connector = Connector('user', 'pass', session,
+                              base_url=server.base_url)
+
+        with pytest.raises(ApiError) as exc:
+            await connector.get(urls.facilities_list())
+
+        assert exc.value.response.status == 409
+        assert exc.value.response.headers['Retry-After'] == '12'
+
+
+@pytest.mark.asyncio
+async def test_replay_max_concurrency(session: ClientSession) -> None:
+    async with ReplayServer(_recording(), latency=0.01,
+                            max_concurrency=2) as server:
+        connector = Connector('user', 'pass', session,
+                              base_url=server.base_url)
+        await connector.login()
+
+        await asyncio.gather(*[connector.get(urls.base() + exchange.path)
+                               for exchange in _recording().exchanges])
+
+        assert server.statuses[200] == 8
+        assert server.max_in_flight == 2
+
+
+def test_base_url_not_started() -> None:
+    with pytest.raises(RuntimeError):
+        assert ReplayServer(_recording()).base_url
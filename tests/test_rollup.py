@@ -0,0 +1,154 @@
+"""Tests for rollups."""
+import unittest
+from datetime import date, datetime, timezone
+from array import array
+
+from pymultimatic.history import RollupEngine
+from pymultimatic.history.rollup import bucket_end, bucket_start
+from pymultimatic.model import EnergyHistory, EnergySeries, Report
+
+KEY = ('Control_DHW', 'DomesticHotWaterTankTemperature')
+
+
+def _ts(year: int, month: int, day: int, hour: int = 0,
+        minute: int = 0) -> float:
+    return datetime(year, month, day, hour, minute,
+                    tzinfo=timezone.utc).timestamp()
+
+
+class RollupTest(unittest.TestCase):
+    """Test class."""
+
+    def setUp(self) -> None:
+        # one value every 30 minutes from 2021-01-30 to 2021-02-02
+        self.engine = RollupEngine()
+        for idx in range(4 * 48):
+            self.engine.add(KEY, _ts(2021, 1, 30) + idx * 1800, idx)
+
+    def test_buckets(self) -> None:
+        """Buckets are aligned on UTC."""
+        self.assertEqual(_ts(2021, 2, 1), bucket_start(_ts(2021, 2, 28, 5),
+                                                       'month'))
+        self.assertEqual(_ts(2021, 3, 1), bucket_end(_ts(2021, 2, 1),
+                                                     'month'))
+        self.assertEqual(_ts(2021, 2, 3), bucket_start(_ts(2021, 2, 3, 5, 7),
+                                                       'day'))
+        self.assertEqual(_ts(2021, 2, 3, 5), bucket_start(
+            _ts(2021, 2, 3, 5, 7), 'hour'))
+
+    def test_query(self) -> None:
+        """Buckets hold count, sum, min and max."""
+        buckets = self.engine.query(KEY, _ts(2021, 1, 30), _ts(2021, 1, 30, 2),
+                                    'hour')
+
+        self.assertEqual(2, len(buckets))
+        self.assertEqual(_ts(2021, 1, 30, 1), buckets[1].start)
+        self.assertEqual(_ts(2021, 1, 30, 2), buckets[1].end)
+        self.assertEqual((2, 5, 2, 3, 2.5),
+                         (buckets[1].count, buckets[1].total,
+                          buckets[1].minimum, buckets[1].maximum,
+                          buckets[1].mean))
+
+    def test_query_coarsest(self) -> None:
+        """Coarsest resolution aligned on the range is used."""
+        months = self.engine.query(KEY, _ts(2021, 1, 1), _ts(2021, 3, 1))
+        days = self.engine.query(KEY, _ts(2021, 1, 31), _ts(2021, 2, 2))
+        hours = self.engine.query(KEY, _ts(2021, 1, 31), _ts(2021, 2, 1, 3))
+
+        self.assertEqual([96, 96], [bucket.count for bucket in months])
+        self.assertEqual([48, 48], [bucket.count for bucket in days])
+        self.assertEqual(27, len(hours))
+
+    def test_aggregate(self) -> None:
+        """Range is covered by buckets of several resolutions."""
+        start = _ts(2021, 1, 30, 22)
+        end = _ts(2021, 2, 2, 3)
+
+        bucket = self.engine.aggregate(KEY, start, end)
+
+        values = [idx for idx in range(4 * 48)
+                  if start <= _ts(2021, 1, 30) + idx * 1800 < end]
+        assert bucket is not None
+        self.assertEqual((len(values), sum(values), min(values), max(values)),
+                         (bucket.count, bucket.total, bucket.minimum,
+                          bucket.maximum))
+        self.assertEqual((start, end), (bucket.start, bucket.end))
+
+    def test_aggregate_empty(self) -> None:
+        """No value in the range."""
+        self.assertIsNone(self.engine.aggregate(KEY, _ts(2020, 1, 1),
+                                                _ts(2021, 1, 1)))
+        self.assertIsNone(self.engine.aggregate(('other', 'key'),
+                                                _ts(2020, 1, 1),
+                                                _ts(2021, 1, 1)))
+
+    def test_before_last(self) -> None:
+        """Timestamps must be increasing."""
+        with self.assertRaises(ValueError):
+            self.engine.add(KEY, _ts(2021, 1, 1), 1)
+
+    def test_feed_before_last(self) -> None:
+        """Nothing is added if one report is before the last timestamp."""
+        reports = [Report(id=report_id, value=1, name='name', unit='°C',
+                          device_id='Control_DHW', device_name='VRC700')
+                   for report_id in ('Other', KEY[1])]
+
+        with self.assertRaises(ValueError):
+            self.engine.feed(reports, _ts(2021, 1, 31))
+
+        self.assertIsNone(self.engine.aggregate(('Control_DHW', 'Other'),
+                                                _ts(2021, 1, 1),
+                                                _ts(2021, 3, 1)))
+
+    def test_resolutions(self) -> None:
+        """Only maintained resolutions can be queried."""
+        engine = RollupEngine(['month', 'day'])
+        engine.add(KEY, _ts(2021, 1, 1), 1)
+
+        self.assertEqual(('day', 'month'), engine.resolutions)
+        self.assertEqual(1, len(engine.query(KEY, _ts(2021, 1, 1),
+                                             _ts(2021, 1, 1, 2))))
+        with self.assertRaises(ValueError):
+            engine.query(KEY, 0, 1, 'hour')
+        with self.assertRaises(ValueError):
+            RollupEngine(['week'])
+
+    def test_feed_energy(self) -> None:
+        """Overlapping periods are skipped, the last one is updated."""
+        key = ('device', 'CONSUMED_ELECTRICAL_POWER', 'DHW')
+        first = EnergySeries(*key, array('d', [_ts(2021, 1, 1),
+                                               _ts(2021, 2, 1)]),
+                             array('d', [100, 200]))
+        second = EnergySeries(*key, array('d', [_ts(2021, 2, 1),
+                                                _ts(2021, 3, 1)]),
+                              array('d', [250, 300]))
+
+        self.engine.feed_energy(EnergyHistory(date(2021, 1, 1),
+                                              date(2021, 2, 28), 'MONTH',
+                                              [first]))
+        self.engine.feed_energy(EnergyHistory(date(2021, 2, 1),
+                                              date(2021, 3, 31), 'MONTH',
+                                              [second]))
+
+        self.assertEqual([100, 250, 300], [
+            bucket.total for bucket in self.engine.query(
+                key, _ts(2021, 1, 1), _ts(2022, 1, 1))])
+
+    def test_feed_energy_refresh(self) -> None:
+        """Value of the current day is updated in every bucket."""
+        key = ('device', 'CONSUMED_ELECTRICAL_POWER', 'DHW')
+        timestamps = array('d', [_ts(2021, 1, 4), _ts(2021, 1, 5)])
+        for values in ([5, 2], [5, 9], [5, 1]):
+            self.engine.feed_energy(EnergyHistory(
+                date(2021, 1, 4), date(2021, 1, 5), 'DAY',
+                [EnergySeries(*key, timestamps, array('d', values))]))
+
+            bucket = self.engine.aggregate(key, _ts(2021, 1, 1),
+                                           _ts(2021, 2, 1))
+            assert bucket is not None
+            self.assertEqual((2, 5 + values[1], min(values), max(values)),
+                             (bucket.count, bucket.total, bucket.minimum,
+                              bucket.maximum))
+            self.assertEqual([5, values[1]], [
+                b.total for b in self.engine.query(
+                    key, _ts(2021, 1, 4), _ts(2021, 1, 6), 'day')])
@@ -1,6 +1,8 @@
 """Test for rooms."""
 import unittest
 
+import attr
+
 from pymultimatic.model import Room, OperatingModes
 from tests.conftest import _room
 
@@ -30,3 +32,14 @@ class RoomTest(unittest.TestCase):
         self.assertEqual(OperatingModes.OFF, active_mode.current)
         self.assertEqual(Room.MIN_TARGET_TEMP, active_mode.target)
         self.assertIsNone(active_mode.sub)
+
+    def test_slots(self) -> None:
+        """Test room has no instance dict."""
+        room = _room()
+
+        self.assertFalse(hasattr(room, '__dict__'))
+        self.assertEqual(['time_program', 'operating_mode', 'target_high',
+                          'id', 'name', 'temperature', 'quick_veto'],
+                         [field.name for field in attr.fields(Room)][:7])
+        with self.assertRaises(AttributeError):
+            room.current_temperature = 20  # type: ignore
@@ -0,0 +1,155 @@
+"""Tests for series store."""
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from pymultimatic.history import SeriesStore
+from pymultimatic.model import Report
+
+KEY = ('Control_DHW', 'DomesticHotWaterTankTemperature')
+
+
+def _report(report_id: str, value: float) -> Report:
+    return Report(id=report_id, value=value, name='name', unit='°C',
+                  device_id='Control_DHW', device_name='VRC700')
+
+
+class SeriesStoreTest(unittest.TestCase):
+    """Test class."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'store')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def test_query(self) -> None:
+        """Query across segments and buffer."""
+        store = SeriesStore(segment_size=4)
+        for idx in range(10):
+            store.append(KEY, 100 + idx, idx * 1.5)
+
+        timestamps, values = store.query(KEY, 102, 107)
+
+        self.assertEqual(array('d', [102, 103, 104, 105, 106]), timestamps)
+        self.assertEqual(array('d', [3, 4.5, 6, 7.5, 9]), values)
+        self.assertEqual(10, len(store.query(KEY)[0]))
+        self.assertEqual(10, store.count(KEY))
+
+    def test_query_unknown(self) -> None:
+        """Unknown series is empty."""
+        timestamps, values = SeriesStore().query(KEY)
+
+        self.assertEqual(0, len(timestamps))
+        self.assertEqual(0, len(values))
+
+    def test_append_before_last(self) -> None:
+        """Timestamps must be increasing."""
+        store = SeriesStore(segment_size=2)
+        store.append(KEY, 10, 1)
+        store.append(KEY, 11, 1)
+
+        with self.assertRaises(ValueError):
+            store.append(KEY, 10.5, 1)
+        store.append(KEY, 11, 2)
+
+    def test_feed(self) -> None:
+        """Reports are stored by device and report id."""
+        store = SeriesStore()
+        store.feed([_report(KEY[1], 45.5), _report('Other', 1)], 10)
+        store.feed([_report(KEY[1], 46)], 20)
+
+        self.assertEqual([KEY, ('Control_DHW', 'Other')], list(store.keys()))
+        self.assertEqual(array('d', [45.5, 46]), store.query(KEY)[1])
+
+    def test_feed_before_last(self) -> None:
+        """Nothing is stored if one report is before the last timestamp."""
+        store = SeriesStore()
+        store.append(('Control_DHW', 'Other'), 30, 1)
+
+        with self.assertRaises(ValueError):
+            store.feed([_report(KEY[1], 45.5), _report('Other', 2)], 20)
+
+        self.assertEqual(0, store.count(KEY))
+        self.assertEqual([('Control_DHW', 'Other')], list(store.keys()))
+
+    def test_persistence(self) -> None:
+        """Segments are written and loaded back."""
+        store = SeriesStore(self.path, segment_size=3)
+        for idx in range(5):
+            store.append(KEY, idx, idx)
+        store.close()
+
+        files = os.listdir(os.path.join(self.path, 'Control_DHW', KEY[1]))
+        self.assertEqual(['00000000.seg', '00000001.seg'], sorted(files))
+
+        store = SeriesStore(self.path, segment_size=3)
+        store.append(KEY, 5, 5)
+        self.assertEqual(array('d', range(6)), store.query(KEY)[1])
+        self.assertEqual(array('d', [2, 3]), store.query(KEY, 2, 4)[0])
+        with self.assertRaises(ValueError):
+            store.append(KEY, 4, 0)
+        store.close()
+
+    def test_key_escaped(self) -> None:
+        """Keys are escaped to be used as directory names."""
+        key = ('a/b', '..')
+        store = SeriesStore(self.path, segment_size=1)
+        store.append(key, 1, 2)
+        store.close()
+
+        self.assertEqual([key], list(SeriesStore(self.path).keys()))
+
+    def test_invalid_segment(self) -> None:
+        """Invalid segment is skipped and not overwritten."""
+        store = SeriesStore(self.path, segment_size=1)
+        store.append(KEY, 1, 1)
+        store.append(KEY, 2, 2)
+        store.close()
+        directory = os.path.join(self.path, 'Control_DHW', KEY[1])
+        with open(os.path.join(directory, '00000000.seg'), 'wb') as file:
+            file.write(b'invalid')
+
+        store = SeriesStore(self.path, segment_size=1)
+        store.append(KEY, 3, 3)
+        store.close()
+
+        self.assertEqual(array('d', [2, 3]),
+                         SeriesStore(self.path).query(KEY)[1])
+
+    def test_compress(self) -> None:
+        """Compressed segments are queried like plain segments."""
+        store = SeriesStore(segment_size=4, compress=True)
+        for idx in range(10):
+            store.append(KEY, 100 + idx, idx * 1.5)
+
+        timestamps, values = store.query(KEY, 102, 107)
+
+        self.assertEqual(array('d', [102, 103, 104, 105, 106]), timestamps)
+        self.assertEqual(array('d', [3, 4.5, 6, 7.5, 9]), values)
+        self.assertEqual(10, store.count(KEY))
+
+    def test_compress_persistence(self) -> None:
+        """Store reads plain and compressed segments."""
+        store = SeriesStore(self.path, segment_size=50)
+        for idx in range(50):
+            store.append(KEY, idx * 60, 21.5)
+        store.close()
+        store = SeriesStore(self.path, segment_size=50, compress=True)
+        for idx in range(50, 100):
+            store.append(KEY, idx * 60, 21.5)
+        store.close()
+
+        directory = os.path.join(self.path, 'Control_DHW', KEY[1])
+        size = os.path.getsize(os.path.join(directory, '00000001.seg'))
+        self.assertLess(size, os.path.getsize(
+            os.path.join(directory, '00000000.seg')) / 10)
+
+        store = SeriesStore(self.path)
+        self.assertEqual(array('d', [21.5] * 100), store.query(KEY)[1])
+        self.assertEqual(array('d', [2940, 3000]),
+                         store.query(KEY, 2940, 3060)[0])
+        store.close()
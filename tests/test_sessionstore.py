@@ -0,0 +1,80 @@
+"""Test for session store."""
+import os
+from http.cookies import SimpleCookie
+
+import pytest
+from aiohttp import CookieJar
+from yarl import URL
+
+from pymultimatic.api import urls
+from pymultimatic.api.sessionstore import SessionStore
+
+
+def _jar_with_cookie() -> CookieJar:
+    jar = CookieJar()
+    cookie = SimpleCookie()  # type: SimpleCookie[str]
+    cookie['test'] = 'value'
+    cookie['test']['path'] = '/'
+    jar.update_cookies(cookie, URL(urls.authenticate()))
+    return jar
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_cookies(tmpdir: str) -> None:
+    store = SessionStore(str(tmpdir))
+    store.save_cookies(_jar_with_cookie())
+
+    jar = CookieJar()
+    assert store.load_cookies(jar)
+    assert jar.filter_cookies(URL(urls.base()))['test'].value == 'value'
+
+
+@pytest.mark.asyncio
+async def test_load_cookies_other_url(tmpdir: str) -> None:
+    store = SessionStore(str(tmpdir))
+    jar = CookieJar()
+    jar.update_cookies({'test': 'value'}, URL('http://replay.test/a'))
+    store.save_cookies(jar)
+
+    default = CookieJar()
+    store.load_cookies(default)
+    loaded = CookieJar()
+    assert store.load_cookies(loaded, 'http://replay.test/api')
+
+    assert not default.filter_cookies(URL('http://replay.test/api'))
+    assert loaded.filter_cookies(URL('http://replay.test/api'))[
+        'test'].value == 'value'
+
+
+@pytest.mark.asyncio
+async def test_load_expired_cookies(tmpdir: str) -> None:
+    now = {'time': 1000.0}
+    store = SessionStore(str(tmpdir), max_age=60, clock=lambda: now['time'])
+    store.save_cookies(_jar_with_cookie())
+
+    now['time'] += 61
+    jar = CookieJar()
+    assert not store.load_cookies(jar)
+    assert not jar.filter_cookies(URL(urls.base()))
+
+
+@pytest.mark.asyncio
+async def test_load_nothing_saved(tmpdir: str) -> None:
+    store = SessionStore(os.path.join(str(tmpdir), 'missing'))
+
+    assert not store.load_cookies(CookieJar())
+    assert store.load_serial() is None
+
+
+@pytest.mark.asyncio
+async def test_serial_and_clear(tmpdir: str) -> None:
+    store = SessionStore(str(tmpdir))
+    store.save_cookies(_jar_with_cookie())
+    store.save_serial('123')
+
+    assert store.load_serial() == '123'
+    assert store.load_cookies(CookieJar())
+
+    store.clear()
+    assert store.load_serial() is None
+    assert not store.load_cookies(CookieJar())
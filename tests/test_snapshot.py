@@ -0,0 +1,108 @@
+"""Test for snapshot."""
+import json
+import marshal
+import os
+from datetime import datetime
+from typing import Any
+
+import pytest
+
+from pymultimatic.model import System, ActiveFunction, mapper, snapshot
+from tests.conftest import path
+
+
+def _load(name: str) -> Any:
+    with open(path('files/responses/' + name), 'r') as file:
+        return json.loads(file.read())
+
+
+def _system() -> System:
+    full_system = _load('systemcontrol')
+    live_report = _load('livereport')
+    hvac = _load('hvacstate_errors')
+    return System(
+        holiday=mapper.map_holiday_mode(full_system),
+        quick_mode=mapper.map_quick_mode(full_system),
+        info=mapper.map_system_info(_load('facilities'), _load('gateway'),
+                                    hvac, None),
+        zones=mapper.map_zones(full_system),
+        rooms=mapper.map_rooms(_load('rooms')),
+        dhw=mapper.map_dhw(full_system, live_report),
+        reports=mapper.map_reports(live_report),
+        outdoor_temperature=mapper.map_outdoor_temp(full_system),
+        boiler_status=mapper.map_boiler_status(hvac),
+        errors=mapper.map_errors(hvac),
+        ventilation=mapper.map_ventilation(full_system))
+
+
+def test_dumps_loads() -> None:
+    system = _system()
+
+    loaded = snapshot.loads(snapshot.dumps(system))
+
+    assert loaded == system
+    assert loaded.holiday.start_date == system.holiday.start_date
+    assert isinstance(loaded.zones[0].active_function, ActiveFunction)
+    assert loaded._rooms[system.rooms[0].id] is loaded.rooms[0]
+    time_program = loaded.rooms[0].time_program
+    assert time_program.get_for(datetime(2019, 2, 18, 12)) \
+        == system.rooms[0].time_program.get_for(datetime(2019, 2, 18, 12))
+
+
+def test_shared_objects() -> None:
+    system = _system()
+    time_program = system.rooms[0].time_program
+    system.rooms[1].time_program = time_program
+
+    loaded = snapshot.loads(snapshot.dumps(system))
+
+    assert loaded.rooms[0].time_program is loaded.rooms[1].time_program
+    assert loaded.rooms[0].time_program is not time_program
+
+
+def test_new_attribute_with_default() -> None:
+    header, version, classes, payload = marshal.loads(
+        snapshot.dumps(_system()))
+    classes = [(name, tuple(n for n in names if n != 'rbr'))
+               if name == 'Zone' else (name, names)
+               for name, names in classes]
+    zone_id = [name for name, _ in classes].index('Zone')
+
+    def _drop_rbr(value: Any) -> Any:
+        if isinstance(value, tuple) and value[:2] == (0, zone_id):
+            return value[:7] + value[8:]
+        if isinstance(value, tuple):
+            return tuple(_drop_rbr(item) for item in value)
+        if isinstance(value, list):
+            return [_drop_rbr(item) for item in value]
+        if isinstance(value, dict):
+            return {key: _drop_rbr(item) for key, item in value.items()}
+        return value
+
+    loaded = snapshot.loads(marshal.dumps(
+        (header, version, classes, _drop_rbr(payload))))
+
+    assert loaded.zones[0].rbr is False
+    assert loaded.zones[0].heating is not None
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'invalid',
+    marshal.dumps(('pymultimatic.snapshot', 0, [], None)),
+    marshal.dumps(('pymultimatic.snapshot', 1, [('os', ())], (0, 0))),
+    marshal.dumps(('pymultimatic.snapshot', 1, [], [])),
+])
+def test_invalid(data: bytes) -> None:
+    with pytest.raises(ValueError):
+        snapshot.loads(data)
+
+
+def test_dump_load(tmpdir: str) -> None:
+    file = os.path.join(str(tmpdir), 'system')
+    system = _system()
+
+    snapshot.dump(system, file)
+
+    assert snapshot.load(file) == system
+    assert not os.path.exists(file + '.tmp')
@@ -2,10 +2,11 @@
 import datetime
 import unittest
 
-from pymultimatic.model import (System, TimePeriodSetting, TimeProgramDay,
-                                QuickModes, QuickVeto, HolidayMode, Room, Zone,
-                                OperatingModes, SettingModes, constants, Dhw,
-                                HotWater, Ventilation)
+from pymultimatic.model import (System, TimePeriodSetting, TimeProgram,
+                                TimeProgramDay, QuickModes, QuickVeto,
+                                HolidayMode, Room, Zone, OperatingModes,
+                                SettingModes, constants, Dhw, HotWater,
+                                Ventilation)
 from tests.conftest import _zone, _time_program, _room, _circulation, \
     _hotwater, _zone_cooling
 
@@ -227,9 +228,9 @@ class SystemTest(unittest.TestCase):
         timeprogram_day_setting_sunday = \
             TimePeriodSetting('00:00', None, SettingModes.NIGHT)
 
-        timeprogram = _time_program(SettingModes.DAY, None)
-        timeprogram.days['sunday'] = \
-            TimeProgramDay([timeprogram_day_setting_sunday])
+        timeprogram = TimeProgram(dict(
+            _time_program(SettingModes.DAY, None).days,
+            sunday=TimeProgramDay([timeprogram_day_setting_sunday])))
 
         zone = _zone()
         zone.heating.time_program = timeprogram
@@ -246,9 +247,9 @@ class SystemTest(unittest.TestCase):
         timeprogram_day_setting_sunday = \
             TimePeriodSetting('00:00', None, SettingModes.DAY)
 
-        timeprogram = _time_program(SettingModes.NIGHT, None)
-        timeprogram.days['sunday'] = \
-            TimeProgramDay([timeprogram_day_setting_sunday])
+        timeprogram = TimeProgram(dict(
+            _time_program(SettingModes.NIGHT, None).days,
+            sunday=TimeProgramDay([timeprogram_day_setting_sunday])))
 
         zone = _zone()
         zone.heating.time_program = timeprogram
@@ -1,16 +1,23 @@
+# pylint: disable=too-many-lines
 import json
-from datetime import date, timedelta
-from typing import Any, List, Dict, AsyncGenerator, Tuple, Type
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, List, Dict, AsyncGenerator, Optional, Tuple, Type
 
 from unittest import mock
 import pytest
-from aiohttp import ClientSession, ClientResponse
+from aiohttp import ClientSession, ClientResponse, CookieJar
 from aioresponses import aioresponses
+from yarl import URL
 
 from tests.conftest import mock_auth, path
 from pymultimatic.api import urls, payloads, ApiError, Connector
-from pymultimatic.model import OperatingModes, QuickModes, QuickVeto, \
+from pymultimatic.model import OperatingModes, QuickModes, QuickVeto, System, \
     constants, mapper
+from pymultimatic.api.cache import ResponseCache
+from pymultimatic.api.sessionstore import SessionStore
+from pymultimatic.api.validation import ValidationPolicy, ValidationMode
+from pymultimatic.history import RollupEngine, SeriesStore
 from pymultimatic.systemmanager import SystemManager, retry_async
 
 SERIAL = mapper.map_serial_number(
@@ -70,6 +77,169 @@ async def test_system(manager: SystemManager, resp: aioresponses) -> None:
     assert manager._fixed_serial
 
 
+@pytest.mark.asyncio
+async def test_system_series_store(session: ClientSession,
+                                   connector: Connector,
+                                   resp: aioresponses) -> None:
+    store = SeriesStore()
+    rollup = RollupEngine()
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            series_store=store, rollup=rollup)
+    await connector.login()
+    manager._connector = connector
+    _mock_system(resp)
+    _mock_system(resp)
+
+    system = await manager.get_system()
+    await manager.get_system()
+
+    report = system.reports[0]
+    timestamps, values = store.query((report.device_id, report.id))
+    assert list(values) == [report.value, report.value]
+    assert timestamps[0] <= timestamps[1]
+    room = system.rooms[0]
+    assert list(store.query(('rooms', str(room.id)))[1]) \
+        == [room.temperature, room.temperature]
+    assert store.count(('system', 'outdoor_temperature')) == 2
+    bucket = rollup.aggregate(('rooms', str(room.id)), timestamps[0],
+                              timestamps[1] + 1)
+    assert bucket is not None
+    assert bucket.count == 2
+    assert bucket.mean == room.temperature
+
+
+def _load_system_data() -> Dict[str, Any]:
+    data = {}
+    for name in ('hvacstate', 'livereport', 'rooms', 'systemcontrol',
+                 'facilities', 'gateway'):
+        with open(path('files/responses/' + name), 'r') as file:
+            data[name] = json.loads(file.read())
+    return data
+
+
+def _mock_system(resp: aioresponses,
+                 data: Optional[Dict[str, Any]] = None) -> None:
+    if data is None:
+        data = _load_system_data()
+    _mock_urls(resp, data['hvacstate'], data['livereport'], data['rooms'],
+               data['systemcontrol'], data['facilities'], data['gateway'])
+
+
+@pytest.mark.asyncio
+async def test_system_speculative_rooms(session: ClientSession,
+                                        connector: Connector,
+                                        resp: aioresponses) -> None:
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            speculative_rooms=True)
+    await connector.login()
+    rooms_url = urls.rooms(serial=SERIAL)
+    with mock.patch.object(connector, 'request', wraps=connector.request):
+        manager._connector = connector
+        _mock_system(resp)
+
+        requested_before_mapping = []
+        map_zones = mapper.map_zones
+
+        def _map_zones(*args: Any) -> Any:
+            calls = connector.request.call_args_list  # type: ignore
+            requested_before_mapping.append(
+                rooms_url in [call[0][1] for call in calls])
+            return map_zones(*args)
+
+        with mock.patch.object(mapper, 'map_zones', _map_zones):
+            system = await manager.get_system()
+
+        assert len(system.rooms) == 4
+        assert requested_before_mapping == [True]
+        _assert_calls(6, manager, [rooms_url])
+
+
+@pytest.mark.asyncio
+async def test_system_speculative_rooms_no_rbr(session: ClientSession,
+                                               connector: Connector,
+                                               resp: aioresponses) -> None:
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            speculative_rooms=True)
+    await connector.login()
+    with mock.patch.object(connector, 'request', wraps=connector.request):
+        manager._connector = connector
+        data = _load_system_data()
+        data['rooms'] = None
+        for zone in data['systemcontrol']['body']['zones']:
+            zone.pop('currently_controlled_by', None)
+
+        resp.get(urls.rooms(serial=SERIAL), status=404)
+        _mock_system(resp, data)
+
+        system = await manager.get_system()
+        assert not system.rooms
+        _assert_calls(6, manager)
+
+        # manager knows there is no room by room anymore
+        _mock_system(resp, data)
+        await manager.get_system()
+        _assert_calls(11, manager)
+
+
+@pytest.mark.asyncio
+async def test_system_learns_rbr(manager: SystemManager,
+                                 resp: aioresponses) -> None:
+    _mock_system(resp)
+    await manager.get_system()
+    _assert_calls(6, manager)
+
+    _mock_system(resp)
+    system = await manager.get_system()
+
+    assert len(system.rooms) == 4
+    _assert_calls(12, manager)
+
+
+@pytest.mark.asyncio
+async def test_system_incremental_mapping(session: ClientSession,
+                                          connector: Connector,
+                                          resp: aioresponses) -> None:
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            incremental_mapping=True)
+    await connector.login()
+    manager._connector = connector
+
+    _mock_system(resp)
+    first = await manager.get_system()
+
+    data = _load_system_data()
+    data['rooms']['body']['rooms'][0]['configuration'][
+        'currentTemperature'] = 30.0
+    _mock_system(resp, data)
+    second = await manager.get_system()
+
+    assert all(a is b for a, b in zip(first.zones, second.zones))
+    assert first.dhw is second.dhw
+    assert first.rooms[0] is not second.rooms[0]
+    assert second.rooms[0].temperature == 30.0
+    assert all(a is b for a, b in zip(first.rooms[1:], second.rooms[1:]))
+
+
+@pytest.mark.asyncio
+async def test_watch(manager: SystemManager, resp: aioresponses) -> None:
+    _mock_system(resp)
+    _mock_system(resp)
+    data = _load_system_data()
+    data['rooms']['body']['rooms'][0]['configuration'][
+        'currentTemperature'] = 30.0
+    _mock_system(resp, data)
+
+    changes = []
+    async for poll in manager.watch(0):
+        changes.append(poll)
+        break
+
+    assert [[(change.entity, change.attribute, change.new)
+             for change in poll] for poll in changes] \
+        == [[('room', 'temperature', 30.0)]]
+    _assert_calls(18, manager)
+
+
 @pytest.mark.asyncio
 async def test_get_hot_water(manager: SystemManager,
                              resp: aioresponses) -> None:
@@ -237,6 +407,80 @@ async def test_get_room(manager: SystemManager, resp: aioresponses) -> None:
     assert new_room is not None
 
 
+@pytest.mark.asyncio
+async def test_get_energy_history(manager: SystemManager,
+                                  resp: aioresponses) -> None:
+    with open(path('files/responses/emf_devices'), 'r') as file:
+        devices = json.loads(file.read())
+    with open(path('files/responses/emf_report_device'), 'r') as file:
+        report = json.loads(file.read())
+
+    resp.get(urls.emf_report(serial=SERIAL), payload=devices, status=200)
+    for device_id, energy_type, function in mapper.map_emf_series(devices):
+        for start in ('2021-01-04', '2021-01-11'):
+            resp.get(urls.emf_report_device(
+                energy_type, function, 'WEEK', start, '0', serial=SERIAL,
+                device_id=device_id), payload=report, status=200)
+
+    history = await manager.get_energy_history(
+        date(2021, 1, 4), date(2021, 1, 17), 'WEEK', max_concurrency=2)
+
+    assert len(history.series) == 3
+    series = history.get('Control_SYS_MultiMatic', 'CONSUMED_PRIMARY_ENERGY',
+                         'DHW')
+    assert series is not None
+    assert len(series) == 7
+    assert series.total == 40400
+    _assert_calls(7, manager)
+
+
+@pytest.mark.asyncio
+async def test_get_energy_history_series(manager: SystemManager,
+                                         resp: aioresponses) -> None:
+    with open(path('files/responses/emf_report_device'), 'r') as file:
+        report = json.loads(file.read())
+    url = urls.emf_report_device('CONSUMED_ELECTRICAL_POWER', 'DHW', 'MONTH',
+                                 '2021-01-04', '0', serial=SERIAL,
+                                 device_id='device')
+    resp.get(url, payload=report, status=200)
+    manager._rollup = RollupEngine()
+
+    history = await manager.get_energy_history(
+        date(2021, 1, 4), date(2021, 1, 6), 'MONTH',
+        [('device', 'CONSUMED_ELECTRICAL_POWER', 'DHW')])
+
+    assert list(history.get('device', 'CONSUMED_ELECTRICAL_POWER',
+                            'DHW').values) == [5200, 6100, 4800]
+    buckets = manager._rollup.query(
+        ('device', 'CONSUMED_ELECTRICAL_POWER', 'DHW'),
+        datetime(2021, 1, 1, tzinfo=timezone.utc).timestamp(),
+        datetime(2021, 2, 1, tzinfo=timezone.utc).timestamp())
+    assert [(bucket.count, bucket.total) for bucket in buckets] \
+        == [(3, 16100)]
+    _assert_calls(1, manager, [url])
+
+
+@pytest.mark.asyncio
+async def test_get_energy_history_day(manager: SystemManager,
+                                      resp: aioresponses) -> None:
+    report = {'body': {'dataset': [
+        {'key': '2021-01-04T{:02d}:00:00'.format(hour), 'value': hour}
+        for hour in range(24)]}}
+    url = urls.emf_report_device('CONSUMED_ELECTRICAL_POWER', 'DHW', 'DAY',
+                                 '2021-01-04', '0', serial=SERIAL,
+                                 device_id='device')
+    resp.get(url, payload=report, status=200)
+
+    history = await manager.get_energy_history(
+        date(2021, 1, 4), date(2021, 1, 4), 'DAY',
+        [('device', 'CONSUMED_ELECTRICAL_POWER', 'DHW')])
+
+    series = history.get('device', 'CONSUMED_ELECTRICAL_POWER', 'DHW')
+    assert series is not None
+    assert list(series.values) == list(range(24))
+    _assert_calls(1, manager, [url])
+
+
 @pytest.mark.asyncio
 async def test_get_zone(manager: SystemManager, resp: aioresponses) -> None:
     with open(path('files/responses/zone'), 'r') as file:
@@ -626,3 +870,211 @@ async def test_retry_async(on_exceptions: Tuple[Type[BaseException]],
         await func()
 
     assert cnt['cnt'] == (num_tries if should_retry else 1)
+
+
+@pytest.mark.asyncio
+async def test_cache(session: ClientSession, connector: Connector,
+                     resp: aioresponses) -> None:
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            cache=ResponseCache())
+    await connector.login()
+    with mock.patch.object(connector, 'request', wraps=connector.request):
+        manager._connector = connector
+
+        with open(path('files/responses/zone'), 'r') as file:
+            raw_zone = json.loads(file.read())
+
+        zone_url = urls.zone(serial=SERIAL, id='Control_ZO1')
+        quick_veto_url = urls.zone_quick_veto(serial=SERIAL, id='Control_ZO1')
+        resp.get(zone_url, payload=raw_zone, status=200, repeat=True)
+        resp.put(quick_veto_url, status=200)
+
+        assert await manager.get_zone('Control_ZO1') is not None
+        assert await manager.get_zone('Control_ZO1') is not None
+        _assert_calls(1, manager, [zone_url])
+
+        await manager.set_zone_quick_veto('Control_ZO1', QuickVeto(target=20))
+        assert await manager.get_zone('Control_ZO1') is not None
+        _assert_calls(3, manager, [zone_url, quick_veto_url])
+
+
+@pytest.mark.asyncio
+async def test_cache_invalid_response(session: ClientSession,
+                                      connector: Connector,
+                                      resp: aioresponses) -> None:
+    cache = ResponseCache()
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            cache=cache)
+    await connector.login()
+    manager._connector = connector
+
+    with open(path('files/responses/zone'), 'r') as file:
+        raw_zone = json.loads(file.read())
+    invalid_zone = json.loads(json.dumps(raw_zone))
+    del invalid_zone['body']['_id']
+    zone_url = urls.zone(serial=SERIAL, id='Control_ZO1')
+    resp.get(zone_url, payload=invalid_zone, status=200)
+    resp.get(zone_url, payload=raw_zone, status=200)
+
+    async def _sleep(_: float) -> None:
+        pass
+
+    with mock.patch('asyncio.sleep', new=_sleep):
+        zone = await manager.get_zone('Control_ZO1')
+
+    assert zone is not None
+    assert zone.id == raw_zone['body']['_id']
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_not_validated(session: ClientSession,
+                                       connector: Connector) -> None:
+    cache = ResponseCache()
+    policy = ValidationPolicy(ValidationMode.SAMPLED)
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            cache=cache, validation_policy=policy)
+    await connector.login()
+    manager._connector = connector
+
+    with open(path('files/responses/zone'), 'r') as file:
+        raw_zone = json.loads(file.read())
+    zone_url = urls.zone(serial=SERIAL, id='Control_ZO1')
+
+    with mock.patch.object(connector, 'request', return_value=raw_zone), \
+            mock.patch.object(policy, 'should_validate',
+                              wraps=policy.should_validate) as validate:
+        await manager.get_zone('Control_ZO1')
+        await manager.get_zone('Control_ZO1')
+
+    assert validate.call_count == 1
+    assert cache.get(urls.zone, zone_url) is raw_zone
+
+
+@pytest.mark.asyncio
+async def test_validation_off(session: ClientSession, connector: Connector,
+                              resp: aioresponses) -> None:
+    manager = SystemManager(
+        'user', 'pass', session, 'pymultiMATIC', SERIAL,
+        validation_policy=ValidationPolicy(ValidationMode.OFF))
+    await connector.login()
+    manager._connector = connector
+
+    with open(path('files/responses/zone'), 'r') as file:
+        raw_zone = json.loads(file.read())
+    del raw_zone['body']['_id']
+
+    resp.get(urls.zone(serial=SERIAL, id='Control_ZO1'), payload=raw_zone,
+             status=200)
+
+    zone = await manager.get_zone('Control_ZO1')
+    assert zone is not None
+    assert zone.id is None
+
+
+@pytest.mark.asyncio
+async def test_session_store(session: ClientSession, resp: aioresponses,
+                             tmpdir: str) -> None:
+    store = SessionStore(str(tmpdir))
+    saved = CookieJar()
+    saved.update_cookies({'test': 'value'}, URL(urls.authenticate()))
+    store.save_cookies(saved)
+    store.save_serial(SERIAL)
+
+    with open(path('files/responses/zone'), 'r') as file:
+        raw_zone = json.loads(file.read())
+    zone_url = urls.zone(serial=SERIAL, id='Control_ZO1')
+    resp.get(zone_url, payload=raw_zone, status=200)
+
+    manager = SystemManager('user', 'pass', session, session_store=store)
+    assert await manager.get_zone('Control_ZO1') is not None
+
+    assert ('POST', URL(urls.new_token())) not in resp.requests
+    assert ('POST', URL(urls.authenticate())) not in resp.requests
+    assert ('GET', URL(urls.facilities_list())) not in resp.requests
+
+
+@pytest.mark.asyncio
+async def test_warm_start(session: ClientSession, connector: Connector,
+                          resp: aioresponses, tmpdir: str) -> None:
+    snapshot_file = os.path.join(str(tmpdir), 'system')
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            snapshot_path=snapshot_file)
+    await connector.login()
+    manager._connector = connector
+
+    assert manager.load_snapshot() is None
+    _mock_system(resp)
+    system = await manager.get_system()
+    assert os.path.exists(snapshot_file)
+
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            snapshot_path=snapshot_file)
+    manager._connector = connector
+    _mock_system(resp)
+    saved, refreshed = await manager.warm_start()
+
+    assert saved == system
+    assert not refreshed.done()
+    assert await refreshed == system
+
+
+@pytest.mark.asyncio
+async def test_invalid_snapshot(session: ClientSession, tmpdir: str) -> None:
+    snapshot_file = os.path.join(str(tmpdir), 'system')
+    with open(snapshot_file, 'wb') as file:
+        file.write(b'invalid')
+    manager = SystemManager('user', 'pass', session, 'pymultiMATIC', SERIAL,
+                            snapshot_path=snapshot_file)
+
+    assert manager.load_snapshot() is None
+
+
+@pytest.mark.asyncio
+async def test_refresh(manager: SystemManager, resp: aioresponses) -> None:
+    data = _load_system_data()
+    _mock_system(resp, data)
+    system = await manager.get_system()
+    zones = system.zones
+    rooms_before = system.rooms
+
+    for device in data['livereport']['body']['devices']:
+        for report in device['reports']:
+            report['value'] = 99.5
+    resp.get(urls.live_report(serial=SERIAL), payload=data['livereport'],
+             status=200)
+
+    refreshed = await manager.refresh(system, {'live_report'})
+
+    assert refreshed is system
+    _assert_calls(7, manager, [urls.live_report(serial=SERIAL)])
+    assert system.zones is zones
+    assert system.rooms is rooms_before
+    assert all(r.value == 99.5 for r in system.reports)
+    assert system.dhw.hotwater.temperature == 99.5
+
+
+@pytest.mark.asyncio
+async def test_refresh_zones_and_hvac(manager: SystemManager,
+                                      resp: aioresponses) -> None:
+    data = _load_system_data()
+    resp.get(urls.system(serial=SERIAL), payload=data['systemcontrol'],
+             status=200)
+    resp.get(urls.hvac(serial=SERIAL), payload=data['hvacstate'], status=200)
+
+    system = System()
+    await manager.refresh(system, ['zones', 'hvac', 'outdoor_temperature'])
+
+    _assert_calls(2, manager)
+    assert len(system.zones) == 2
+    assert system._zones[system.zones[0].id] is system.zones[0]
+    assert system.outdoor_temperature is not None
+    assert system.boiler_status is not None
+    assert not system.rooms
+
+
+@pytest.mark.asyncio
+async def test_refresh_unknown_part(manager: SystemManager) -> None:
+    with pytest.raises(ValueError):
+        await manager.refresh(System(), ['zones', 'unknown'])
+    _assert_calls(0, manager)
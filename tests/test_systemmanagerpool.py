@@ -0,0 +1,168 @@
+import asyncio
+from typing import Any, List
+
+import pytest
+
+from pymultimatic.api import ApiError
+from pymultimatic.model import System
+from pymultimatic.systemmanagerpool import SystemManagerPool
+
+
+class _Manager:
+    # pylint: disable=too-few-public-methods
+    running = 0
+    max_running = 0
+
+    def __init__(self, name: str, calls: List[str], fail: bool = False,
+                 delay: float = 0.01) -> None:
+        self.name = name
+        self.calls = calls
+        self.fail = fail
+        self.delay = delay
+
+    async def get_system(self) -> System:
+        _Manager.running += 1
+        _Manager.max_running = max(_Manager.max_running, _Manager.running)
+        try:
+            self.calls.append(self.name)
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise ApiError('Error', None)
+            return System(reports=[])
+        finally:
+            _Manager.running -= 1
+
+    async def logout(self) -> None:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def reset_counters() -> None:
+    _Manager.running = 0
+    _Manager.max_running = 0
+
+
+def _pool(count: int, calls: List[str], **kwargs: Any) -> SystemManagerPool:
+    pool = SystemManagerPool(**kwargs)
+    for i in range(count):
+        pool.add(i, _Manager(str(i), calls))  # type: ignore
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_refresh_all() -> None:
+    calls: List[str] = []
+    pool = _pool(10, calls, max_concurrency=3)
+
+    results = [result async for result in pool.refresh_all()]
+
+    assert len(results) == 10
+    assert {result.key for result in results} == set(range(10))
+    assert all(result.is_success for result in results)
+    assert all(isinstance(result.system, System) for result in results)
+    assert _Manager.max_running == 3
+
+
+@pytest.mark.asyncio
+async def test_refresh_all_error() -> None:
+    pool = SystemManagerPool()
+    pool.add('ok', _Manager('ok', []))  # type: ignore
+    pool.add('ko', _Manager('ko', [], fail=True))  # type: ignore
+
+    results = {result.key: result async for result in pool.refresh_all()}
+
+    assert results['ok'].is_success
+    assert not results['ko'].is_success
+    assert results['ko'].system is None
+    assert isinstance(results['ko'].error, ApiError)
+
+
+@pytest.mark.asyncio
+async def test_refresh_all_min_interval() -> None:
+    calls: List[str] = []
+    pool = _pool(2, calls, min_interval=0.1)
+
+    first = [result async for result in pool.refresh_all()]
+    second = [result async for result in pool.refresh_all()]
+    await asyncio.sleep(0.1)
+    third = [result async for result in pool.refresh_all()]
+
+    assert (len(first), len(second), len(third)) == (2, 0, 2)
+    assert sorted(calls) == ['0', '0', '1', '1']
+
+
+@pytest.mark.asyncio
+async def test_refresh_all_while_polling() -> None:
+    calls: List[str] = []
+    pool = _pool(2, calls, min_interval=1)
+    pool.get(0).delay = 0.1  # type: ignore
+
+    async def _refresh_all() -> List[Any]:
+        await asyncio.sleep(0.01)
+        return [result.key async for result in pool.refresh_all()]
+
+    refresh_all = asyncio.ensure_future(_refresh_all())
+    keys = []
+    async for result in pool.poll():
+        keys.append(result.key)
+        if len(keys) == 2:
+            break
+
+    # manager 0 is still refreshing by poll when refresh_all is called,
+    # manager 1 was refreshed less than min_interval ago
+    assert await refresh_all == []
+    assert keys == [1, 0]
+    assert sorted(calls) == ['0', '1']
+
+
+@pytest.mark.asyncio
+async def test_poll_fair() -> None:
+    calls: List[str] = []
+    pool = _pool(6, calls, max_concurrency=2, min_interval=0)
+
+    results = []
+    async for result in pool.poll():
+        results.append(result)
+        if len(results) == 18:
+            break
+
+    # every manager gets its turn before a manager is refreshed again
+    for i in range(3):
+        assert sorted(calls[i * 6:(i + 1) * 6]) == [str(k) for k in range(6)]
+    assert _Manager.max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_poll_min_interval() -> None:
+    calls: List[str] = []
+    pool = _pool(2, calls, min_interval=0.1)
+
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    results = []
+    async for result in pool.poll():
+        results.append(result)
+        if len(results) == 4:
+            break
+
+    assert loop.time() - start >= 0.1
+    assert sorted(calls) == ['0', '0', '1', '1']
+
+
+@pytest.mark.asyncio
+async def test_poll_add_remove() -> None:
+    calls: List[str] = []
+    pool = _pool(1, calls, min_interval=0.05)
+
+    keys = []
+    async for result in pool.poll():
+        keys.append(result.key)
+        if len(keys) == 1:
+            pool.add('new', _Manager('new', calls))  # type: ignore
+            pool.remove(0)
+        if len(keys) == 3:
+            break
+
+    assert keys == [0, 'new', 'new']
+    assert 0 not in pool
+    assert len(pool) == 1
@@ -1,5 +1,9 @@
+import math
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import islice
+
+import attr
 
 from pymultimatic.model import TimePeriodSetting, TimeProgramDay, \
     TimeProgram, SettingModes
@@ -110,3 +114,153 @@ class TimeProgramTest(unittest.TestCase):
         next_setting = timeprogram.get_next(datetime(2019, 2, 18, 9, 30))
 
         self._assert(next_setting, tpds_day_after)
+
+    def test_get_for_start_time_included(self) -> None:
+        tpds1 = TimePeriodSetting('01:00', 25, SettingModes.ON)
+        tpds2 = TimePeriodSetting('05:00', 20, SettingModes.OFF)
+
+        timeprogram = TimeProgram({'monday': TimeProgramDay([tpds1, tpds2])})
+
+        self.assertIs(tpds1, timeprogram.get_for(datetime(2019, 2, 18, 1, 0)))
+        self.assertIs(tpds1, timeprogram.get_for(datetime(2019, 2, 18, 4, 59)))
+        self.assertIs(tpds2, timeprogram.get_for(datetime(2019, 2, 18, 5, 0)))
+
+    def test_get_for_wraps_week(self) -> None:
+        tpds_monday = TimePeriodSetting('05:00', 20, SettingModes.OFF)
+        tpds_friday = TimePeriodSetting('18:00', 25, SettingModes.ON)
+
+        timeprogram = TimeProgram({
+            'monday': TimeProgramDay([tpds_monday]),
+            'tuesday': TimeProgramDay([]),
+            'friday': TimeProgramDay([tpds_friday]),
+        })
+
+        # monday before 5:00, last setting was on friday
+        self.assertIs(tpds_friday,
+                      timeprogram.get_for(datetime(2019, 2, 18, 1, 0)))
+        # tuesday has no setting, monday setting still applies
+        self.assertIs(tpds_monday,
+                      timeprogram.get_for(datetime(2019, 2, 19, 12, 0)))
+        self.assertIs(tpds_friday,
+                      timeprogram.get_next(datetime(2019, 2, 19, 12, 0)))
+        # sunday, next setting is on monday
+        self.assertIs(tpds_monday,
+                      timeprogram.get_next(datetime(2019, 2, 24, 12, 0)))
+
+    def test_get_next_start_time_excluded(self) -> None:
+        tpds1 = TimePeriodSetting('01:00', 25, SettingModes.ON)
+        tpds2 = TimePeriodSetting('05:00', 20, SettingModes.OFF)
+
+        timeprogram = TimeProgram({'monday': TimeProgramDay([tpds1, tpds2])})
+
+        self.assertIs(tpds2, timeprogram.get_next(datetime(2019, 2, 18, 1, 0)))
+
+    def test_setting_immutable(self) -> None:
+        tpds = TimePeriodSetting('01:30', 25, SettingModes.ON)
+
+        self.assertEqual(90, tpds.absolute_minutes)
+        with self.assertRaises(AttributeError):
+            tpds.target_temperature = 20  # type: ignore
+
+    def test_evaluate(self) -> None:
+        tpds1 = TimePeriodSetting('01:00', 25, SettingModes.ON)
+        tpds2 = TimePeriodSetting('05:00', None, SettingModes.OFF)
+        tpds_friday = TimePeriodSetting('18:00', 15, SettingModes.ON)
+
+        timeprogram = TimeProgram({
+            'monday': TimeProgramDay([tpds1, tpds2]),
+            'friday': TimeProgramDay([tpds_friday]),
+        })
+
+        start = datetime(2019, 2, 17, 23, 0)
+        step = timedelta(minutes=30)
+        series = timeprogram.evaluate(start, step, 2 * 7 * 48)
+
+        self.assertEqual(2 * 7 * 48, len(series))
+        for idx in range(len(series)):
+            expected = timeprogram.get_for(start + idx * step)
+            self.assertIs(expected, series.setting(idx))
+            if expected.target_temperature is None:
+                self.assertTrue(math.isnan(series.targets[idx]))
+            else:
+                self.assertEqual(expected.target_temperature,
+                                 series.targets[idx])
+
+    def test_evaluate_at(self) -> None:
+        tpds1 = TimePeriodSetting('01:00', 25, SettingModes.ON)
+        tpds2 = TimePeriodSetting('05:00', 20, SettingModes.OFF)
+
+        timeprogram = TimeProgram({'monday': TimeProgramDay([tpds1, tpds2])})
+
+        series = timeprogram.evaluate_at([datetime(2019, 2, 18, 0, 59),
+                                          datetime(2019, 2, 18, 1, 0),
+                                          datetime(2019, 2, 18, 5, 0)])
+
+        self.assertEqual([1, 0, 1], list(series.ids))
+        self.assertEqual([20, 25, 20], list(series.targets))
+
+    def test_evaluate_empty(self) -> None:
+        timeprogram = TimeProgram({'monday': TimeProgramDay([])})
+
+        with self.assertRaises(IndexError):
+            timeprogram.evaluate(datetime(2019, 2, 18), timedelta(hours=1), 1)
+
+    def test_intervals(self) -> None:
+        tpds1 = TimePeriodSetting('01:00', 25, SettingModes.ON)
+        tpds2 = TimePeriodSetting('05:00', 20, SettingModes.OFF)
+        tpds3 = TimePeriodSetting('08:00', 20, SettingModes.OFF)
+        tpds_friday = TimePeriodSetting('18:00', 25, SettingModes.ON)
+
+        timeprogram = TimeProgram({
+            'monday': TimeProgramDay([tpds1, tpds2, tpds3]),
+            'friday': TimeProgramDay([tpds_friday]),
+        })
+
+        intervals = timeprogram.intervals()
+
+        self.assertEqual([(300, 6840, tpds2), (6840, 10380, tpds_friday)],
+                         [(i.start, i.end, i.setting) for i in intervals])
+        self.assertEqual(25, intervals[1].target_temperature)
+
+    def test_transitions(self) -> None:
+        tpds1 = TimePeriodSetting('01:00', 25, SettingModes.ON)
+        tpds2 = TimePeriodSetting('05:00', 20, SettingModes.OFF)
+        tpds_sunday = TimePeriodSetting('22:00', 20, SettingModes.OFF)
+
+        timeprogram = TimeProgram({
+            'monday': TimeProgramDay([tpds1, tpds2]),
+            'sunday': TimeProgramDay([tpds_sunday]),
+        })
+
+        # monday 05:00, the change at 05:00 is not included
+        transitions = list(islice(
+            timeprogram.transitions(datetime(2019, 2, 18, 5, 0)), 3))
+
+        self.assertEqual([(datetime(2019, 2, 25, 1, 0), tpds1),
+                          (datetime(2019, 2, 25, 5, 0), tpds2),
+                          (datetime(2019, 3, 4, 1, 0), tpds1)],
+                         [(t.at, t.setting) for t in transitions])
+
+    def test_transitions_no_change(self) -> None:
+        tpds1 = TimePeriodSetting('01:00', 25, SettingModes.ON)
+        tpds2 = TimePeriodSetting('05:00', 25, SettingModes.ON)
+
+        timeprogram = TimeProgram({'monday': TimeProgramDay([tpds1, tpds2])})
+
+        self.assertEqual(1, len(timeprogram.intervals()))
+        self.assertEqual([], list(timeprogram.transitions(datetime.now())))
+
+    def test_immutable(self) -> None:
+        tpds1 = TimePeriodSetting('01:00', 25, SettingModes.ON)
+        monday = TimeProgramDay([tpds1])
+        timeprogram = TimeProgram({'monday': monday})
+
+        self.assertEqual((tpds1,), monday.settings)
+        with self.assertRaises(attr.exceptions.FrozenInstanceError):
+            monday.settings = ()  # type: ignore
+        with self.assertRaises(attr.exceptions.FrozenInstanceError):
+            timeprogram.days = {}  # type: ignore
+        with self.assertRaises(TypeError):
+            timeprogram.days['sunday'] = monday
+        self.assertEqual(TimeProgram({'monday': TimeProgramDay([tpds1])}),
+                         timeprogram)
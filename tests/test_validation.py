@@ -0,0 +1,140 @@
+import json
+import unittest
+from typing import Any, Dict, cast
+
+from schema import Schema, SchemaError, Optional, Or, And, Use
+
+from pymultimatic.api import schemas, validation
+from tests.conftest import path
+
+
+def _load(name: str) -> Dict[str, Any]:
+    with open(path('files/responses/' + name), 'r') as file:
+        return cast(Dict[str, Any], json.loads(file.read()))
+
+
+class ValidationTest(unittest.TestCase):
+
+    def test_fixtures(self) -> None:
+        for name, schema in (('facilities', schemas.FACILITIES),
+                             ('systemcontrol', schemas.SYSTEM),
+                             ('livereport', schemas.LIVE_REPORT),
+                             ('hvacstate_errors', schemas.HVAC),
+                             ('rooms', schemas.ROOM_LIST),
+                             ('room', schemas.ROOM),
+                             ('zone', schemas.ZONE),
+                             ('hotwater', schemas.FUNCTION),
+                             ('gateway', schemas.GATEWAY),
+                             ('emf_report_device', schemas.EMF_REPORT)):
+            data = _load(name)
+            self.assertIsNotNone(validation.compile_schema(schema), name)
+            self.assertIs(data, validation.validate(schema, data), name)
+
+    def test_invalid(self) -> None:
+        data = _load('systemcontrol')
+        data['body']['zones'][0]['configuration']['enabled'] = 'true'
+
+        with self.assertRaises(SchemaError) as ctx:
+            validation.validate(schemas.SYSTEM, data)
+        self.assertIn('enabled', str(ctx.exception))
+
+    def test_missing_key(self) -> None:
+        data = _load('gateway')
+        del data['body']['gatewayType']
+
+        with self.assertRaises(SchemaError):
+            validation.validate(schemas.GATEWAY, data)
+
+    def test_energy_date(self) -> None:
+        data = _load('emf_report_device')
+        for key in ('2021-01', '2021-01-04T13:00:00', '2021-01-04 13:00'):
+            data['body']['dataset'][0]['key'] = key
+            self.assertIs(data, validation.validate(schemas.EMF_REPORT, data))
+
+        for key in ('04/01/2021', '2021-01-04T13', ''):
+            data['body']['dataset'][0]['key'] = key
+            with self.assertRaises(SchemaError):
+                validation.validate(schemas.EMF_REPORT, data)
+
+    def test_extra_keys_kept(self) -> None:
+        data = {'body': {'gatewayType': 'VR920', 'extra': 1}}
+        self.assertIs(data, validation.validate(schemas.GATEWAY, data))
+        self.assertEqual(1, data['body']['extra'])
+
+    def test_extra_keys_not_allowed(self) -> None:
+        schema = Schema({'a': int})
+        validator = validation.compile_schema(schema)
+
+        self.assertTrue(validator({'a': 1}))
+        self.assertFalse(validator({'a': 1, 'b': 2}))
+
+    def test_bool_is_not_int(self) -> None:
+        validator = validation.compile_schema(Schema({'a': int}))
+
+        self.assertTrue(validator({'a': 1}))
+        self.assertFalse(validator({'a': True}))
+        self.assertFalse(validator({'a': 1.0}))
+
+    def test_and_or(self) -> None:
+        validator = validation.compile_schema(Schema(
+            [Or(And(str, len), None)]))
+
+        self.assertTrue(validator(['a', None]))
+        self.assertFalse(validator(['']))
+        self.assertFalse(validator('a'))
+
+    def test_key_priority(self) -> None:
+        schema = Schema({
+            Optional(Or('level', 'setpoint')): float,
+            Optional('level'): int,
+        })
+        validator = validation.compile_schema(schema)
+
+        self.assertTrue(validator({'level': 1, 'setpoint': 1.5}))
+        self.assertFalse(validator({'level': 1.5}))
+
+    def test_unsupported_fallback(self) -> None:
+        schema = Schema({'a': Use(int)})
+
+        self.assertIsNone(validation.compile_schema(schema))
+        self.assertEqual({'a': 1}, validation.validate(schema, {'a': '1'}))
+
+
+class ValidationPolicyTest(unittest.TestCase):
+
+    def test_strict(self) -> None:
+        policy = validation.ValidationPolicy()
+        self.assertTrue(all(policy.should_validate('system', {})
+                            for _ in range(100)))
+
+    def test_off(self) -> None:
+        policy = validation.ValidationPolicy(validation.ValidationMode.OFF)
+        self.assertFalse(policy.should_validate('system', {}))
+
+    def test_sampled(self) -> None:
+        policy = validation.ValidationPolicy(
+            validation.ValidationMode.SAMPLED, warmup=3, sample_rate=5)
+
+        validated = [policy.should_validate('system', {'a': 1})
+                     for _ in range(13)]
+        self.assertEqual([True] * 3 + [False] * 4 + [True] + [False] * 4
+                         + [True], validated)
+
+    def test_sampled_shape_changed(self) -> None:
+        policy = validation.ValidationPolicy(
+            validation.ValidationMode.SAMPLED, warmup=1, sample_rate=100)
+
+        self.assertTrue(policy.should_validate('system', {'a': [{'b': 1}]}))
+        self.assertFalse(policy.should_validate('system', {'a': [{'b': 2}]}))
+        self.assertTrue(policy.should_validate('system', {'a': [{'b': '2'}]}))
+        self.assertTrue(policy.should_validate('system', {'a': []}))
+        self.assertTrue(policy.should_validate('rooms', {'a': []}))
+
+    def test_sampled_invalid(self) -> None:
+        policy = validation.ValidationPolicy(
+            validation.ValidationMode.SAMPLED, warmup=1, sample_rate=100)
+
+        self.assertTrue(policy.should_validate('system', {}))
+        self.assertFalse(policy.should_validate('system', {}))
+        policy.on_invalid('system')
+        self.assertTrue(policy.should_validate('system', {}))